@@ -6,8 +6,10 @@
 ###############################################################################
 """
 
+import json
 import logging
 import os
+import shutil
 import subprocess
 import sys
 import yaml
@@ -20,6 +22,9 @@ from iobenchmarksuite.exceptions import InstallHEPscoreFailure
 
 _log = logging.getLogger(__name__)
 
+# Configuration sections holding the container image of a benchmark
+IMAGE_SECTIONS = {"hs06": "hepspec06", "spec2017": "spec2017", "fio": "fio"}
+
 
 def validate_spec(conf, bench):
     """Check if the configuration is valid for hepspec06.
@@ -59,6 +64,29 @@ def validate_spec(conf, bench):
     return 0
 
 
+def validate_fio(conf):
+    """Check if the configuration is valid for fio.
+
+    Args:
+      conf:  A dict containing configuration.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    fio_conf = conf.get("fio")
+
+    if not fio_conf or not fio_conf.get("jobs"):
+        _log.error("No fio jobs found in configuration.")
+        return 1
+
+    # Without an image fio must be available on the host
+    if "image" not in fio_conf and shutil.which("fio") is None:
+        _log.error("fio is not installed in the system and no image was provided.")
+        return 1
+
+    return 0
+
+
 def install_hepscore(package, force=False):
     """Install hepscore.
 
@@ -327,8 +355,12 @@ def run_hepspec(conf, bench):
 
     # Command specification
     cmd = {
-        "docker": "docker run --rm --network=host -v {0}:{0}:Z -v {1}:{1}:Z {2} {3}".format(
-            conf["global"]["rundir"], spec["hepspec_volume"], docker_image, _run_args
+        "docker": "docker run --rm {0}--network=host -v {1}:{1}:Z -v {2}:{2}:Z {3} {4}".format(
+            container_option(conf),
+            conf["global"]["rundir"],
+            spec["hepspec_volume"],
+            docker_image,
+            _run_args,
         ),
         "singularity": "SINGULARITY_CACHEDIR={0}/singularity_cachedir singularity run -B {1}:{1} -B {2}:{2} {3} {4}".format(
             conf["global"]["parent_dir"],
@@ -343,3 +375,249 @@ def run_hepspec(conf, bench):
     _log.debug(cmd[run_mode])
     returncode = utils.exec_wait_benchmark(cmd[run_mode])
     return returncode
+
+
+def container_images(conf, selected):
+    """Docker images of the selected benchmarks that can be pulled ahead.
+
+    Only the docker run mode is covered; singularity converts images on
+    first use, and images on /cvmfs need no download.
+
+    Args:
+      conf:     A dict containing configuration.
+      selected: A list of the benchmarks to run.
+
+    Returns:
+      A list of image names without the docker:// prefix, in run order.
+    """
+    if conf["global"]["mode"] != "docker":
+        return []
+
+    images = []
+    for bench in selected:
+        image = (conf.get(IMAGE_SECTIONS.get(bench)) or {}).get("image", "")
+        if image.startswith("docker://") and image[9:] not in images:
+            images.append(image[9:])
+
+    return images
+
+
+def pull_images(conf, images):
+    """Pull container images before the benchmarks that use them.
+
+    A failed pull is not fatal, docker run tries again.
+
+    Args:
+      conf:   A dict containing configuration.
+      images: A list of image names, see container_images.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    returncode = 0
+    for image in images:
+        _log.info("Pulling image %s", image)
+        _, code = utils.exec_cmd("docker pull {}".format(image))
+        if code != 0:
+            _log.warning(
+                "Unable to pull %s, it is pulled when the benchmark runs.", image
+            )
+            returncode = 1
+
+    return returncode
+
+
+def container_option(conf):
+    """Docker option naming the container, so the watchdog can remove it.
+
+    Args:
+      conf: A dict containing configuration.
+
+    Returns:
+      The --name option followed by a space, or an empty string.
+    """
+    name = conf["global"].get("container_name")
+    return "--name {} ".format(name) if name else ""
+
+
+def remove_container(name):
+    """Remove a docker container, running or not.
+
+    Killing the docker client leaves its container running.
+
+    Args:
+      name: Name of the container, see container_option.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    # The container is usually gone with its --rm, check to keep the log clean
+    ids, code = utils.exec_cmd("docker ps -aq --filter name=^/{}$".format(name))
+    if code != 0:
+        return 1
+    if not ids:
+        return 0
+
+    _log.warning("Removing container %s", name)
+    _, code = utils.exec_cmd("docker rm -f {}".format(name))
+    return 0 if code == 0 else 1
+
+
+def build_fio_jobfile(fio_conf, workdir):
+    """Write a fio job file from the fio configuration section.
+
+    Args:
+      fio_conf: A dict containing the fio configuration section.
+      workdir:  Directory where fio creates its data files.
+
+    Returns:
+      Path to the generated job file.
+    """
+    jobfile = os.path.join(workdir, "fio_jobs.fio")
+
+    # The suite owns the data location, everything else is user defined.
+    # Data files outside workdir would not be mounted nor cleaned up.
+    sections = [("global", fio_conf.get("global")), *fio_conf["jobs"].items()]
+    for section, options in sections:
+        if "directory" in (options or {}):
+            _log.warning(
+                "Ignoring directory of fio section %s, using %s.", section, workdir
+            )
+
+    with open(jobfile, "w") as fout:
+        for section, options in sections:
+            fout.write("[{}]\n".format(section))
+            if section == "global":
+                fout.write("directory={}\n".format(workdir))
+            for key, val in (options or {}).items():
+                if key != "directory":
+                    fout.write("{}={}\n".format(key, val))
+            fout.write("\n")
+
+    _log.debug("fio job file written to %s", jobfile)
+    return jobfile
+
+
+def parse_fio_output(fio_output):
+    """Reduce fio JSON output to a compact profile entry.
+
+    Args:
+      fio_output: A dict with the output of fio --output-format=json.
+
+    Returns:
+      A dict {'fio': {...}} with bw, iops and clat percentiles per job.
+    """
+    # fio reports percentiles with keys such as "99.900000"
+    PERCENTILES = {"p50": "50.000000", "p99": "99.000000", "p99.9": "99.900000"}
+
+    jobs = {}
+    for job in fio_output["jobs"]:
+        entry = {"error": job.get("error", 0)}
+
+        for direction in ("read", "write", "trim"):
+            stats = job.get(direction, {})
+
+            # Skip directions the job did not exercise
+            if not stats.get("io_bytes"):
+                continue
+
+            clat = stats.get("clat_ns", {})
+            entry[direction] = {
+                "bw_MBps": round(stats["bw_bytes"] * (10 ** -6), 2),
+                "iops": round(stats["iops"], 2),
+                "clat_ms": {
+                    "mean": round(clat.get("mean", 0) * (10 ** -6), 4),
+                    **{
+                        name: round(clat["percentile"][key] * (10 ** -6), 4)
+                        for name, key in PERCENTILES.items()
+                        if key in clat.get("percentile", {})
+                    },
+                },
+            }
+
+        jobs[job["jobname"]] = entry
+
+    return {"fio": {"version": fio_output.get("fio version"), "jobs": jobs}}
+
+
+def remove_fio_data(conf):
+    """Remove the data files of fio, keep the job file and raw output.
+
+    Args:
+      conf: A dict containing configuration.
+    """
+    workdir = os.path.join(conf["global"]["rundir"], "FIO")
+    if not os.path.isdir(workdir):
+        return
+
+    for job in conf["fio"]["jobs"]:
+        for data_file in os.listdir(workdir):
+            if data_file.startswith(job + "."):
+                os.remove(os.path.join(workdir, data_file))
+
+
+def run_fio(conf):
+    """Run the fio benchmark on the host or in a container.
+
+    Args:
+      conf: A dict containing configuration.
+
+    Return:
+      POSIX exit code from subprocess
+    """
+    fio_conf = conf["fio"]
+    workdir = os.path.join(conf["global"]["rundir"], "FIO")
+    os.makedirs(workdir, exist_ok=True)
+
+    jobfile = build_fio_jobfile(fio_conf, workdir)
+    fio_json = os.path.join(workdir, "fio_output.json")
+    fio_args = "fio --output-format=json --output={} {}".format(fio_json, jobfile)
+
+    # Without an image fio is taken from the host PATH
+    if "image" not in fio_conf:
+        run_mode = "host"
+
+    else:
+        run_mode = conf["global"]["mode"]
+
+        if run_mode == "docker" and not fio_conf["image"].startswith("docker://"):
+            _log.error(
+                "Invalid docker image specified. Image should start with docker://"
+            )
+            return 1
+
+    # Command specification
+    cmd = {
+        "host": fio_args,
+        "docker": "docker run --rm {0}--network=host -v {1}:{1}:Z {2} {3}".format(
+            container_option(conf),
+            workdir,
+            fio_conf.get("image", "").replace("docker://", ""),
+            fio_args,
+        ),
+        "singularity": "SINGULARITY_CACHEDIR={0}/singularity_cachedir singularity exec -B {1}:{1} {2} {3}".format(
+            conf["global"]["parent_dir"], workdir, fio_conf.get("image"), fio_args
+        ),
+    }
+
+    # Start benchmark
+    _log.debug(cmd[run_mode])
+    returncode = utils.exec_wait_benchmark(cmd[run_mode])
+
+    if returncode != 0:
+        return returncode
+
+    try:
+        with open(fio_json, "r") as fin:
+            result = parse_fio_output(json.load(fin))
+
+    except (OSError, ValueError, KeyError):
+        _log.exception("Failed to parse fio output: %s", fio_json)
+        return 1
+
+    remove_fio_data(conf)
+
+    with open(os.path.join(workdir, "fio_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    return 0
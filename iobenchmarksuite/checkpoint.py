@@ -0,0 +1,109 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+_log = logging.getLogger(__name__)
+
+# Run state kept in the rundir, read back by iobmk --resume
+STATE_FILE = "suite_state.json"
+STATE_VERSION = 1
+
+# Benchmark states; anything but done is run again on resume
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+class RunState:
+    """Progress of a suite run, persisted in the rundir after each change.
+
+    Every benchmark has a state, its start and end time, return code,
+    result file, and the sampler reports and lock status that cleanup
+    attaches to the report. The file is replaced atomically, so a run
+    killed at any point leaves the last consistent state behind.
+
+    Args:
+      rundir: Run directory of the suite.
+    """
+
+    def __init__(self, rundir):
+        self.path = os.path.join(rundir, STATE_FILE)
+        self.data = {"version": STATE_VERSION, "extra": {}, "benchmarks": {}}
+        self._mutex = threading.Lock()
+
+    def load(self):
+        """Read the state of a previous run.
+
+        Returns:
+          Error code: 0 OK , 1 Not OK
+        """
+        try:
+            with open(self.path, "r") as fin:
+                data = json.load(fin)
+        except (OSError, ValueError) as err:
+            _log.error("Unable to read run state %s: %s", self.path, err)
+            return 1
+
+        if data.get("version") != STATE_VERSION:
+            _log.error("Unsupported run state version in %s", self.path)
+            return 1
+
+        self.data = data
+        return 0
+
+    def save(self):
+        """Atomically write the state to the rundir."""
+        tmp_file = "{}.{}.tmp".format(self.path, os.getpid())
+        with self._mutex:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_file, "w") as fout:
+                json.dump(self.data, fout)
+                fout.flush()
+                os.fsync(fout.fileno())
+            os.replace(tmp_file, self.path)
+
+    def set_extra(self, extra):
+        """Keep the extra fields of the run, e.g. its start time."""
+        self.data["extra"] = dict(extra)
+        self.save()
+
+    def init_benchmarks(self, selected):
+        """Add the benchmarks not known yet as pending."""
+        for bench in selected:
+            self.data["benchmarks"].setdefault(bench, {"state": PENDING})
+        self.save()
+
+    def update(self, bench, state, **fields):
+        """Record the new state of a benchmark with extra fields."""
+        entry = self.data["benchmarks"].setdefault(bench, {})
+        entry.update(fields, state=state)
+        if state == RUNNING:
+            entry["start"] = time.time()
+            entry.pop("end", None)
+        elif state in (DONE, FAILED, TIMEOUT):
+            entry["end"] = time.time()
+        self.save()
+
+    def state(self, bench):
+        """State of a benchmark, pending if unknown."""
+        return self.data["benchmarks"].get(bench, {}).get("state", PENDING)
+
+    def completed(self):
+        """Benchmarks that finished successfully."""
+        return [
+            bench
+            for bench, entry in self.data["benchmarks"].items()
+            if entry.get("state") == DONE
+        ]
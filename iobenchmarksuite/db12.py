@@ -11,6 +11,8 @@ import logging
 import random
 import multiprocessing
 
+from iobenchmarksuite import histogram
+
 UNITS = {"HS06": 1.0, "SI00": 1.0 / 344.0}
 
 _log = logging.getLogger(__name__)
@@ -85,10 +87,19 @@ def run_db12(rundir=".", cpu_num=multiprocessing.cpu_count(), reference="HS06"):
 
     cores = int(cpu_num)
     pool = multiprocessing.Pool(processes=cores)
+    scores = pool.map(get_cpu_normalization, range(cores))
+
+    # Spread of the per-process scores, in the same unit as the value
+    per_process = histogram.Histogram(resolution=1e-3, max_value=1e5)
+    for score in scores:
+        per_process.record(score)
+
     result = {}
     result["DB12"] = {
-        "value": (float(sum(pool.map(get_cpu_normalization, range(cores))) / cores)),
+        "value": (float(sum(scores)) / cores),
         "unit": "est. {}".format(reference),
+        "processes": per_process.summary(scale=1, ndigits=3),
+        "histogram": per_process.to_dict(),
     }
 
     # Save result to json
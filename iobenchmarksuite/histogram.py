@@ -0,0 +1,187 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import math
+from array import array
+
+# Percentiles reported by every benchmark
+PERCENTILES = (50, 99, 99.9)
+
+
+class Histogram:
+    """HDR-style log-bucketed histogram with a fixed memory footprint.
+
+    Values are quantized to integer multiples of resolution and counted in
+    buckets whose width doubles every 2**(sub_bucket_bits - 1) buckets, so
+    the relative error stays below 2**-(sub_bucket_bits - 1) over the whole
+    range. With the defaults (1 ns, up to 1 hour, 7 bits) the counts take
+    about 20 kB whatever the number of samples.
+
+    Instances are not thread-safe: record in one histogram per thread or
+    process and merge them afterwards. They can be pickled, or serialized
+    with to_dict() and restored with from_dict().
+
+    Args:
+      resolution:      Smallest distinguishable value, e.g. 1e-9 s.
+      max_value:       Largest value tracked, larger ones fall in the last
+                       bucket.
+      sub_bucket_bits: Precision of the buckets.
+    """
+
+    def __init__(self, resolution=1e-9, max_value=3600.0, sub_bucket_bits=7):
+        if resolution <= 0 or max_value < resolution or sub_bucket_bits < 2:
+            raise ValueError("Invalid histogram layout")
+
+        self.resolution = resolution
+        self.max_value = max_value
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._half_count = self._sub_count >> 1
+        self._max_units = int(max_value / resolution)
+        self._counts = array("Q", bytes(8 * (self._index(self._max_units) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, units):
+        """Bucket index of a quantized value."""
+        if units < self._sub_count:
+            return units
+        shift = units.bit_length() - self.sub_bucket_bits
+        return shift * self._half_count + (units >> shift)
+
+    def _bounds(self, index):
+        """Lowest and highest quantized values of a bucket."""
+        if index < self._sub_count:
+            return index, index
+        shift = index // self._half_count - 1
+        sub = index - shift * self._half_count
+        return sub << shift, ((sub + 1) << shift) - 1
+
+    def record(self, value):
+        """Count one value, e.g. a latency in seconds."""
+        units = min(max(int(value / self.resolution), 0), self._max_units)
+        self._counts[self._index(units)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _check_layout(self, other):
+        if (
+            self.resolution != other.resolution
+            or self.sub_bucket_bits != other.sub_bucket_bits
+            or self._max_units != other._max_units
+        ):
+            raise ValueError("Cannot merge histograms with different layouts")
+
+    def merge(self, other):
+        """Add the counts of another histogram with the same layout."""
+        self._check_layout(other)
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def percentile(self, pct):
+        """Nearest-rank percentile, 0.0 if nothing was recorded.
+
+        The value is the middle of the bucket holding the rank, clamped to
+        the recorded extremes.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = max(1, math.ceil(pct / 100.0 * self.count))
+        if rank >= self.count:
+            return self.max
+
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                low, high = self._bounds(index)
+                value = (low + high + 1) / 2 * self.resolution
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    @property
+    def mean(self):
+        """Mean of the recorded values, 0.0 if nothing was recorded."""
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, scale=1000, ndigits=4):
+        """Count, extremes, mean and PERCENTILES for the result JSON.
+
+        Args:
+          scale:   Factor applied to values, 1000 turns seconds into ms.
+          ndigits: Rounding of the scaled values.
+
+        Returns:
+          A dict with count, min, mean, max and one pNN key per percentile.
+        """
+        result = {
+            "count": self.count,
+            "min": round(self.min * scale, ndigits) if self.count else 0.0,
+            "mean": round(self.mean * scale, ndigits),
+            "max": round(self.max * scale, ndigits),
+        }
+        for pct in PERCENTILES:
+            result["p{}".format(pct)] = round(self.percentile(pct) * scale, ndigits)
+        return result
+
+    def to_dict(self):
+        """Compact serialization: the layout and the non-empty buckets.
+
+        Buckets are a flat [index, count, index, count, ...] list with the
+        index delta-encoded from the previous non-empty bucket.
+        """
+        buckets = []
+        previous = 0
+        for index, count in enumerate(self._counts):
+            if count:
+                buckets.extend((index - previous, count))
+                previous = index
+
+        return {
+            "resolution": self.resolution,
+            "max_value": self.max_value,
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a histogram serialized with to_dict()."""
+        hist = cls(data["resolution"], data["max_value"], data["sub_bucket_bits"])
+        index = 0
+        buckets = data["buckets"]
+        for delta, count in zip(buckets[::2], buckets[1::2]):
+            index += delta
+            hist._counts[index] = count
+
+        hist.count = data["count"]
+        hist.total = data["total"]
+        hist.min = data["min"] if hist.count else math.inf
+        hist.max = data["max"]
+        return hist
@@ -0,0 +1,443 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import re
+import shutil
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from iobenchmarksuite import histogram
+from iobenchmarksuite import pagecache
+from iobenchmarksuite import randio
+from iobenchmarksuite import seqio
+from iobenchmarksuite import utils
+
+_log = logging.getLogger(__name__)
+
+# Values used when the httpio section of the configuration omits a key
+DEFAULTS = {
+    "url": None,
+    "file_size": "256M",
+    "block_size": "1M",
+    "concurrency": [1, 4, 16],
+    "runtime": 5,
+    "timeout": 30,
+    "cold_cache": False,
+    "drop_caches": False,
+}
+
+# Directory of the rundir served by the built-in server, holding only
+# DATA_FILE: the rundir itself contains the configuration and its secrets
+SERVE_DIR = "HTTPIO"
+DATA_FILE = "httpio.dat"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Serve the files of a directory with single byte-range support.
+
+    Connections are kept alive (HTTP/1.1) and bodies are sent with
+    sendfile, so the server is cheap enough to be used on loopback.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        _log.debug("httpio server: " + format, *args)
+
+    def _resolve(self):
+        """Map the request path to a file of the served directory, or None."""
+        root = os.path.realpath(self.server.directory)
+        path = os.path.realpath(
+            os.path.join(root, unquote(urlsplit(self.path).path).lstrip("/"))
+        )
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            return None
+        return path
+
+    def _send_headers(self, send_body):
+        """Send the headers of a response.
+
+        Returns:
+          A tuple (file path, offset, length) with the body to send, or None.
+        """
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return None
+
+        size = os.path.getsize(path)
+        offset, length = 0, size
+        header = self.headers.get("Range")
+
+        if header:
+            match = _RANGE.match(header.strip())
+            if match is None or match.groups() == ("", ""):
+                self.send_error(400, "Unsupported range {}".format(header))
+                return None
+
+            first, last = match.groups()
+            if first == "":
+                # Suffix range: the last N bytes
+                offset = max(0, size - int(last))
+                last = size - 1
+            else:
+                offset = int(first)
+                last = min(int(last), size - 1) if last else size - 1
+
+            if offset >= size or last < offset:
+                self.send_response(416)
+                self.send_header("Content-Range", "bytes */{}".format(size))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+            length = last - offset + 1
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", "bytes {}-{}/{}".format(offset, last, size)
+            )
+        else:
+            self.send_response(200)
+
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+        return (path, offset, length) if send_body else None
+
+    def do_HEAD(self):
+        self._send_headers(send_body=False)
+
+    def do_GET(self):
+        body = self._send_headers(send_body=True)
+        if body is None:
+            return
+
+        path, offset, length = body
+        with open(path, "rb") as fin:
+            self.connection.sendfile(fin, offset, length)
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server handling each connection in a daemon thread.
+
+    http.server.ThreadingHTTPServer only exists from Python 3.7.
+    """
+
+    daemon_threads = True
+
+
+def serve(directory, host="127.0.0.1", port=0):
+    """Start the built-in range server in a daemon thread.
+
+    Args:
+      directory: Directory with the files to serve.
+      host:      Address to bind.
+      port:      Port to bind, 0 picks a free one.
+
+    Returns:
+      The running ThreadingServer; call shutdown() and server_close()
+      to stop it.
+    """
+    server = ThreadingServer((host, port), RangeRequestHandler)
+    server.directory = directory
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    _log.debug("httpio server listening on %s:%s", *server.server_address[:2])
+    return server
+
+
+class ConnectionPool:
+    """A pool of persistent HTTP/1.1 connections to a single origin.
+
+    Connections are handed out one per request and returned afterwards,
+    so a pool never opens more connections than requests in flight.
+
+    Args:
+      url:     URL of the resource, http or https.
+      timeout: Socket timeout in seconds.
+    """
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Unsupported URL {}".format(url))
+
+        self._cls = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._host = parts.hostname
+        self._port = parts.port
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        self.opened = 0
+
+    def get(self):
+        """Take an idle connection or open a new one."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.opened += 1
+            return self._cls(self._host, self._port, timeout=self._timeout)
+
+    def put(self, conn):
+        """Return a connection that can be reused."""
+        self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def request(self, method, headers=None):
+        """Issue a request on a pooled connection and read the whole body.
+
+        A connection the server closed while idle is retried once on a new
+        one.
+
+        Returns:
+          A tuple (response, body, seconds to first byte).
+        """
+        for attempt in (0, 1):
+            conn = self.get()
+            try:
+                start = time.perf_counter()
+                conn.request(method, self.path, headers=headers or {})
+                response = conn.getresponse()
+                ttfb = time.perf_counter() - start
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except BaseException:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self.put(conn)
+            return response, body, ttfb
+
+
+def remote_size(pool):
+    """Size of the remote resource, checking the server honours ranges."""
+    response, _, _ = pool.request("HEAD")
+    if response.status != 200:
+        raise ValueError("HEAD {} returned {}".format(pool.path, response.status))
+
+    size = int(response.getheader("Content-Length", 0))
+    if size <= 0:
+        raise ValueError("Remote resource {} has no length".format(pool.path))
+    return size
+
+
+def worker(pool, block_size, blocks, deadline, seed):
+    """Issue random block-aligned range GETs until the deadline.
+
+    Returns:
+      A tuple (bytes read, Histogram of time-to-first-byte in seconds).
+    """
+    rng = random.Random(seed)
+    nbytes = 0
+    ttfbs = histogram.Histogram()
+
+    while time.perf_counter() < deadline:
+        offset = rng.randrange(blocks) * block_size
+        response, body, ttfb = pool.request(
+            "GET",
+            {"Range": "bytes={}-{}".format(offset, offset + block_size - 1)},
+        )
+        if response.status != 206:
+            raise ValueError(
+                "Range request returned {} instead of 206".format(response.status)
+            )
+        if len(body) != block_size:
+            raise ValueError(
+                "Short range read: {} of {} bytes".format(len(body), block_size)
+            )
+
+        nbytes += len(body)
+        ttfbs.record(ttfb)
+
+    return nbytes, ttfbs
+
+
+def run_concurrency(url, block_size, size, concurrency, runtime, timeout):
+    """Measure throughput and TTFB at a given number of concurrent requests.
+
+    Returns:
+      A dict with MB/s, request count, connections opened, the TTFB
+      summary in milliseconds and the serialized TTFB histogram.
+    """
+    pool = ConnectionPool(url, timeout)
+    blocks = max(1, size // block_size)
+
+    try:
+        start = time.perf_counter()
+        deadline = start + runtime
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(worker, pool, block_size, blocks, deadline, seed)
+                for seed in range(concurrency)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    nbytes = sum(res[0] for res in results)
+    ttfbs = histogram.Histogram()
+    for res in results:
+        ttfbs.merge(res[1])
+
+    return {
+        "MBps": seqio.mbps(nbytes, elapsed),
+        "requests": ttfbs.count,
+        "connections": pool.opened,
+        "ttfb_ms": ttfbs.summary(),
+        "histogram": ttfbs.to_dict(),
+    }
+
+
+def run_httpio(rundir=".", conf=None):
+    """Run the remote read benchmark and save its result.
+
+    Without a configured url a file is laid out in a dedicated directory
+    of the rundir and served by the built-in range server on loopback.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the httpio configuration section.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    _log.debug("Running httpio with rundir=%s settings=%s", rundir, settings)
+
+    workdir = os.path.join(rundir, SERVE_DIR)
+    path = os.path.join(workdir, DATA_FILE)
+    server = None
+    evictor = pagecache.Evictor(settings["cold_cache"], settings["drop_caches"])
+
+    try:
+        block_size = utils.parse_size(settings["block_size"])
+        runtime = float(settings["runtime"])
+        timeout = float(settings["timeout"])
+        url = settings["url"]
+
+        if not url:
+            os.makedirs(workdir, exist_ok=True)
+            randio.prepare_file(path, utils.parse_size(settings["file_size"]), False)
+            server = serve(workdir)
+            url = "http://{}:{}/{}".format(*server.server_address[:2], quote(DATA_FILE))
+        elif evictor.enabled:
+            _log.warning("cold_cache only applies to the built-in server.")
+            evictor.enabled = False
+
+        pool = ConnectionPool(url, timeout)
+        try:
+            size = remote_size(pool)
+        finally:
+            pool.close()
+
+        result = {
+            "httpio": {
+                "unit": "MB/s",
+                "url": url,
+                "server": "builtin" if server else "remote",
+                "size": size,
+                "block_size": block_size,
+                "runtime": runtime,
+                "concurrency": {},
+            }
+        }
+
+        for concurrency in settings["concurrency"]:
+            _log.info("Running httpio with concurrency %s", concurrency)
+            evictor.evict([path])
+            res = run_concurrency(
+                url, block_size, size, int(concurrency), runtime, timeout
+            )
+            result["httpio"]["concurrency"][str(concurrency)] = res
+            _log.debug("httpio concurrency %s: %s", concurrency, res)
+
+    except (OSError, ValueError, http.client.HTTPException):
+        _log.exception("httpio benchmark failed.")
+        return 1
+
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result["httpio"]["cold_cache"] = evictor.report()
+
+    # Save result to json
+    with open(os.path.join(rundir, "httpio_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from httpio: %s", result)
+
+    return 0
+
+
+def main():
+    """Serve a directory with the built-in range server."""
+    parser = argparse.ArgumentParser(
+        description="Range-serving HTTP server for the httpio benchmark."
+    )
+    parser.add_argument("directory", help="Directory with the files to serve.")
+    parser.add_argument("--bind", default="127.0.0.1", help="Address to bind.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to bind.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = serve(args.directory, args.bind, args.port)
+    print("Serving {} on {}:{}".format(args.directory, args.bind, args.port))
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
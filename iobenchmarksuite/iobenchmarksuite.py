@@ -7,17 +7,36 @@
 """
 
 import os
+import functools
+import glob
 import json
 import logging
 import time
 import shutil
+import tempfile
+import uuid
 
 from iobenchmarksuite import db12
+from iobenchmarksuite import httpio
+from iobenchmarksuite import ior
+from iobenchmarksuite import mdtest
+from iobenchmarksuite import randio
+from iobenchmarksuite import repetition
+from iobenchmarksuite import replay
+from iobenchmarksuite import seqio
 from iobenchmarksuite import utils
+from iobenchmarksuite import watchdog
 from iobenchmarksuite import benchmarks
+from iobenchmarksuite import checkpoint
 from iobenchmarksuite.exceptions import PreFlightError
 from iobenchmarksuite.exceptions import BenchmarkFailure
 from iobenchmarksuite.exceptions import BenchmarkFullFailure
+from iobenchmarksuite.lock import LOCK_PATH, POLICIES, BenchmarkLock
+from iobenchmarksuite.plugins.cpustats import CPUStatsSampler
+from iobenchmarksuite.plugins.diskstats import DiskStatsSampler
+from iobenchmarksuite.plugins.procio import ProcIOSampler
+from iobenchmarksuite.plugins import snapshot
+from iobenchmarksuite.scheduler import CPU, DISK, Scheduler, Task
 
 _log = logging.getLogger(__name__)
 
@@ -33,34 +52,195 @@ class IOBenchmarkSuite:
         "spec2017": "SPEC2017/spec2017_result.json",
         "hepscore": "HEPSCORE/hepscore_result.json",
         "db12": "db12_result.json",
+        "seqio": "seqio_result.json",
+        "randio": "randio_result.json",
+        "fio": "FIO/fio_result.json",
+        "ior": "ior_result.json",
+        "mdtest": "mdtest_result.json",
+        "replay": "replay_result.json",
+        "httpio": "httpio_result.json",
     }
 
-    # Required disk space (in GB) for all benchmarks
+    # Resources each benchmark holds exclusively while it runs. The I/O
+    # benchmarks also need the CPU, as their throughput depends on it.
+    RESOURCES = {
+        "db12": (CPU,),
+        "hs06": (CPU, DISK),
+        "spec2017": (CPU, DISK),
+        "hepscore": (CPU, DISK),
+        "seqio": (CPU, DISK),
+        "randio": (CPU, DISK),
+        "fio": (CPU, DISK),
+        "ior": (CPU, DISK),
+        "mdtest": (CPU, DISK),
+        "replay": (CPU, DISK),
+        "httpio": (CPU, DISK),
+    }
+
+    # Scratch files and trees of the native benchmarks in the rundir,
+    # removed when the benchmark process dies before cleaning up itself
+    SCRATCH = {
+        "seqio": ("seqio.dat", ".direct-probe-*"),
+        "randio": ("randio.dat", ".direct-probe-*"),
+        "ior": ("ior.dat", "ior.dat.*", ".direct-probe-*"),
+        "mdtest": ("MDTEST",),
+        "replay": ("REPLAY",),
+        "httpio": ("HTTPIO",),
+    }
+
+    # Benchmarks running in the suite itself, the others need the run mode
+    NATIVE_BENCHMARKS = ("db12", "seqio", "randio", "ior", "mdtest", "replay", "httpio")
+
+    # Required disk space (in GB) for the benchmarks running in containers
     DISK_THRESHOLD = 2.0
 
+    # Background samplers run during each benchmark, attached to its profile
+    SAMPLERS = {
+        "diskstats": DiskStatsSampler,
+        "procio": ProcIOSampler,
+        "cpustats": CPUStatsSampler,
+    }
+
     def __init__(self, config=None):
         """Initialize setup"""
-        self._bench_queue = config["global"]["benchmarks"].copy()
         self.selected_benchmarks = config["global"]["benchmarks"].copy()
         self._config = config["global"]
         self._config_full = config
         self._extra = {}
         self._result = {}
+        self._monitoring = {}
+        self._snapshot = None
+        self._metadata = None
+        self._scheduler = None
+        self._lock = None
+        self._locks = {}
+        self._repetitions = {}
+        self._state = checkpoint.RunState(self._config["rundir"])
+        self._deadline = None
         self.failures = []
+        self.timeouts = []
 
     def start(self):
         """Entrypoint for suite."""
         _log.info("Starting HEP Benchmark Suite")
 
-        self._extra["start_time"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-
-        if self.preflight():
-            _log.info("Pre-flight checks passed successfully.")
-            self.run()
+        if self._config.get("resume"):
+            self.restore()
         else:
+            self._extra["start_time"] = time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime()
+            )
+            self._state.set_extra(self._extra)
+
+        suite_budget = (self._config.get("timeouts") or {}).get("suite")
+        if suite_budget:
+            self._deadline = time.time() + suite_budget
+
+        self._state.init_benchmarks(self.selected_benchmarks)
+        self.run()
+
+    def restore(self):
+        """Load the state of an interrupted run from its rundir.
+
+        Completed benchmarks keep their results, sampler reports and lock
+        status; the others are run again.
+        """
+        if self._state.load() != 0:
+            _log.error("Unable to resume the run in %s", self._config["rundir"])
+            raise PreFlightError
+
+        self._extra.update(self._state.data["extra"])
+        for bench in self._state.completed():
+            entry = self._state.data["benchmarks"][bench]
+            self._monitoring[bench] = entry.get("monitoring", {})
+            if entry.get("lock"):
+                self._locks[bench] = entry["lock"]
+            if entry.get("repetitions"):
+                self._repetitions[bench] = entry["repetitions"]
+
+        _log.info(
+            "Resuming run started at %s, completed benchmarks: %s",
+            self._extra.get("start_time"),
+            self._state.completed(),
+        )
+
+    def check_preflight(self):
+        """Run the pre-flight checks, raising PreFlightError if any failed."""
+        if not self.preflight():
             _log.error("Pre-flight checks failed.")
             raise PreFlightError
 
+        _log.info("Pre-flight checks passed successfully.")
+        lock_conf = self._config.get("lock", {})
+        if lock_conf is not False:
+            self._lock = BenchmarkLock(
+                path=lock_conf.get("path", LOCK_PATH),
+                policy=lock_conf.get("policy", "wait"),
+                timeout=lock_conf.get("timeout", 3600),
+            )
+
+        if self._config.get("snapshot", {}) is not False:
+            # Compared in cleanup() to spot runs disturbed by other jobs
+            self._snapshot = snapshot.take_snapshot()
+
+    def uses_containers(self):
+        """True if a selected benchmark runs in a docker/singularity container.
+
+        The native I/O benchmarks and db12 run in the suite itself, fio
+        only uses a container when its section names an image.
+        """
+        for bench in self.selected_benchmarks:
+            if bench == "fio":
+                if "image" in (self._config_full.get("fio") or {}):
+                    return True
+            elif bench not in self.NATIVE_BENCHMARKS:
+                return True
+        return False
+
+    def required_space(self):
+        """Free space (in GB) the selected benchmarks need in the rundir.
+
+        Containers need DISK_THRESHOLD, the native benchmarks the data they
+        lay out. They run one at a time and clean up, so the largest need
+        counts. Malformed sizes are left to the benchmark to report.
+        """
+        needs = [self.DISK_THRESHOLD if self.uses_containers() else 0]
+        mp_num = int(self._config.get("mp_num") or 1)
+        native = {
+            "seqio": seqio,
+            "randio": randio,
+            "ior": ior,
+            "mdtest": mdtest,
+            "httpio": httpio,
+        }
+
+        for bench in self.selected_benchmarks:
+            if bench == "fio":
+                needs.append(self.DISK_THRESHOLD)
+            if bench not in native:
+                continue
+
+            settings = dict(native[bench].DEFAULTS)
+            settings.update(self._config_full.get(bench) or {})
+            try:
+                if bench == "ior":
+                    size = utils.parse_size(settings["segment_size"]) * mp_num
+                elif bench == "mdtest":
+                    size = (
+                        int(settings["files_per_rank"])
+                        * int(settings["file_size"])
+                        * mp_num
+                    )
+                elif bench == "httpio" and settings["url"]:
+                    size = 0
+                else:
+                    size = utils.parse_size(settings["file_size"])
+            except (TypeError, ValueError):
+                continue
+            needs.append(round(size * (10 ** -9), 2))
+
+        return max(needs)
+
     def preflight(self):
         """Perform pre-flight checks."""
 
@@ -71,7 +251,11 @@ class IOBenchmarkSuite:
 
         # Avoid executing commands if they are not valid run modes.
         # This avoids injections through the configuration file.
-        if self._config["mode"] in ("docker", "singularity"):
+        if self._config["mode"] not in ("docker", "singularity"):
+            _log.error("Invalid run mode specified: %s.", self._config["mode"])
+            checks.append(1)
+
+        elif self.uses_containers():
 
             # Search if run mode is installed
             system_runmode = shutil.which(self._config["mode"])
@@ -100,8 +284,7 @@ class IOBenchmarkSuite:
                 checks.append(1)
 
         else:
-            _log.error("Invalid run mode specified: %s.", self._config["mode"])
-            checks.append(1)
+            _log.info("   - No selected benchmark runs in a container.")
 
         _log.info(" - Checking provided work dirs exist...")
         os.makedirs(self._config["rundir"], exist_ok=True)
@@ -119,102 +302,605 @@ class IOBenchmarkSuite:
         for bench in self.selected_benchmarks:
             if bench in ("hs06", "spec2017"):
                 checks.append(benchmarks.validate_spec(self._config_full, bench))
+            elif bench == "fio":
+                checks.append(benchmarks.validate_fio(self._config_full))
+            elif bench == "replay":
+                checks.append(replay.validate_replay(self._config_full.get("replay")))
 
         _log.info(" - Checking if rundir has enough space...")
         disk_stats = shutil.disk_usage(self._config["rundir"])
         disk_space_gb = round(disk_stats.free * (10 ** -9), 2)
+        required_gb = self.required_space()
 
         _log.debug("Calculated disk space: %s GB", disk_space_gb)
-        if disk_space_gb <= self.DISK_THRESHOLD and not (
-            len(self.selected_benchmarks) == 1 and "db12" in self.selected_benchmarks
-        ):
+        if required_gb and disk_space_gb <= required_gb:
             _log.error(
                 "Not enough disk space on %s, free: %s GB, required: %s GB",
                 self._config["rundir"],
                 disk_space_gb,
-                self.DISK_THRESHOLD,
+                required_gb,
             )
 
             # Flag for a failed check
             checks.append(1)
 
+        if "mdtest" in self.selected_benchmarks:
+            _log.info(" - Checking if rundir has enough inodes...")
+            checks.append(self.check_inodes())
+
+        repeat_conf = self._config.get("repetitions") or {}
+        confidence = repeat_conf.get("confidence", repetition.DEFAULTS["confidence"])
+        if confidence not in repetition.T_QUANTILES:
+            _log.error(
+                "Invalid repetitions confidence %s, choose one of %s",
+                confidence,
+                sorted(repetition.T_QUANTILES),
+            )
+            checks.append(1)
+
+        lock_conf = self._config.get("lock", {})
+        if lock_conf is not False and lock_conf.get("policy", "wait") not in POLICIES:
+            _log.error(
+                "Invalid lock policy %s, choose one of %s",
+                lock_conf["policy"],
+                POLICIES,
+            )
+            checks.append(1)
+
         # Check if any pre-flight check failed
         if any(checks):
             return False
         else:
             return True
 
+    def check_inodes(self):
+        """Check the rundir has enough free inodes for mdtest.
+
+        Returns:
+          Error code: 0 OK , 1 Not OK
+        """
+        needed = mdtest.required_inodes(
+            self._config_full.get("mdtest"), self._config["mp_num"]
+        )
+        fs_stats = os.statvfs(self._config["rundir"])
+
+        _log.debug("Required inodes: %s, free: %s", needed, fs_stats.f_favail)
+
+        # Filesystems without a fixed inode table (btrfs, some network
+        # filesystems) report zero inodes in total
+        if fs_stats.f_files == 0:
+            _log.warning("Unable to check free inodes on %s", self._config["rundir"])
+            return 0
+
+        if fs_stats.f_favail < needed:
+            _log.error(
+                "Not enough inodes on %s, free: %s, required: %s",
+                self._config["rundir"],
+                fs_stats.f_favail,
+                needed,
+            )
+            return 1
+
+        return 0
+
+    def tasks(self):
+        """Model the suite phases and the benchmarks as scheduler tasks.
+
+        Everything waits for the pre-flight checks. The host metadata
+        collection and the image pull only need the disk, so they overlap
+        with CPU-only benchmarks such as db12 but never disturb an I/O
+        measurement. The benchmarks run in the selected order, as they
+        conflict with each other, and cleanup waits for all of them.
+
+        Returns:
+          A list of Task.
+        """
+        tasks = [
+            Task("preflight", self.check_preflight),
+            Task(
+                "metadata",
+                self.collect_metadata,
+                resources=(DISK,),
+                after=("preflight",),
+            ),
+        ]
+
+        # Benchmarks completed before a resume are not run again
+        remaining = [
+            bench
+            for bench in self.selected_benchmarks
+            if self._state.state(bench) != checkpoint.DONE
+        ]
+
+        images = benchmarks.container_images(self._config_full, remaining)
+        if images:
+            tasks.append(
+                Task(
+                    "pull",
+                    lambda: self.pull_images(images),
+                    resources=(DISK,),
+                    after=("preflight",),
+                )
+            )
+
+        for bench in remaining:
+            after = ["preflight"]
+            if images and bench in benchmarks.IMAGE_SECTIONS:
+                after.append("pull")
+            tasks.append(
+                Task(
+                    bench,
+                    lambda bench=bench: self.run_benchmark(bench),
+                    resources=self.RESOURCES.get(bench, (CPU, DISK)),
+                    after=after,
+                )
+            )
+
+        tasks.append(Task("cleanup", self.cleanup, after=[task.name for task in tasks]))
+        return tasks
+
     def run(self):
-        """Run the benchmark at the head of _bench_queue and recurse"""
+        """Run all phases of the suite with the scheduler."""
+        self._scheduler = Scheduler(self.tasks())
+        with watchdog.forward_signals():
+            self._scheduler.run()
+
+    def collect_metadata(self):
+        """Collect the host metadata ahead of cleanup.
+
+        A failure does not stop the benchmarks, cleanup collects the
+        metadata again.
+        """
+        try:
+            self._metadata = utils.collect_metadata(self._config)
+        except Exception:
+            _log.exception("Unable to collect the host metadata, retrying at cleanup.")
+
+    def pull_images(self, images):
+        """Pull the container images, a failure does not stop the benchmarks.
+
+        Returns:
+          Error code: 0 OK , 1 Not OK
+        """
+        try:
+            return benchmarks.pull_images(self._config_full, images)
+        except Exception:
+            _log.exception("Unable to pull the images, docker run tries again.")
+            return 1
+
+    def run_benchmark(self, bench2run):
+        """Run a benchmark and checkpoint its state in the rundir.
+
+        Returns:
+          The return code of the benchmark.
+        """
+        self._state.update(
+            bench2run, checkpoint.RUNNING, result=self.RESULT_FILES[bench2run]
+        )
+
+        state = checkpoint.FAILED
+        returncode = None
+        try:
+            returncode = self.measure_locked(bench2run)
+            if bench2run in self.timeouts:
+                state = checkpoint.TIMEOUT
+            elif bench2run not in self.failures:
+                state = checkpoint.DONE
+        finally:
+            self._state.update(
+                bench2run,
+                state,
+                returncode=returncode,
+                monitoring=self._monitoring.get(bench2run, {}),
+                lock=self._locks.get(bench2run),
+                repetitions=self._repetitions.get(bench2run),
+            )
 
-        # Check if there are still benchmarks to run
-        if len(self._bench_queue) == 0:
-            self._extra["end_time"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-            self.cleanup()
+        return returncode
 
-        else:
-            _log.info("Benchmarks left to run: %s", self._bench_queue)
-            bench2run = self._bench_queue.pop(0)
-            _log.info("Running benchmark: %s", bench2run)
+    def measure_locked(self, bench2run):
+        """Measure a benchmark while holding the node lock.
 
-            if bench2run == "db12":
-                # TO FIX returns a dict{'DB12':{ 'value': float(), 'unit': string() }}
-                returncode = db12.run_db12(rundir=self._config["rundir"], cpu_num=2)
+        The lock keeps the suite instances of a node from measuring at
+        the same time; depending on its policy a benchmark is skipped,
+        and counted as failed, when another instance holds it.
 
-                if not returncode["DB12"]["value"]:
-                    self.failures.append(bench2run)
+        Returns:
+          The return code of the benchmark, None if skipped.
+        """
+        if self._lock is None:
+            return self.measure(bench2run)
 
-            elif bench2run == "hepscore":
-                # Prepare hepscore
-                if benchmarks.prep_hepscore(self._config_full) == 0:
-                    # Run hepscore
-                    returncode = benchmarks.run_hepscore(self._config_full)
-                    if returncode < 0:
-                        self.failures.append(bench2run)
-                else:
-                    _log.error("Skipping hepscore due to failed installation.")
+        status = self._lock.acquire(bench2run)
+        self._locks[bench2run] = status
+        if status["skipped"]:
+            _log.error(
+                "Skipping %s, the node lock is held by %s after %s s.",
+                bench2run,
+                status["holder"],
+                status["wait_s"],
+            )
+            self.failures.append(bench2run)
+            return None
+
+        if status["wait_s"] > 0:
+            _log.info("Waited %s s for the node lock.", status["wait_s"])
+
+        try:
+            return self.measure(bench2run)
+        finally:
+            self._lock.release()
+
+    def measure(self, bench2run):
+        """Run a benchmark with the samplers and record its failure.
+
+        Returns:
+          The return code of the benchmark.
+        """
+        deadline = self.deadline(bench2run)
+        if deadline is not None and deadline <= time.time():
+            _log.error("Skipping %s, the suite time budget is spent.", bench2run)
+            self.failures.append(bench2run)
+            self.timeouts.append(bench2run)
+            return None
+
+        _log.info("Running benchmark: %s", bench2run)
+        samplers = self.start_samplers()
+
+        try:
+            if self.repeated(bench2run):
+                returncode = self.repeat(bench2run, deadline)
+            else:
+                returncode = self.supervise(bench2run, deadline)
+        finally:
+            self.stop_samplers(bench2run, samplers)
+        _log.info("Completed %s with return code %s", bench2run, returncode)
+
+        return returncode
+
+    def repeated(self, bench):
+        """True if the repetitions of global.repetitions apply to bench."""
+        conf = self._config.get("repetitions") or {}
+        if not conf:
+            return False
+        return bench in (conf.get("benchmarks") or self.selected_benchmarks)
+
+    def deadline(self, bench):
+        """Time by which a benchmark must end, None without a budget.
+
+        The budget of a benchmark is its entry in global.timeouts, or the
+        default entry, cut to what is left of the suite budget.
+        """
+        conf = self._config.get("timeouts") or {}
+        budget = conf.get(bench, conf.get("default"))
+        deadlines = [self._deadline] if self._deadline else []
+        if budget:
+            deadlines.append(time.time() + budget)
+        return min(deadlines) if deadlines else None
+
+    def supervise(self, bench2run, deadline=None):
+        """Run a benchmark in a process of its own under a watchdog.
+
+        The benchmark runs in a new session, see watchdog.main. One still
+        running at the deadline is terminated with everything it started,
+        docker containers included, and recorded as timed out as well as
+        failed.
+
+        Returns:
+          The return code of the benchmark, None if it did not complete.
+        """
+        name = "iobmk-{}-{}".format(bench2run, uuid.uuid4().hex[:12])
+        config = dict(self._config_full)
+        config["global"] = dict(self._config, container_name=name)
+        cleanup = None
+        if self._config["mode"] == "docker":
+            cleanup = functools.partial(benchmarks.remove_container, name)
+
+        root = logging.getLogger()
+        payload = {
+            "config": config,
+            "bench": bench2run,
+            "log_level": root.level,
+            "log_files": [
+                handler.baseFilename
+                for handler in root.handlers
+                if isinstance(handler, logging.FileHandler)
+            ],
+        }
+
+        timeout = None if deadline is None else deadline - time.time()
+        grace = (self._config.get("timeouts") or {}).get("grace", watchdog.GRACE)
+
+        with tempfile.TemporaryDirectory(prefix="iobmk-") as tmpdir:
+            payload_path = os.path.join(tmpdir, "payload.json")
+            result_path = os.path.join(tmpdir, "result.json")
+            with open(payload_path, "w") as fout:
+                json.dump(payload, fout)
+
+            outcome, value = watchdog.run_in_group(
+                watchdog.RUNNER + [payload_path, result_path], timeout, grace, cleanup
+            )
 
-            elif bench2run in ("hs06", "spec2017"):
-                returncode = benchmarks.run_hepspec(
-                    conf=self._config_full, bench=bench2run
+            if outcome == watchdog.TIMEOUT:
+                _log.error("%s timed out after %s s.", bench2run, value)
+                self.timeouts.append(bench2run)
+                self.failures.append(bench2run)
+                self.remove_scratch(bench2run)
+                return None
+
+            try:
+                with open(result_path, "r") as fin:
+                    result = json.load(fin)
+            except (OSError, ValueError):
+                _log.error(
+                    "%s failed: benchmark process exited with code %s", bench2run, value
                 )
-                if returncode > 0:
+                self.failures.append(bench2run)
+                self.remove_scratch(bench2run)
+                return None
+
+        if result["failed"]:
+            self.failures.append(bench2run)
+        return result["returncode"]
+
+    def remove_scratch(self, bench2run):
+        """Remove the data files a killed benchmark left in the rundir."""
+        if bench2run == "fio":
+            try:
+                benchmarks.remove_fio_data(self._config_full)
+            except OSError:
+                _log.exception("Unable to remove the fio data files.")
+            return
+
+        for pattern in self.SCRATCH.get(bench2run, ()):
+            for path in glob.glob(os.path.join(self._config["rundir"], pattern)):
+                _log.info("Removing %s left by %s", path, bench2run)
+                try:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                except OSError:
+                    _log.exception("Unable to remove %s", path)
+
+    def repeat(self, bench2run, deadline=None):
+        """Repeat a benchmark until its primary metric has converged.
+
+        Each repetition overwrites the result file, so the last one is
+        reported, with the statistics over all of them attached.
+
+        Returns:
+          The return code of the last repetition.
+        """
+        controller = repetition.Repetitions(bench2run, self._config.get("repetitions"))
+
+        while True:
+            start = time.time()
+            returncode = self.supervise(bench2run, deadline)
+            if bench2run in self.failures:
+                break
+
+            try:
+                value = controller.value(self.read_profiles(bench2run))
+            except (OSError, ValueError) as err:
+                _log.warning("Unable to read the %s results: %s", bench2run, err)
+                value = None
+            if value is None:
+                break
+
+            controller.add(value, time.time() - start)
+            report = controller.report()
+            _log.info(
+                "%s repetition %s: %s, mean %s, relative CI half-width %s",
+                bench2run,
+                len(report["samples"]),
+                value,
+                report["mean"],
+                report["ci_rel_halfwidth"],
+            )
+            if controller.done():
+                break
+
+        self._repetitions[bench2run] = controller.report()
+        return returncode
+
+    def execute(self, bench2run):
+        """Run a benchmark once and record its failure.
+
+        Returns:
+          The return code of the benchmark.
+        """
+        returncode = None
+
+        if bench2run == "db12":
+            # TO FIX returns a dict{'DB12':{ 'value': float(), 'unit': string() }}
+            returncode = db12.run_db12(rundir=self._config["rundir"], cpu_num=2)
+
+            if not returncode["DB12"]["value"]:
+                self.failures.append(bench2run)
+
+        elif bench2run == "seqio":
+            returncode = seqio.run_seqio(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("seqio"),
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "randio":
+            returncode = randio.run_randio(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("randio"),
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "hepscore":
+            # Prepare hepscore
+            if benchmarks.prep_hepscore(self._config_full) == 0:
+                # Run hepscore
+                returncode = benchmarks.run_hepscore(self._config_full)
+                if returncode < 0:
                     self.failures.append(bench2run)
-            _log.info("Completed %s with return code %s", bench2run, returncode)
-            # recursive call to run() with check_lock
-            self.check_lock()
-
-    def check_lock(self):
-        """Check benchmark locks."""
-        # TODO: Check lock files
-        # loop until lock is released from benchmark
-        # print(os.path.exists("bench.lock"))
-        # Release lock and resume benchmarks
-        self.run()
+            else:
+                _log.error("Skipping hepscore due to failed installation.")
+
+        elif bench2run == "ior":
+            returncode = ior.run_ior(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("ior"),
+                mp_num=self._config["mp_num"],
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "mdtest":
+            returncode = mdtest.run_mdtest(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("mdtest"),
+                mp_num=self._config["mp_num"],
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "replay":
+            returncode = replay.run_replay(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("replay"),
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "httpio":
+            returncode = httpio.run_httpio(
+                rundir=self._config["rundir"],
+                conf=self._config_full.get("httpio"),
+            )
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run == "fio":
+            returncode = benchmarks.run_fio(conf=self._config_full)
+
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        elif bench2run in ("hs06", "spec2017"):
+            returncode = benchmarks.run_hepspec(conf=self._config_full, bench=bench2run)
+            if returncode > 0:
+                self.failures.append(bench2run)
+
+        return returncode
+
+    def start_samplers(self):
+        """Start the background samplers enabled in global.monitoring.
+
+        Returns:
+          A dict {name: running sampler}.
+        """
+        conf = self._config.get("monitoring") or {}
+        interval = conf.get("interval", 1)
+        samplers = {}
+
+        for name, sampler_cls in self.SAMPLERS.items():
+            if not conf.get(name, True):
+                continue
+            if not sampler_cls.available():
+                _log.debug("Sampler %s is not available on this host.", name)
+                continue
+
+            samplers[name] = sampler_cls(interval)
+            samplers[name].start()
+
+        return samplers
+
+    def stop_samplers(self, bench, samplers):
+        """Stop the samplers of a benchmark and keep their reports."""
+        self._monitoring[bench] = {
+            name: sampler.stop() for name, sampler in samplers.items()
+        }
+
+    def check_snapshot(self):
+        """Compare the system state with the snapshot taken at start.
+
+        Returns:
+          The snapshot diff with the contaminated verdict.
+        """
+        diff = snapshot.diff_snapshots(
+            self._snapshot,
+            snapshot.take_snapshot(),
+            thresholds=self._config.get("snapshot"),
+            exclude=snapshot.suite_pids(),
+            containers=self._config["mode"] in ("docker", "singularity"),
+        )
+
+        if diff["contaminated"]:
+            _log.warning(
+                "Run may be contaminated by other activity: %s",
+                "; ".join(diff["reasons"]),
+            )
+
+        return diff
+
+    def read_profiles(self, bench):
+        """Read the profiles from the result file of a benchmark."""
+        result_path = os.path.join(self._config["rundir"], self.RESULT_FILES[bench])
+
+        with open(result_path, "r") as result_file:
+            _log.info("Reading result file: %s", result_path)
+
+            if bench == "hepscore":
+                return {"hepscore": json.loads(result_file.read())}
+            return json.loads(result_file.read())
 
     def cleanup(self):
         """Run the cleanup phase - collect the results from each benchmark"""
 
+        self._extra["end_time"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
         # compile metadata
-        self._result = utils.prepare_metadata(self._config_full, self._extra)
+        self._result = utils.prepare_metadata(
+            self._config_full, self._extra, self._metadata
+        )
         self._result.update({"profiles": {}})
 
+        if self._snapshot is not None:
+            self._result["suite"]["snapshot"] = self.check_snapshot()
+
+        if self._scheduler is not None:
+            self._result["suite"]["schedule"] = self._scheduler.timeline()
+
+        if self._locks:
+            self._result["suite"]["lock"] = self._locks
+
+        if self.failures:
+            self._result["suite"]["failures"] = {
+                "failed": [
+                    bench for bench in self.failures if bench not in self.timeouts
+                ],
+                "timeout": self.timeouts,
+            }
+
         # Get results from each benchmark
         for bench in self.selected_benchmarks:
             try:
-                result_path = os.path.join(
-                    self._config["rundir"], self.RESULT_FILES[bench]
-                )
+                profiles = self.read_profiles(bench)
 
-                with open(result_path, "r") as result_file:
-                    _log.info("Reading result file: %s", result_path)
+                # Attach what the samplers saw while the benchmark ran, and
+                # the statistics of repeated benchmarks
+                for profile in profiles.values():
+                    if isinstance(profile, dict):
+                        profile.update(self._monitoring.get(bench, {}))
+                        if bench in self._repetitions:
+                            profile["repetitions"] = self._repetitions[bench]
 
-                    if bench == "hepscore":
-                        self._result["profiles"]["hepscore"] = json.loads(
-                            result_file.read()
-                        )
-                    else:
-                        self._result["profiles"].update(json.loads(result_file.read()))
+                self._result["profiles"].update(profiles)
 
             except Exception as err:
                 _log.warning("Skipping %s because of %s", bench, err)
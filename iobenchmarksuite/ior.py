@@ -0,0 +1,280 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from queue import Empty
+
+from iobenchmarksuite import histogram
+from iobenchmarksuite import pagecache
+from iobenchmarksuite import seqio
+from iobenchmarksuite import utils
+
+_log = logging.getLogger(__name__)
+
+# Values used when the ior section of the configuration omits a key
+DEFAULTS = {
+    "transfer_size": "1M",
+    "segment_size": "256M",
+    "modes": ["shared", "fpp"],
+    "direct": True,
+    "cold_cache": False,
+    "drop_caches": False,
+}
+
+# Seconds a rank waits at a barrier before giving up on its peers
+BARRIER_TIMEOUT = 600
+
+
+def data_path(rundir, mode, rank):
+    """Path of the file used by a rank in the given mode."""
+    if mode == "shared":
+        return os.path.join(rundir, "ior.dat")
+    return os.path.join(rundir, "ior.dat.{:05d}".format(rank))
+
+
+def rank_main(
+    rank, nranks, rundir, mode, transfer_size, count, direct, evictor, barrier, queue
+):
+    """Body of a single rank.
+
+    Each rank writes its own segment, then reads the segment written by
+    its neighbour so that the read cannot be served from data the rank
+    itself left in the page cache. Both phases start on a barrier. With a
+    cold cache, rank 0 evicts every data file between the two phases.
+    """
+    segment = transfer_size * count
+    buf = seqio.aligned_buffer(transfer_size)
+    timings = {}
+    latencies = {"write": histogram.Histogram(), "read": histogram.Histogram()}
+
+    try:
+        for phase in ("write", "read"):
+            # Read back the neighbour's data, IOR's "reorder tasks"
+            target = rank if phase == "write" else (rank + 1) % nranks
+            path = data_path(rundir, mode, target)
+            offset = target * segment if mode == "shared" else 0
+            flags = os.O_WRONLY | os.O_CREAT if phase == "write" else os.O_RDONLY
+
+            barrier.wait(BARRIER_TIMEOUT)
+
+            fd, used_direct = seqio.open_file(path, flags, direct)
+            try:
+                start = time.perf_counter()
+                issued = start
+                for i in range(count):
+                    if phase == "write":
+                        os.pwrite(fd, buf, offset + i * transfer_size)
+                    else:
+                        # Aligned buffer for O_DIRECT, os.pread allocates its own
+                        os.lseek(fd, offset + i * transfer_size, os.SEEK_SET)
+                        os.readv(fd, [buf])
+                    now = time.perf_counter()
+                    latencies[phase].record(now - issued)
+                    issued = now
+                if phase == "write":
+                    os.fsync(fd)
+                end = time.perf_counter()
+            finally:
+                os.close(fd)
+
+            timings[phase] = (start, end)
+
+            if phase == "write" and evictor.enabled:
+                barrier.wait(BARRIER_TIMEOUT)
+                if rank == 0:
+                    evictor.evict(
+                        sorted({data_path(rundir, mode, i) for i in range(nranks)})
+                    )
+
+        report = {"direct": used_direct, "error": None}
+
+    except (OSError, threading.BrokenBarrierError) as err:
+        # Release the peers blocked on the barrier
+        barrier.abort()
+        report = {"direct": direct, "error": str(err)}
+
+    finally:
+        buf.close()
+
+    report.update(
+        {
+            "rank": rank,
+            "timings": timings,
+            "latencies": latencies,
+            "cold_cache": evictor.report(),
+        }
+    )
+    queue.put(report)
+
+
+def summarize(timings, nbytes):
+    """Aggregate bandwidth and imbalance of one phase over all ranks.
+
+    Args:
+      timings: A list of (start, end) tuples, one per rank.
+      nbytes:  Bytes moved by each rank.
+
+    Returns:
+      A dict with the aggregate bandwidth and per-rank spread.
+    """
+    # The phase lasts from the first rank starting to the last rank finishing
+    wall = max(end for _, end in timings) - min(start for start, _ in timings)
+    rank_times = [end - start for start, end in timings]
+
+    return {
+        "aggregate_MBps": seqio.mbps(nbytes * len(timings), wall),
+        "rank_MBps": {
+            "min": seqio.mbps(nbytes, max(rank_times)),
+            "max": seqio.mbps(nbytes, min(rank_times)),
+        },
+        "imbalance": round(max(rank_times) / max(min(rank_times), 1e-9), 3),
+    }
+
+
+def run_mode(rundir, mode, nranks, transfer_size, count, direct, evictor):
+    """Run the write and read phases of one access mode with nranks processes.
+
+    Returns:
+      A dict with the summary and transfer latencies of each phase.
+    """
+    barrier = multiprocessing.Barrier(nranks)
+    queue = multiprocessing.Queue()
+
+    # Ranks start from a clean tally which is merged back afterwards
+    rank_evictor = pagecache.Evictor(evictor.enabled, evictor.use_drop_caches)
+
+    ranks = [
+        multiprocessing.Process(
+            target=rank_main,
+            args=(
+                rank,
+                nranks,
+                rundir,
+                mode,
+                transfer_size,
+                count,
+                direct,
+                rank_evictor,
+                barrier,
+                queue,
+            ),
+        )
+        for rank in range(nranks)
+    ]
+
+    for proc in ranks:
+        proc.start()
+
+    reports = []
+    try:
+        while len(reports) < nranks:
+            try:
+                reports.append(queue.get(timeout=1))
+            except Empty:
+                # A rank that died without reporting would block us forever
+                if any(proc.exitcode not in (None, 0) for proc in ranks):
+                    barrier.abort()
+                    raise OSError(
+                        "ior rank exited unexpectedly in {} mode".format(mode)
+                    )
+    finally:
+        for proc in ranks:
+            proc.join()
+
+    reports.sort(key=lambda report: report["rank"])
+
+    errors = [report["error"] for report in reports if report["error"]]
+    if errors:
+        raise OSError("ior {} mode failed: {}".format(mode, errors[0]))
+
+    # Only rank 0 evicts, the others report no eviction
+    evictor.merge(reports[0]["cold_cache"])
+
+    result = {"direct": all(report["direct"] for report in reports)}
+    for phase in ("write", "read"):
+        result[phase] = summarize(
+            [report["timings"][phase] for report in reports], transfer_size * count
+        )
+
+        # Per-transfer latency over all ranks
+        latencies = histogram.Histogram()
+        for report in reports:
+            latencies.merge(report["latencies"][phase])
+        result[phase]["latency_ms"] = latencies.summary()
+        result[phase]["histogram"] = latencies.to_dict()
+
+    return result
+
+
+def run_ior(rundir=".", conf=None, mp_num=multiprocessing.cpu_count()):
+    """Run the parallel shared-file / file-per-process benchmark.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the ior configuration section.
+      mp_num: The number of processes (ranks) to spawn.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    nranks = int(mp_num)
+    _log.debug(
+        "Running ior with rundir=%s ranks=%s settings=%s", rundir, nranks, settings
+    )
+
+    result = {"ior": {"unit": "MB/s", "ranks": nranks}}
+    evictor = pagecache.Evictor(settings["cold_cache"], settings["drop_caches"])
+    filesystem = result["ior"]["filesystem"] = seqio.probe_rundir(rundir)
+
+    try:
+        transfer_size = utils.parse_size(settings["transfer_size"])
+        count = max(1, utils.parse_size(settings["segment_size"]) // transfer_size)
+        direct = seqio.check_direct(
+            transfer_size,
+            filesystem["alignment"],
+            seqio.probe_direct(rundir, settings["direct"]),
+        )
+        result["ior"].update(
+            {"transfer_size": transfer_size, "segment_size": transfer_size * count}
+        )
+
+        for mode in settings["modes"]:
+            if mode not in ("shared", "fpp"):
+                raise ValueError("Invalid ior mode: {}".format(mode))
+
+            _log.info("Running ior in %s mode with %s ranks", mode, nranks)
+            result["ior"][mode] = run_mode(
+                rundir, mode, nranks, transfer_size, count, direct, evictor
+            )
+
+    except (OSError, ValueError):
+        _log.exception("ior benchmark failed.")
+        return 1
+
+    finally:
+        for mode in ("shared", "fpp"):
+            for rank in range(nranks):
+                if os.path.exists(data_path(rundir, mode, rank)):
+                    os.remove(data_path(rundir, mode, rank))
+
+    result["ior"]["cold_cache"] = evictor.report()
+
+    # Save result to json
+    with open(os.path.join(rundir, "ior_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from ior: %s", result)
+
+    return 0
@@ -0,0 +1,216 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import errno
+import fcntl
+import logging
+import os
+import socket
+import stat
+import time
+
+_log = logging.getLogger(__name__)
+
+# Well-known path shared by all suite instances of a node. Containers
+# must bind-mount it from the host for the lock to be node-wide.
+LOCK_PATH = "/tmp/iobmk.lock"
+
+# wait:    block until the lock is free
+# timeout: wait up to timeout seconds, then skip the benchmark
+# skip:    skip the benchmark if the lock is held
+POLICIES = ("wait", "timeout", "skip")
+
+# Seconds between attempts while waiting for the lock
+POLL_INTERVAL = 0.5
+
+
+class BenchmarkLock:
+    """Node-wide advisory lock held by a suite while it measures.
+
+    Uses flock on LOCK_PATH, so the lock is released by the kernel if
+    the holder dies. The holder writes its pid, host and benchmark in
+    the file to tell the others who they are waiting for.
+
+    The path is well known and usually in /tmp, so symlinks are never
+    followed, and only a regular file owned by the suite's user with a
+    single link is ever modified: another user cannot make a suite
+    running as root truncate or chmod a file of their choice.
+
+    Args:
+      path:    Lock file.
+      policy:  One of POLICIES.
+      timeout: Seconds to wait with the timeout policy.
+    """
+
+    def __init__(self, path=LOCK_PATH, policy="wait", timeout=3600):
+        if policy not in POLICIES:
+            raise ValueError(
+                "Invalid lock policy {}, choose one of {}".format(policy, POLICIES)
+            )
+
+        self.path = path
+        self.policy = policy
+        self.timeout = timeout
+        self._fd = None
+
+    def holder(self):
+        """Owner written in the lock file by the current holder."""
+        try:
+            with open(self.path, "r") as fin:
+                return fin.read().strip() or "unknown"
+        except OSError:
+            return "unknown"
+
+    def acquire(self, owner):
+        """Take the lock following the policy.
+
+        Args:
+          owner: Name of the benchmark about to be measured.
+
+        Returns:
+          A dict with the policy, whether the lock was taken or the
+          benchmark must be skipped, the time waited in seconds and the
+          holder that was waited for. Without access to the lock file
+          neither locked nor skipped is set.
+        """
+        status = {
+            "path": self.path,
+            "policy": self.policy,
+            "locked": False,
+            "skipped": False,
+            "wait_s": 0.0,
+            "holder": None,
+        }
+
+        fd = self._open()
+        if fd is None:
+            return status
+
+        deadline = {"wait": None, "timeout": self.timeout, "skip": 0}[self.policy]
+        start = time.monotonic()
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                pass
+
+            if status["holder"] is None:
+                status["holder"] = self.holder()
+                _log.info(
+                    "Node lock %s is held by %s, policy: %s",
+                    self.path,
+                    status["holder"],
+                    self.policy,
+                )
+
+            if deadline is not None and time.monotonic() - start >= deadline:
+                os.close(fd)
+                status["wait_s"] = round(time.monotonic() - start, 3)
+                status["skipped"] = True
+                return status
+
+            time.sleep(POLL_INTERVAL)
+
+        status["wait_s"] = round(time.monotonic() - start, 3)
+        status["locked"] = True
+        self._fd = fd
+
+        if self._owned(fd):
+            try:
+                os.ftruncate(fd, 0)
+                os.pwrite(
+                    fd,
+                    "pid {} on {}: {}\n".format(
+                        os.getpid(), socket.gethostname(), owner
+                    ).encode(),
+                    0,
+                )
+            except OSError:
+                # Opened read-only
+                pass
+
+        return status
+
+    @staticmethod
+    def _owned(fd):
+        """True if the lock file is ours to modify.
+
+        A file of another user, or one hard-linked elsewhere, is only
+        locked, never written.
+        """
+        info = os.fstat(fd)
+        return info.st_uid == os.geteuid() and info.st_nlink == 1
+
+    def _open(self):
+        """Open the lock file without following symlinks.
+
+        A new lock file is created writable by all users.
+
+        Returns:
+          A file descriptor, None if the file cannot be opened or is not
+          a regular file.
+        """
+        # A FIFO planted at the path must not block the open
+        extra = getattr(os, "O_NOFOLLOW", 0) | os.O_NONBLOCK
+        created = False
+        fd = None
+
+        # flock works on read-only descriptors too, e.g. on the lock
+        # file of another user
+        for flags in (
+            os.O_RDWR | os.O_CREAT | os.O_EXCL,
+            os.O_RDWR,
+            os.O_RDONLY,
+        ):
+            try:
+                fd = os.open(self.path, flags | extra, 0o666)
+                created = bool(flags & os.O_CREAT)
+                break
+            except FileExistsError:
+                continue
+            except OSError as err:
+                error = err
+                if err.errno == errno.ELOOP:
+                    break
+
+        if fd is None:
+            _log.warning(
+                "Unable to open lock file %s, running unlocked: %s", self.path, error
+            )
+            return None
+
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            os.close(fd)
+            _log.warning(
+                "Lock file %s is not a regular file, running unlocked.", self.path
+            )
+            return None
+
+        if created:
+            try:
+                # The umask would lock out the instances of other users
+                os.fchmod(fd, 0o666)
+            except OSError:
+                pass
+
+        return fd
+
+    def release(self):
+        """Release the lock if held."""
+        if self._fd is None:
+            return
+
+        if self._owned(self._fd):
+            try:
+                os.ftruncate(self._fd, 0)
+            except OSError:
+                pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
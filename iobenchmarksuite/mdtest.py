@@ -0,0 +1,241 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from queue import Empty
+
+from iobenchmarksuite import histogram
+
+_log = logging.getLogger(__name__)
+
+# Values used when the mdtest section of the configuration omits a key
+DEFAULTS = {
+    "files_per_rank": 10000,
+    "fanout": 16,
+    "file_size": 0,
+}
+
+# Phases in execution order, each one touches every file once
+PHASES = ("create", "stat", "rename", "unlink")
+
+# Seconds a rank waits at a barrier before giving up on its peers
+BARRIER_TIMEOUT = 600
+
+
+def required_inodes(conf, mp_num):
+    """Estimate the number of inodes the benchmark needs.
+
+    Args:
+      conf:   A dict with the mdtest configuration section.
+      mp_num: The number of processes (ranks).
+
+    Returns:
+      An int with the number of inodes.
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+
+    # Files plus the fan-out directories and one top directory per rank
+    per_rank = int(settings["files_per_rank"]) + int(settings["fanout"]) + 1
+    return int(mp_num) * per_rank + 1
+
+
+def file_path(workdir, rank, fanout, index, suffix=""):
+    """Path of a file, spread round-robin over the fan-out directories."""
+    return os.path.join(
+        workdir,
+        "rank.{}".format(rank),
+        "dir.{}".format(index % fanout),
+        "file.{}{}".format(index, suffix),
+    )
+
+
+def rank_phase(phase, workdir, rank, files, fanout, payload):
+    """Run one phase over all the files of a rank.
+
+    Returns:
+      A tuple (start, end, Histogram of the op latencies) with
+      perf_counter timestamps.
+    """
+    latencies = histogram.Histogram()
+    start = time.perf_counter()
+    issued = start
+
+    for index in range(files):
+        path = file_path(workdir, rank, fanout, index)
+
+        if phase == "create":
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            if payload:
+                os.write(fd, payload)
+            os.close(fd)
+        elif phase == "stat":
+            os.stat(path)
+        elif phase == "rename":
+            os.rename(path, path + ".mv")
+        elif phase == "unlink":
+            os.unlink(path + ".mv")
+
+        now = time.perf_counter()
+        latencies.record(now - issued)
+        issued = now
+
+    return start, issued, latencies
+
+
+def rank_main(rank, workdir, files, fanout, file_size, barrier, queue):
+    """Body of a single rank.
+
+    Every phase starts on a barrier, so all the ranks run it together and
+    the phase is timed from the barrier release.
+    """
+    payload = b"\0" * file_size
+    timings = {}
+    latencies = {}
+
+    try:
+        for subdir in range(fanout):
+            os.makedirs(
+                os.path.join(workdir, "rank.{}".format(rank), "dir.{}".format(subdir)),
+                exist_ok=True,
+            )
+
+        for phase in PHASES:
+            barrier.wait(BARRIER_TIMEOUT)
+            start, end, latencies[phase] = rank_phase(
+                phase, workdir, rank, files, fanout, payload
+            )
+            timings[phase] = (start, end)
+
+        error = None
+
+    except (OSError, threading.BrokenBarrierError) as err:
+        # Release the peers blocked on the barrier
+        barrier.abort()
+        error = str(err)
+
+    queue.put(
+        {"rank": rank, "timings": timings, "latencies": latencies, "error": error}
+    )
+
+
+def run_ranks(workdir, nranks, files, fanout, file_size):
+    """Run all the phases with nranks processes.
+
+    Returns:
+      A list with the report of each rank.
+    """
+    barrier = multiprocessing.Barrier(nranks)
+    queue = multiprocessing.Queue()
+
+    ranks = [
+        multiprocessing.Process(
+            target=rank_main,
+            args=(rank, workdir, files, fanout, file_size, barrier, queue),
+        )
+        for rank in range(nranks)
+    ]
+
+    for proc in ranks:
+        proc.start()
+
+    reports = []
+    try:
+        while len(reports) < nranks:
+            try:
+                reports.append(queue.get(timeout=1))
+            except Empty:
+                # A rank that died without reporting would block us forever
+                if any(proc.exitcode not in (None, 0) for proc in ranks):
+                    barrier.abort()
+                    raise OSError("mdtest rank exited unexpectedly")
+    finally:
+        for proc in ranks:
+            proc.join()
+
+    errors = [report["error"] for report in reports if report["error"]]
+    if errors:
+        raise OSError("mdtest failed: {}".format(errors[0]))
+
+    return sorted(reports, key=lambda report: report["rank"])
+
+
+def run_mdtest(rundir=".", conf=None, mp_num=multiprocessing.cpu_count()):
+    """Run the metadata operations benchmark and save its result.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the mdtest configuration section.
+      mp_num: The number of processes (ranks).
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    _log.debug(
+        "Running mdtest with rundir=%s ranks=%s settings=%s", rundir, mp_num, settings
+    )
+
+    workdir = os.path.join(rundir, "MDTEST")
+
+    # A killed or resumed run leaves its tree behind, and creates use O_EXCL
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    try:
+        nranks = int(mp_num)
+        files = int(settings["files_per_rank"])
+        fanout = max(1, int(settings["fanout"]))
+        file_size = int(settings["file_size"])
+
+        _log.info("Running mdtest with %s ranks", nranks)
+        reports = run_ranks(workdir, nranks, files, fanout, file_size)
+
+    except (OSError, ValueError):
+        _log.exception("mdtest benchmark failed.")
+        return 1
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "mdtest": {
+            "unit": "op/s",
+            "ranks": nranks,
+            "files_per_rank": files,
+            "fanout": fanout,
+            "latency_ms": {},
+            "histograms": {},
+        }
+    }
+
+    for phase in PHASES:
+        timings = [report["timings"][phase] for report in reports]
+        # The phase lasts from the barrier release to the last rank finishing
+        wall = max(end for _, end in timings) - min(start for start, _ in timings)
+        result["mdtest"][phase] = round(files * nranks / max(wall, 1e-9), 2)
+
+        latencies = histogram.Histogram()
+        for report in reports:
+            latencies.merge(report["latencies"][phase])
+        result["mdtest"]["latency_ms"][phase] = latencies.summary()
+        result["mdtest"]["histograms"][phase] = latencies.to_dict()
+
+    # Save result to json
+    with open(os.path.join(rundir, "mdtest_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from mdtest: %s", result)
+
+    return 0
@@ -0,0 +1,197 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import mmap
+import os
+
+_log = logging.getLogger(__name__)
+
+DROP_CACHES = "/proc/sys/vm/drop_caches"
+
+# Fraction of pages still resident above which an eviction is not verified
+RESIDENT_THRESHOLD = 0.01
+
+PROT_READ = 0x1
+MAP_SHARED = 0x01
+
+
+def _load_libc():
+    """Load libc with the prototypes needed for mincore, or None."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_size_t,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_long,
+        ]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mincore.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_size_t,
+            ctypes.POINTER(ctypes.c_ubyte),
+        ]
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+_LIBC = _load_libc()
+_MAP_FAILED = ctypes.c_void_p(-1).value
+
+
+def residency(path):
+    """Fraction of the pages of a file currently in the page cache.
+
+    The file is mapped read-only and queried with mincore, which does not
+    fault any page in.
+
+    Args:
+      path: Path of the file.
+
+    Returns:
+      A float between 0 and 1, or None if it cannot be determined.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0.0
+    if _LIBC is None:
+        return None
+
+    pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    vec = (ctypes.c_ubyte * pages)()
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        addr = _LIBC.mmap(None, size, PROT_READ, MAP_SHARED, fd, 0)
+        if addr in (None, _MAP_FAILED):
+            return None
+        try:
+            if _LIBC.mincore(addr, size, vec) != 0:
+                return None
+        finally:
+            _LIBC.munmap(addr, size)
+    finally:
+        os.close(fd)
+
+    return sum(page & 1 for page in vec) / pages
+
+
+def fadvise_dontneed(path):
+    """Ask the kernel to drop the cached pages of a file.
+
+    Dirty pages cannot be dropped, so the file is synced first.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def drop_caches():
+    """Drop the whole page cache, needs root.
+
+    Returns:
+      True if the caches were dropped.
+    """
+    if os.geteuid() != 0:
+        return False
+
+    os.sync()
+    try:
+        with open(DROP_CACHES, "w") as fout:
+            fout.write("1")
+    except OSError as err:
+        # Read-only /proc inside containers
+        _log.warning("Unable to drop caches: %s", err)
+        return False
+
+    return True
+
+
+class Evictor:
+    """Evict benchmark files from the page cache and record how it went.
+
+    Args:
+      enabled:     Perform evictions at all.
+      drop_caches: Prefer /proc/sys/vm/drop_caches when running as root.
+    """
+
+    def __init__(self, enabled=False, drop_caches=False):
+        self.enabled = enabled
+        self.use_drop_caches = drop_caches
+        self.method = None
+        self.evictions = 0
+        self.max_resident = 0.0
+        self.verified = True
+
+    def evict(self, paths):
+        """Evict the given files and verify their residency with mincore."""
+        if not self.enabled:
+            return
+
+        method = "fadvise"
+        if self.use_drop_caches and drop_caches():
+            method = "drop_caches"
+        else:
+            for path in paths:
+                fadvise_dontneed(path)
+
+        # Report the weakest method used over the whole run
+        if self.method is None or method == "fadvise":
+            self.method = method
+
+        for path in paths:
+            resident = residency(path)
+            if resident is None:
+                self.verified = None
+                continue
+
+            self.max_resident = max(self.max_resident, resident)
+            if resident > RESIDENT_THRESHOLD and self.verified is not None:
+                _log.warning(
+                    "%.1f%% of %s still cached after eviction.", resident * 100, path
+                )
+                self.verified = False
+
+        self.evictions += 1
+
+    def report(self):
+        """Summary of the evictions, stored in the benchmark profile."""
+        if not self.enabled:
+            return {"enabled": False}
+
+        return {
+            "enabled": True,
+            "method": self.method,
+            "evictions": self.evictions,
+            "verified": self.verified,
+            "max_resident_pct": round(self.max_resident * 100, 2),
+        }
+
+    def merge(self, report):
+        """Fold the report of an Evictor that ran in another process."""
+        if not report.get("enabled") or not report["evictions"]:
+            return
+
+        if self.method is None or report["method"] == "fadvise":
+            self.method = report["method"]
+        self.evictions += report["evictions"]
+        self.max_resident = max(self.max_resident, report["max_resident_pct"] / 100)
+        if report["verified"] is None or self.verified is None:
+            self.verified = None
+        else:
+            self.verified = self.verified and report["verified"]
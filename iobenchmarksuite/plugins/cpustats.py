@@ -0,0 +1,156 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+
+from iobenchmarksuite.plugins.sampler import Sampler
+
+PROC_STAT = "/proc/stat"
+PRESSURE = "/proc/pressure"
+
+# Columns of the cpu line of /proc/stat, in file order
+CPU_FIELDS = (
+    "user",
+    "nice",
+    "system",
+    "idle",
+    "iowait",
+    "irq",
+    "softirq",
+    "steal",
+)
+
+# CPU time shares reported, nice and irq time are folded into user/system
+CPU_SERIES = ("user", "system", "iowait", "steal")
+
+# Pressure Stall Information resources and lines
+PSI_RESOURCES = ("io", "cpu", "memory")
+PSI_KINDS = ("some", "full")
+
+
+def parse_cpu(text):
+    """Parse the aggregated cpu line of /proc/stat.
+
+    Returns:
+      A dict with the jiffies of each CPU_FIELDS column.
+    """
+    for line in text.splitlines():
+        if line.startswith("cpu "):
+            values = [int(value) for value in line.split()[1:]]
+            values += [0] * (len(CPU_FIELDS) - len(values))
+            return dict(zip(CPU_FIELDS, values))
+    raise ValueError("No cpu line in {}".format(PROC_STAT))
+
+
+def parse_pressure(text):
+    """Parse a /proc/pressure file.
+
+    Returns:
+      A dict {"some": total stall us, "full": total stall us}.
+    """
+    totals = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if fields and fields[0] in PSI_KINDS:
+            for item in fields[1:]:
+                key, _, value = item.partition("=")
+                if key == "total":
+                    totals[fields[0]] = int(value)
+    return totals
+
+
+class CPUStatsSampler(Sampler):
+    """CPU time shares and Pressure Stall Information.
+
+    Reports the share of CPU time spent in user, system, iowait and steal,
+    and the share of wall time some (or all) tasks stalled on io, cpu and
+    memory. Pressure needs Linux 4.20 with PSI enabled and is skipped
+    otherwise.
+
+    Args:
+      interval: Seconds between snapshots.
+    """
+
+    name = "cpustats"
+
+    def __init__(self, interval=1.0):
+        super().__init__(interval)
+        self.timestamps = []
+        self.durations = []
+        self.series = {key: [] for key in CPU_SERIES}
+
+    @classmethod
+    def available(cls):
+        return os.access(PROC_STAT, os.R_OK)
+
+    def snapshot(self):
+        with open(PROC_STAT, "r") as fin:
+            snap = {"stat": parse_cpu(fin.read())}
+
+        for resource in PSI_RESOURCES:
+            try:
+                with open(os.path.join(PRESSURE, resource), "r") as fin:
+                    snap[resource] = parse_pressure(fin.read())
+            except OSError:
+                # No PSI support, or disabled with psi=0
+                continue
+
+        return snap
+
+    def record(self, elapsed, delta, previous, current):
+        cpu = {key: current["stat"][key] - previous["stat"][key] for key in CPU_FIELDS}
+        busy = {
+            "user": cpu["user"] + cpu["nice"],
+            "system": cpu["system"] + cpu["irq"] + cpu["softirq"],
+            "iowait": cpu["iowait"],
+            "steal": cpu["steal"],
+        }
+        jiffies = max(sum(cpu.values()), 1)
+
+        self.timestamps.append(elapsed)
+        self.durations.append(delta)
+        for key in CPU_SERIES:
+            self.series[key].append(round(busy[key] * 100 / jiffies, 1))
+
+        for resource in PSI_RESOURCES:
+            for kind in PSI_KINDS:
+                try:
+                    stall = current[resource][kind] - previous[resource][kind]
+                except KeyError:
+                    continue
+                name = "{}_{}".format(resource, kind)
+                # Pad resources showing up late, e.g. after a failed read
+                values = self.series.setdefault(
+                    name, [None] * (len(self.timestamps) - 1)
+                )
+                values.append(round(min(100.0, stall / delta / 1e4), 1))
+
+        # Keep series missing a value in this interval aligned with t
+        for values in self.series.values():
+            if len(values) < len(self.timestamps):
+                values.append(None)
+
+    def report(self):
+        """Percent time series with their time-weighted mean and max."""
+        summary = {}
+        for key, values in self.series.items():
+            # Intervals without a value do not count
+            known = [(v, d) for v, d in zip(values, self.durations) if v is not None]
+            duration = max(sum(d for _, d in known), 1e-9)
+            summary[key] = {
+                "mean": round(sum(v * d for v, d in known) / duration, 1),
+                "max": max((v for v, _ in known), default=0.0),
+            }
+
+        return {
+            "interval": self.interval,
+            "unit": "%",
+            "t": self.timestamps,
+            "series": self.series,
+            "summary": summary,
+        }
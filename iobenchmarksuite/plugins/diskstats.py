@@ -0,0 +1,174 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+
+from iobenchmarksuite.plugins.sampler import Sampler
+
+DISKSTATS = "/proc/diskstats"
+SYS_BLOCK = "/sys/block"
+
+# /proc/diskstats always counts 512-byte sectors
+SECTOR_SIZE = 512
+
+# Devices that never back a benchmark rundir
+IGNORED_PREFIXES = ("loop", "ram", "zram")
+
+
+def parse_diskstats(text):
+    """Parse /proc/diskstats.
+
+    Returns:
+      A dict {device: (reads, sectors read, writes, sectors written,
+      ms doing I/O, weighted ms doing I/O)}.
+    """
+    stats = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 14:
+            continue
+        stats[fields[2]] = (
+            int(fields[3]),
+            int(fields[5]),
+            int(fields[7]),
+            int(fields[9]),
+            int(fields[12]),
+            int(fields[13]),
+        )
+    return stats
+
+
+def whole_disks():
+    """Names of the block devices excluding partitions and virtual ones."""
+    try:
+        names = os.listdir(SYS_BLOCK)
+    except OSError:
+        return None
+
+    # Names with a slash, e.g. cciss/c0d0, appear with a "!" in sysfs
+    return {
+        name.replace("!", "/")
+        for name in names
+        if not name.startswith(IGNORED_PREFIXES)
+    }
+
+
+class DiskStatsSampler(Sampler):
+    """Per-device throughput, IOPS, utilization and queue size.
+
+    Args:
+      interval: Seconds between snapshots.
+      devices:  Device names to sample, all whole disks by default.
+    """
+
+    name = "diskstats"
+
+    # Time series kept for each device
+    SERIES = (
+        "read_MBps",
+        "write_MBps",
+        "read_iops",
+        "write_iops",
+        "util_pct",
+        "avg_queue",
+    )
+
+    def __init__(self, interval=1.0, devices=None):
+        super().__init__(interval)
+        self.devices = set(devices) if devices else whole_disks()
+        self.timestamps = []
+        self.series = {}
+        self.totals = {}
+
+    @classmethod
+    def available(cls):
+        return os.access(DISKSTATS, os.R_OK)
+
+    def snapshot(self):
+        with open(DISKSTATS, "r") as fin:
+            stats = parse_diskstats(fin.read())
+
+        if self.devices is None:
+            return stats
+        return {dev: val for dev, val in stats.items() if dev in self.devices}
+
+    def record(self, elapsed, delta, previous, current):
+        self.timestamps.append(elapsed)
+        index = len(self.timestamps) - 1
+
+        for dev, cur in current.items():
+            prev = previous.get(dev)
+            if prev is None:
+                continue
+
+            reads, rsect, writes, wsect, busy, weighted = (
+                max(0, c - p) for c, p in zip(cur, prev)
+            )
+
+            if dev not in self.series:
+                # Devices appearing mid-run are padded up to now
+                self.series[dev] = {key: [None] * index for key in self.SERIES}
+                self.totals[dev] = {
+                    "reads": 0,
+                    "writes": 0,
+                    "read_bytes": 0,
+                    "write_bytes": 0,
+                    "busy_ms": 0,
+                }
+
+            series = self.series[dev]
+            series["read_MBps"].append(round(rsect * SECTOR_SIZE / delta / 1e6, 3))
+            series["write_MBps"].append(round(wsect * SECTOR_SIZE / delta / 1e6, 3))
+            series["read_iops"].append(round(reads / delta, 1))
+            series["write_iops"].append(round(writes / delta, 1))
+            series["util_pct"].append(min(100.0, round(busy / delta / 10, 1)))
+            series["avg_queue"].append(round(weighted / delta / 1000, 2))
+
+            totals = self.totals[dev]
+            totals["reads"] += reads
+            totals["writes"] += writes
+            totals["read_bytes"] += rsect * SECTOR_SIZE
+            totals["write_bytes"] += wsect * SECTOR_SIZE
+            totals["busy_ms"] += busy
+
+        # Keep the series of devices gone or not yet readable aligned with t
+        for series in self.series.values():
+            for values in series.values():
+                if len(values) == index:
+                    values.append(None)
+
+    def report(self):
+        """Time series of the devices with any activity during the run."""
+        devices = {}
+        duration = self.timestamps[-1] if self.timestamps else 0.0
+
+        for dev, totals in sorted(self.totals.items()):
+            if not totals["reads"] and not totals["writes"]:
+                continue
+
+            series = self.series[dev]
+            devices[dev] = dict(series)
+            devices[dev]["total"] = {
+                "reads": totals["reads"],
+                "writes": totals["writes"],
+                "read_bytes": totals["read_bytes"],
+                "write_bytes": totals["write_bytes"],
+                "util_pct": round(
+                    min(100.0, totals["busy_ms"] / max(duration, 1e-9) / 10), 1
+                ),
+                "max_queue": max(
+                    (value for value in series["avg_queue"] if value is not None),
+                    default=0,
+                ),
+            }
+
+        return {
+            "interval": self.interval,
+            "t": self.timestamps,
+            "devices": devices,
+        }
@@ -6,18 +6,42 @@
 ###############################################################################
 """
 
+import hashlib
 import json
 import logging
+import mmap
 import os
 import platform
 import re
-from subprocess import Popen, PIPE
+import signal
+from subprocess import Popen, PIPE, TimeoutExpired
+from concurrent.futures import ThreadPoolExecutor
 import socket
 import sys
 import shutil
+import time
+
+from iobenchmarksuite.plugins import procfs
 
 _log = logging.getLogger(__name__)
 
+SYS_BLOCK = '/sys/block'
+SYS_DEV_BLOCK = '/sys/dev/block'
+MOUNTINFO = '/proc/self/mountinfo'
+BOOT_ID = '/proc/sys/kernel/random/boot_id'
+SYS_DMI = '/sys/class/dmi/id'
+
+# World-readable DMI attributes that identify the hardware
+DMI_FINGERPRINT = ('sys_vendor', 'product_name', 'product_version', 'board_name',
+                   'bios_version', 'bios_date')
+
+# Bumped whenever the layout of the cached metadata changes
+CACHE_VERSION = 3
+
+# Filesystem types whose results do not reflect a local disk
+TMPFS_TYPES = ('tmpfs', 'ramfs')
+NFS_TYPES = ('nfs', 'nfs4')
+
 
 class Extractor():
     """********************************************************
@@ -30,6 +54,12 @@ class Extractor():
 
     *********************************************************"""
 
+    # Seconds a metadata command may run before it is killed
+    CMD_TIMEOUT = 60
+
+    # Number of collectors run at the same time
+    MAX_WORKERS = 4
+
     def __init__(self, extra):
         """Initialize setup."""
         self.data = {}
@@ -63,12 +93,25 @@ class Extractor():
 
         _log.debug("Installed packages: %s", self.pkg)
 
+    @property
+    def privileged(self):
+        """True if running as super-user, i.e. full metadata is available."""
+        return self._permission
+
     def exec_cmd(self, cmd_str):
         """Accept command string and returns output."""
         _log.debug("Excuting command: %s", cmd_str)
 
-        cmd = Popen(cmd_str, shell=True, executable='/bin/bash',  stdout=PIPE, stderr=PIPE)
-        cmd_reply, cmd_error = cmd.communicate()
+        # Own session, so a timeout kills the whole pipeline
+        cmd = Popen(cmd_str, shell=True, executable='/bin/bash',  stdout=PIPE, stderr=PIPE,
+                    start_new_session=True)
+        try:
+            cmd_reply, cmd_error = cmd.communicate(timeout=self.CMD_TIMEOUT)
+        except TimeoutExpired:
+            os.killpg(cmd.pid, signal.SIGKILL)
+            cmd.communicate()
+            _log.error("Command timed out after %ss: %s", self.CMD_TIMEOUT, cmd_str)
+            return "not_available"
 
         # Check for errors
         if cmd.returncode != 0:
@@ -109,19 +152,41 @@ class Extractor():
         return software
 
     def collect_cpu(self):
-        """Collect all relevant CPU information."""
+        """Collect all relevant CPU information.
+
+        Read from /proc/cpuinfo and sysfs in-process; lscpu is only run if
+        cpuinfo does not describe the CPU model.
+        """
         _log.info("Collecting CPU information.")
 
-        # Get the parsing result from lscpu
-        cpu = self.get_cpu_parser(self.exec_cmd("lscpu"))
+        processors = procfs.read_cpuinfo() or [{}]
+        cpu = procfs.cpu_topology(processors)
+        if cpu is None:
+            # Get the parsing result from lscpu
+            cpu = self.get_cpu_parser(self.exec_cmd("lscpu"))
 
         # Update with additional data
-        cpu.update({
-            'Power_Policy': self.exec_cmd("cat /sys/devices/system/cpu/cpu*/cpufreq/scaling_governor | sort | uniq"),
-            'Power_Driver': self.exec_cmd("cat /sys/devices/system/cpu/cpu*/cpufreq/scaling_driver   | sort | uniq"),
-            'Microcode'   : self.exec_cmd("grep microcode /proc/cpuinfo | uniq | awk 'NR==1{print $3}'"),
-            'SMT_Enabled?': bool(self.exec_cmd("cat /sys/devices/system/cpu/smt/active"))
-        })
+        cpu['Microcode'] = processors[0].get('microcode', 'not_available')
+        cpu.update(Extractor.get_cpu_volatile(processors, cpu['Threads_per_core']))
+
+        return cpu
+
+    @staticmethod
+    def get_cpu_volatile(processors, threads_per_core):
+        """CPU fields that change at runtime: frequency, governor and SMT."""
+        smt = procfs.smt_active()
+
+        cpu = {
+            'Power_Policy': '\n'.join(procfs.read_cpufreq('scaling_governor')) or 'not_available',
+            'Power_Driver': '\n'.join(procfs.read_cpufreq('scaling_driver')) or 'not_available',
+            'SMT_Enabled?': threads_per_core > 1 if smt is None else smt
+        }
+
+        try:
+            cpu['CPU_MHz'] = float(processors[0]['cpu MHz'])
+        except (KeyError, ValueError):
+            # Not in cpuinfo on most ARM kernels, keep the lscpu value
+            pass
 
         return cpu
 
@@ -146,11 +211,11 @@ class Extractor():
             'Architecture'     : conv("Architecture"),
             'CPU_Model'        : conv("Model name"),
             'CPU_Family'       : conv("CPU family"),
-            'CPU_num'          : conv(r"CPU\(s\)", int),
-            'Online_CPUs_list' : conv(r"On-line CPU\(s\) list"),
-            'Threads_per_core' : conv(r"Thread\(s\) per core", int),
-            'Cores_per_socket' : conv(r"Core\(s\) per socket", int),
-            'Sockets'          : conv(r"Socket\(s\)", int),
+            'CPU_num'          : conv("CPU(s)", int),
+            'Online_CPUs_list' : conv("On-line CPU(s) list"),
+            'Threads_per_core' : conv("Thread(s) per core", int),
+            'Cores_per_socket' : conv("Core(s) per socket", int),
+            'Sockets'          : conv("Socket(s)", int),
             'Vendor_ID'        : conv("Vendor ID"),
             'Stepping'         : conv("Stepping"),
             'CPU_MHz'          : conv("CPU MHz", float),
@@ -159,12 +224,12 @@ class Extractor():
             'BogoMIPS'         : conv("BogoMIPS", float),
             'L2_cache'         : conv("L2 cache"),
             'L3_cache'         : conv("L3 cache"),
-            'NUMA_nodes'       : conv(r"NUMA node\(s\)", int),
+            'NUMA_nodes'       : conv("NUMA node(s)", int),
         }
         # Populate NUMA nodes
         try:
             for i in range(0, int(cpu['NUMA_nodes'])):
-                cpu['NUMA_node{}_CPUs'.format(i)] = parse_lscpu(r"NUMA node{} CPU\(s\)".format(i))
+                cpu['NUMA_node{}_CPUs'.format(i)] = parse_lscpu("NUMA node{} CPU(s)".format(i))
         except ValueError:
             _log.warning('Failed to parse or NUMA nodes not existent.')
 
@@ -227,44 +292,52 @@ class Extractor():
         else:
             mem = {}
 
-        mem.update({
-            'Mem_Total'    : int(self.exec_cmd("free | awk 'NR==2{print $2}'")),
-            'Mem_Available': int(self.exec_cmd("free | awk 'NR==2{print $7}'")),
-            'Mem_Swap'     : int(self.exec_cmd("free | awk 'NR==3{print $2}'"))
-        })
+        meminfo = procfs.read_meminfo()
+        if meminfo is not None:
+            mem.update({
+                'Mem_Total'    : meminfo.get('MemTotal', -1),
+                'Mem_Available': meminfo.get('MemAvailable', meminfo.get('MemFree', -1)),
+                'Mem_Swap'     : meminfo.get('SwapTotal', -1)
+            })
+        else:
+            mem.update({
+                'Mem_Total'    : int(self.exec_cmd("free | awk 'NR==2{print $2}'")),
+                'Mem_Available': int(self.exec_cmd("free | awk 'NR==2{print $7}'")),
+                'Mem_Swap'     : int(self.exec_cmd("free | awk 'NR==3{print $2}'"))
+            })
 
         return mem
 
     @staticmethod
     def get_mem_parser(cmd_output):
         """Memory parser for dmidecode."""
-        # Regex for matches
-        reg_size = re.compile(r'(?P<Field>Size:\s*\s)(?P<value>(?!No Module Installed).*\S)')
-        reg_part = re.compile(r'(?P<Field>Part Number:\s*\s)(?P<value>(?!NO DIMM).*\S)')
-        reg_man  = re.compile(r'(?P<Field>Manufacturer:\s*\s)(?P<value>(?!NO DIMM).*\S)')
-        reg_type = re.compile(r'(?P<Field>Type:\s*\s)(?P<value>(?!Unknown).*\S)')
-
-        # Return iterators containing matches
-        result_size = re.finditer(reg_size, cmd_output)
-        result_part = re.finditer(reg_part, cmd_output)
-        result_man  = re.finditer(reg_man,  cmd_output)
-        result_type = re.finditer(reg_type, cmd_output)
-
-        count = 1
         mem = {}
 
-        # Loop at same time each iterator
-        for size, part, man, typ in zip(result_size, result_part, result_man, result_type):
-            mem["dimm" + str(count)] = "{0} {1} | {2} | {3}".format(size.group('value'),
-                                                                typ.group('value'),
-                                                                man.group('value'),
-                                                                part.group('value'))
-            count += 1
+        keys = ('Size', 'Locator', 'Type', 'Manufacturer', 'Part Number')
+        for block in Extractor.parse_blocks(cmd_output, 'Handle ', keys):
+            size = block.get('Size', 'not_available')
+
+            # Only Memory Device blocks have a Locator
+            if 'Locator' not in block:
+                continue
+
+            # Skip the empty slots, reported either way depending on the BIOS
+            if (size.startswith('No Module Installed')
+                    or block.get('Manufacturer', '').startswith('NO DIMM')
+                    or block.get('Part Number', '').startswith('NO DIMM')
+                    or block.get('Type') == 'Unknown'):
+                continue
+
+            mem["dimm" + str(len(mem) + 1)] = "{0} {1} | {2} | {3}".format(
+                size,
+                block.get('Type', 'not_available'),
+                block.get('Manufacturer', 'not_available'),
+                block.get('Part Number', 'not_available'))
 
         return mem
 
     def collect_storage(self):
-        """Collect system memory."""
+        """Collect system storage."""
         _log.info("Collecting system storage.")
 
         if self.pkg['lshw'] and self._permission:
@@ -277,52 +350,255 @@ class Extractor():
         else:
             storage = {}
 
+        # Queue settings are world-readable in sysfs, no privileges needed
+        storage['Block_Devices'] = Extractor.get_block_queues()
+
         return storage
 
+    @staticmethod
+    def get_block_queues(sys_block=SYS_BLOCK):
+        """Block-queue topology and tunables of each disk from sysfs."""
+
+        def read(dev, name, typ=str):
+            """Read a queue attribute, None if missing."""
+            try:
+                with open(os.path.join(sys_block, dev, 'queue', name), 'r') as fin:
+                    return typ(fin.read().strip())
+            except (OSError, ValueError):
+                return None
+
+        def scheduler(value):
+            """The active scheduler is the bracketed one."""
+            match = re.search(r'\[(.*?)\]', value)
+            return match.group(1) if match else value
+
+        try:
+            devices = sorted(os.listdir(sys_block))
+        except OSError:
+            _log.warning('Unable to list block devices in %s', sys_block)
+            return {}
+
+        queues = {}
+        for dev in devices:
+            # Skip virtual devices that never back a rundir
+            if dev.startswith(('loop', 'ram', 'zram')):
+                continue
+
+            discard = read(dev, 'discard_max_bytes', int)
+            try:
+                hw_queues = len(os.listdir(os.path.join(sys_block, dev, 'mq')))
+            except OSError:
+                # Legacy single-queue block layer
+                hw_queues = 1
+
+            queues[dev.replace('!', '/')] = {
+                'Scheduler'          : read(dev, 'scheduler', scheduler),
+                'Rotational'         : read(dev, 'rotational', lambda x: x == '1'),
+                'Nr_Requests'        : read(dev, 'nr_requests', int),
+                'Read_Ahead_KB'      : read(dev, 'read_ahead_kb', int),
+                'Logical_Block_Size' : read(dev, 'logical_block_size', int),
+                'Physical_Block_Size': read(dev, 'physical_block_size', int),
+                'Max_Sectors_KB'     : read(dev, 'max_sectors_kb', int),
+                'Discard'            : None if discard is None else discard > 0,
+                'HW_Queues'          : hw_queues,
+            }
+
+        return queues
+
+    @staticmethod
+    def collect_numa():
+        """Collect the NUMA nodes and the node of each disk and NIC.
+
+        Engines can pin their workers on the node of the device under
+        test, and cross-socket penalties show up in the distances.
+        """
+        _log.info("Collecting NUMA information.")
+
+        numa = procfs.device_nodes()
+        numa['Nodes'] = procfs.read_numa()
+
+        return numa
+
+    def collect_filesystem(self):
+        """Collect the filesystem of the rundir."""
+        _log.info("Collecting rundir filesystem information.")
+
+        return Extractor.get_filesystem(self.extra.get('rundir', os.getcwd()))
+
+    @staticmethod
+    def get_mounts(mountinfo=MOUNTINFO):
+        """Parse mountinfo into a list of mounts, in mount order."""
+
+        def unescape(value):
+            """Spaces and tabs are octal escaped, e.g. \\040."""
+            return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), value)
+
+        mounts = []
+        with open(mountinfo, 'r') as fin:
+            for line in fin:
+                # Optional fields end with a single dash
+                fields, _, fs_fields = line.partition(' - ')
+                fields = fields.split()
+                fs_fields = fs_fields.split()
+                if len(fields) < 6 or len(fs_fields) < 2:
+                    continue
+
+                mounts.append({
+                    'Mount_Point'  : unescape(fields[4]),
+                    'Device_Number': fields[2],
+                    'Root'         : unescape(fields[3]),
+                    'Mount_Options': fields[5],
+                    'FS_Type'      : fs_fields[0],
+                    'Device'       : unescape(fs_fields[1]),
+                    'Super_Options': fs_fields[2] if len(fs_fields) > 2 else '',
+                })
+
+        return mounts
+
+    @staticmethod
+    def get_filesystem(path, mountinfo=MOUNTINFO, sys_dev_block=SYS_DEV_BLOCK):
+        """Mount, type, statvfs geometry and kind of the filesystem of a path.
+
+        Alignment is the logical block size of the backing device, which
+        O_DIRECT transfers must be a multiple of, or the page size when
+        the filesystem has no block device behind it. NUMA_Node is the
+        node the device is attached to, -1 if unknown.
+        """
+        path = os.path.realpath(path)
+
+        try:
+            mounts = Extractor.get_mounts(mountinfo)
+        except OSError:
+            _log.warning('Unable to read mounts from %s', mountinfo)
+            mounts = []
+
+        # The deepest mount point holding the path; later mounts hide earlier ones
+        mount = {}
+        for entry in mounts:
+            point = entry['Mount_Point']
+            if path == point or path.startswith(point.rstrip('/') + '/'):
+                if len(point) >= len(mount.get('Mount_Point', '')):
+                    mount = entry
+
+        fs_type = mount.get('FS_Type', 'not_available')
+        device = mount.get('Device', 'not_available')
+
+        try:
+            fs_stats = os.statvfs(path)
+        except OSError:
+            _log.warning('Unable to stat filesystem of %s', path)
+            fs_stats = None
+
+        alignment = None
+        numa_node = -1
+        if mount.get('Device_Number', '0:').split(':')[0] not in ('0', ''):
+            # Partitions have no queue or device of their own, they are the parent's
+            for parent in ('', '..'):
+                block = os.path.join(sys_dev_block, mount['Device_Number'], parent)
+                try:
+                    with open(os.path.join(block, 'queue', 'logical_block_size'),
+                              'r') as fin:
+                        alignment = int(fin.read().strip())
+                except (OSError, ValueError):
+                    continue
+                if os.path.exists(os.path.join(block, 'device')):
+                    numa_node = procfs.device_numa_node(os.path.join(block, 'device'))
+                break
+
+        return {
+            'Path'         : path,
+            'Mount_Point'  : mount.get('Mount_Point', 'not_available'),
+            'FS_Type'      : fs_type,
+            'Device'       : device,
+            'Mount_Options': ','.join(filter(None, (mount.get('Mount_Options'),
+                                                    mount.get('Super_Options')))),
+            'Block_Size'   : fs_stats.f_bsize if fs_stats else -1,
+            'Total_Inodes' : fs_stats.f_files if fs_stats else -1,
+            'Free_Inodes'  : fs_stats.f_favail if fs_stats else -1,
+            'Alignment'    : alignment or mmap.PAGESIZE,
+            'NUMA_Node'    : numa_node,
+            'Tmpfs'        : fs_type in TMPFS_TYPES,
+            'Overlay'      : fs_type == 'overlay',
+            'NFS'          : fs_type in NFS_TYPES,
+            'Lustre'       : fs_type == 'lustre',
+            'EOS_FUSE'     : fs_type.startswith('fuse') and 'eos' in (fs_type + device),
+            'CVMFS'        : fs_type.startswith('fuse') and 'cvmfs' in (fs_type + device),
+        }
+
     @staticmethod
     def get_storage_parser(cmd_output):
         """Storage parser for lshw -c disk."""
-        # Regex for matches
-        reg_logic   = re.compile(r'(?P<Field>logical name:\s*\s)(?P<value>.*)')
-        reg_product = re.compile(r'(?P<Field>product:\s*\s)(?P<value>.*)')
-        reg_size    = re.compile(r'(?P<Field>size:\s*\s)(?P<value>.*)')
+        storage = {}
 
-        # Return iterators containing matches
-        result_logic   = re.finditer(reg_logic,   cmd_output)
-        result_product = re.finditer(reg_product, cmd_output)
-        result_size    = re.finditer(reg_size,    cmd_output)
+        keys = ('logical name', 'product', 'size')
+        for block in Extractor.parse_blocks(cmd_output, '*-', keys):
+            # Empty drive bays and card readers have no device node
+            if 'logical name' not in block:
+                continue
 
-        count = 1
-        storage = {}
-        for log, prod, siz in zip(result_logic, result_product, result_size):
-            storage["disk" + str(count)] = "{0} | {1} | {2}".format(log.group('value'),
-                                                                prod.group('value'),
-                                                                siz.group('value'))
-            count += 1
+            storage["disk" + str(len(storage) + 1)] = "{0} | {1} | {2}".format(
+                block['logical name'],
+                block.get('product', 'not_available'),
+                block.get('size', 'not_available'))
 
         return storage
 
+    @staticmethod
+    def parse_key_values(cmd_output):
+        """Map every 'key: value' line of a command output in one pass.
+
+        Keys and values are stripped, and the first occurrence of a key
+        wins. Lines without a colon are ignored.
+        """
+        fields = {}
+        for line in cmd_output.splitlines():
+            key, sep, value = line.partition(':')
+            if sep:
+                fields.setdefault(key.strip(), value.strip())
+
+        return fields
+
+    @staticmethod
+    def parse_blocks(cmd_output, header, keys):
+        """Split a command output in blocks and pick some fields of each.
+
+        A block starts at every line whose stripped text begins with
+        header, e.g. 'Handle ' for dmidecode or '*-' for lshw; lines
+        before the first header are dropped. A single regex scan finds
+        the headers and the lines of the wanted keys, so the cost does
+        not grow with the number of fields in each block.
+
+        Returns:
+          A list with a dict {key: value} per block, holding the keys
+          present in that block.
+        """
+        reg_line = re.compile(r'\n[ \t]*(?:({})|({})[ \t]*:[ \t]*([^\n]*))'.format(
+            re.escape(header), '|'.join(re.escape(key) for key in keys)))
+
+        blocks = []
+        fields = None
+        for start, key, value in reg_line.findall('\n' + cmd_output):
+            if start:
+                fields = {}
+                blocks.append(fields)
+            elif fields is not None:
+                fields.setdefault(key, value.rstrip())
+
+        return blocks
+
     def get_parser(self, cmd_output, reg="common"):
-        """Common regex parser."""
-        def parser(pattern):
-            """Parser function."""
-            # Different regex for parsing different outputs
-            if reg == "BMC":
-                exp = r'(?P<Field>{}\s*:\s)(?P<Value>.*)'.format(pattern)
-            else:
-                exp = r'(?P<Field>{}:\s*\s)(?P<Value>.*)'.format(pattern)
+        """Common key/value parser.
 
-            # Search pattern in output
-            result = re.search(exp, cmd_output)
-            try:
-                _log.debug("Parsing = %s | Field = %s | Value = %s", reg,
-                                                                     pattern,
-                                                                     result.group('Value'))
-                return result.group('Value')
+        The output is parsed once; the returned function looks a field up
+        by name.
+        """
+        fields = Extractor.parse_key_values(cmd_output)
 
-            except AttributeError:
-                _log.debug("Parsing = %s | Field = %s | Value = %s", reg, pattern, "None")
-                return "not_available"
+        def parser(field):
+            """Parser function."""
+            value = fields.get(field) or "not_available"
+            _log.debug("Parsing = %s | Field = %s | Value = %s", reg, field, value)
+            return value
 
         return parser
 
@@ -333,18 +609,161 @@ class Extractor():
         self.data['Hostname'] = socket.getfqdn()
         self._save("SW", self.collect_sw())
         self._save("HW", self.collect_hw())
+        self._save("FS", self.collect_filesystem())
 
     def collect_hw(self):
-        """Collect Hardware specific metadata."""
+        """Collect Hardware specific metadata.
+
+        Hardware does not change within a boot, so the metadata is cached
+        in the metadata_cache file of the configuration, keyed by the
+        boot_id and a fingerprint of the host. On a cache hit only the
+        volatile fields are read again, and Cached is set. Collected_At
+        then tells when the cached fields were collected, and
+        Collect_Time_s only holds the time spent in this run. The
+        refresh_metadata option ignores and rewrites the cache.
+        """
+        cache_file = self.extra.get('metadata_cache')
+        if not cache_file:
+            return dict(self._collect_hw(), Cached=False)
+
+        cache_file = os.path.expanduser(cache_file)
+        key = self.cache_key()
+
+        if self.extra.get('refresh_metadata'):
+            _log.info("Refreshing the HW metadata cache.")
+        elif key is not None:
+            start = time.perf_counter()
+            hardware = self._load_cache(cache_file, key)
+            if hardware is not None:
+                _log.info("Using cached HW information from %s, collected at %s",
+                          cache_file, hardware.get('Collected_At'))
+                hardware = self.refresh_volatile(hardware)
+                hardware['Collect_Time_s'] = {
+                    'Cache': round(time.perf_counter() - start, 3)}
+                return dict(hardware, Cached=True)
+
+        hardware = self._collect_hw()
+        if key is not None:
+            self._save_cache(cache_file, key, hardware)
+
+        return dict(hardware, Cached=False)
+
+    def cache_key(self):
+        """boot_id and hardware fingerprint of the host, None without boot_id."""
+        boot_id = procfs.read_value(BOOT_ID)
+        if not boot_id:
+            return None
+
+        processors = procfs.read_cpuinfo() or [{}]
+        meminfo = procfs.read_meminfo() or {}
+        try:
+            disks = sorted(os.listdir(SYS_BLOCK))
+        except OSError:
+            disks = []
+
+        # Root and the installed tools change what is collected
+        fingerprint = {
+            'version'   : CACHE_VERSION,
+            'privileged': self._permission,
+            'packages'  : self.pkg,
+            'cpus'      : len(processors),
+            'model'     : processors[0].get('model name'),
+            'mem_total' : meminfo.get('MemTotal'),
+            'disks'     : disks,
+            'dmi'       : [procfs.read_value(os.path.join(SYS_DMI, name))
+                           for name in DMI_FINGERPRINT],
+        }
+        digest = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode())
+
+        return {'boot_id': boot_id, 'fingerprint': digest.hexdigest()}
+
+    @staticmethod
+    def _load_cache(cache_file, key):
+        """Cached HW metadata if its key matches, else None."""
+        try:
+            with open(cache_file, 'r') as fin:
+                cache = json.load(fin)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            _log.warning("Ignoring unreadable HW metadata cache %s: %s", cache_file, err)
+            return None
+
+        if cache.get('key') != key:
+            _log.info("HW metadata cache is stale: new boot or hardware change.")
+            return None
+
+        return cache['HW']
+
+    @staticmethod
+    def _save_cache(cache_file, key, hardware):
+        """Atomically write the HW metadata cache, readable by its owner only."""
+        tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+            with open(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                      'w') as fout:
+                json.dump({'key': key, 'HW': hardware}, fout)
+            os.replace(tmp_file, cache_file)
+        except OSError as err:
+            _log.warning("Unable to write HW metadata cache %s: %s", cache_file, err)
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def refresh_volatile(self, hardware):
+        """Read again the fields of cached HW metadata that change at runtime.
+
+        These are the available memory, the CPU frequency, governor and
+        SMT state, and the block-queue tunables.
+        """
+        meminfo = procfs.read_meminfo()
+        if meminfo is not None:
+            hardware['MEMORY']['Mem_Available'] = meminfo.get('MemAvailable',
+                                                              meminfo.get('MemFree', -1))
+
+        processors = procfs.read_cpuinfo() or [{}]
+        hardware['CPU'].update(Extractor.get_cpu_volatile(processors,
+                                                          hardware['CPU']['Threads_per_core']))
+        hardware['STORAGE']['Block_Devices'] = Extractor.get_block_queues()
+
+        return hardware
+
+    def _collect_hw(self):
+        """Run the HW collectors.
+
+        The collectors are independent, so they run concurrently and the
+        total time is that of the slowest tool rather than their sum. The
+        wall time of each collector is reported under Collect_Time_s, and
+        the UTC time of the collection under Collected_At.
+        """
         _log.info("Collecting HW information.")
 
-        hardware = {
-            "CPU"    : self.collect_cpu(),
-            "BIOS"   : self.collect_bios(),
-            "SYSTEM" : self.collect_system(),
-            "MEMORY" : self.collect_memory(),
-            "STORAGE": self.collect_storage()
+        collectors = {
+            "CPU"    : self.collect_cpu,
+            "BIOS"   : self.collect_bios,
+            "SYSTEM" : self.collect_system,
+            "MEMORY" : self.collect_memory,
+            "STORAGE": self.collect_storage,
+            "NUMA"   : self.collect_numa,
         }
+
+        def timed(collector):
+            """Run a collector and measure its wall time."""
+            start = time.perf_counter()
+            return collector(), round(time.perf_counter() - start, 3)
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as pool:
+            futures = {key: pool.submit(timed, val) for key, val in collectors.items()}
+
+        hardware = {}
+        timings = {}
+        for key, fut in futures.items():
+            hardware[key], timings[key] = fut.result()
+
+        _log.debug("HW collector timings: %s", timings)
+        hardware['Collect_Time_s'] = timings
+        hardware['Collected_At'] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
         return hardware
 
     def dump(self, stdout=False, outfile=False):
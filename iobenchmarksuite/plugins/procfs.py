@@ -0,0 +1,248 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import glob
+import logging
+import os
+import platform
+import re
+
+_log = logging.getLogger(__name__)
+
+PROC_MEMINFO = "/proc/meminfo"
+PROC_CPUINFO = "/proc/cpuinfo"
+SYS_CPU = "/sys/devices/system/cpu"
+SYS_NODE = "/sys/devices/system/node"
+SYS_BLOCK = "/sys/block"
+SYS_NET = "/sys/class/net"
+
+
+def read_value(path):
+    """Stripped content of a procfs or sysfs file, None if unreadable."""
+    try:
+        with open(path, "r") as fin:
+            return fin.read().strip()
+    except OSError:
+        return None
+
+
+def parse_meminfo(text):
+    """Parse /proc/meminfo.
+
+    Returns:
+      A dict {field: value}, in kB for sizes.
+    """
+    meminfo = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[key.strip()] = int(fields[0])
+    return meminfo
+
+
+def parse_cpuinfo(text):
+    """Parse /proc/cpuinfo.
+
+    Returns:
+      A list with a dict {field: value} per logical CPU.
+    """
+    processors = []
+    current = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            # A blank line closes the block of a processor
+            if current:
+                processors.append(current)
+                current = {}
+            continue
+        current[key.strip()] = value.strip()
+
+    if current:
+        processors.append(current)
+    return processors
+
+
+def read_meminfo(path=PROC_MEMINFO):
+    """Parsed /proc/meminfo, None if unreadable."""
+    text = read_value(path)
+    return parse_meminfo(text) if text is not None else None
+
+
+def read_cpuinfo(path=PROC_CPUINFO):
+    """Parsed /proc/cpuinfo, None if unreadable."""
+    text = read_value(path)
+    return parse_cpuinfo(text) if text is not None else None
+
+
+def read_cpufreq(name, sys_cpu=SYS_CPU):
+    """Distinct values of a cpufreq attribute over all CPUs, sorted."""
+    values = set()
+    for path in glob.glob(os.path.join(sys_cpu, "cpu[0-9]*", "cpufreq", name)):
+        value = read_value(path)
+        if value:
+            values.add(value)
+    return sorted(values)
+
+
+def smt_active(sys_cpu=SYS_CPU):
+    """True if SMT siblings are online, None if the kernel does not tell."""
+    value = read_value(os.path.join(sys_cpu, "smt", "active"))
+    return None if value is None else value == "1"
+
+
+def read_caches(sys_cpu=SYS_CPU):
+    """Size of the unified L2 and L3 caches of cpu0, e.g. {"L2": "256K"}."""
+    caches = {}
+    for index in glob.glob(os.path.join(sys_cpu, "cpu0", "cache", "index*")):
+        level = read_value(os.path.join(index, "level"))
+        if read_value(os.path.join(index, "type")) == "Unified" and level:
+            caches["L" + level] = read_value(os.path.join(index, "size"))
+    return caches
+
+
+def node_ids(sys_node=SYS_NODE):
+    """Sorted ids of the NUMA nodes, empty without NUMA support."""
+    try:
+        names = os.listdir(sys_node)
+    except OSError:
+        return []
+    return sorted(
+        int(match.group(1))
+        for match in (re.match(r"node(\d+)$", name) for name in names)
+        if match
+    )
+
+
+def cpu_topology(processors, sys_cpu=SYS_CPU, sys_node=SYS_NODE):
+    """CPU description with the keys of Extractor.get_cpu_parser.
+
+    Built from /proc/cpuinfo and sysfs instead of lscpu. Unknown numbers
+    are -1 and unknown strings not_available, as with lscpu.
+
+    Args:
+      processors: Parsed /proc/cpuinfo, see read_cpuinfo().
+
+    Returns:
+      The CPU dict, or None if cpuinfo lacks the model name (as on most
+      ARM kernels), in which case lscpu is needed.
+    """
+    if not processors or "model name" not in processors[0]:
+        return None
+
+    first = processors[0]
+
+    def number(value, req_typ=int):
+        """Convert a value, -1 if missing or invalid."""
+        try:
+            return req_typ(value)
+        except (TypeError, ValueError):
+            return req_typ(-1)
+
+    def mhz(name):
+        """cpufreq limit of cpu0 in MHz, sysfs reports kHz."""
+        value = number(read_value(os.path.join(sys_cpu, "cpu0", "cpufreq", name)))
+        return value / 1000 if value > 0 else -1.0
+
+    sockets = len({proc.get("physical id") for proc in processors}) or 1
+    cores = number(first.get("cpu cores"))
+    siblings = number(first.get("siblings"))
+    caches = read_caches(sys_cpu)
+
+    nodes = node_ids(sys_node)
+
+    cpu = {
+        "Architecture": platform.machine(),
+        "CPU_Model": first.get("model name", "not_available"),
+        "CPU_Family": first.get("cpu family", "not_available"),
+        "CPU_num": len(processors),
+        "Online_CPUs_list": read_value(os.path.join(sys_cpu, "online"))
+        or "not_available",
+        "Threads_per_core": siblings // cores if cores > 0 and siblings > 0 else -1,
+        "Cores_per_socket": cores,
+        "Sockets": sockets,
+        "Vendor_ID": first.get("vendor_id", "not_available"),
+        "Stepping": first.get("stepping", "not_available"),
+        "CPU_MHz": number(first.get("cpu MHz"), float),
+        "CPU_Max_Speed_MHz": mhz("cpuinfo_max_freq"),
+        "CPU_Min_Speed_MHz": mhz("cpuinfo_min_freq"),
+        "BogoMIPS": number(first.get("bogomips"), float),
+        "L2_cache": caches.get("L2") or "not_available",
+        "L3_cache": caches.get("L3") or "not_available",
+        "NUMA_nodes": len(nodes) if nodes else -1,
+    }
+    for node in nodes:
+        cpu["NUMA_node{}_CPUs".format(node)] = (
+            read_value(os.path.join(sys_node, "node{}".format(node), "cpulist"))
+            or "not_available"
+        )
+
+    return cpu
+
+
+def read_numa(sys_node=SYS_NODE):
+    """CPUs, memory and distances of each NUMA node.
+
+    Returns:
+      A dict {"node<N>": {"CPUs", "Mem_Total_kB", "Distances"}}, where
+      Distances is the SLIT row of the node, indexed like node_ids().
+    """
+    nodes = {}
+    for node in node_ids(sys_node):
+        path = os.path.join(sys_node, "node{}".format(node))
+        meminfo = {}
+        for line in (read_value(os.path.join(path, "meminfo")) or "").splitlines():
+            # e.g. "Node 0 MemTotal:       32768 kB"
+            fields = line.split()
+            if len(fields) >= 4:
+                meminfo[fields[2].rstrip(":")] = int(fields[3])
+
+        distances = read_value(os.path.join(path, "distance")) or ""
+        nodes["node{}".format(node)] = {
+            "CPUs": read_value(os.path.join(path, "cpulist")) or "not_available",
+            "Mem_Total_kB": meminfo.get("MemTotal", -1),
+            "Distances": [int(value) for value in distances.split()],
+        }
+    return nodes
+
+
+def device_numa_node(device):
+    """NUMA node of a sysfs device, -1 if unknown.
+
+    The attribute sits on the PCI function, which may be a few levels
+    above the device, e.g. virtio or NVMe controllers, so parents are
+    searched too. The kernel reports -1 for devices without affinity.
+    """
+    path = os.path.realpath(device)
+    while path != os.path.dirname(path):
+        value = read_value(os.path.join(path, "numa_node"))
+        if value is not None:
+            return max(int(value), -1)
+        path = os.path.dirname(path)
+    return -1
+
+
+def device_nodes(sys_block=SYS_BLOCK, sys_net=SYS_NET):
+    """NUMA node of each physical block device and network interface.
+
+    Returns:
+      A dict {"Block_Devices": {disk: node}, "NICs": {interface: node}};
+      virtual devices without a device link are left out.
+    """
+    nodes = {"Block_Devices": {}, "NICs": {}}
+    for key, root in (("Block_Devices", sys_block), ("NICs", sys_net)):
+        try:
+            names = sorted(os.listdir(root))
+        except OSError:
+            continue
+        for name in names:
+            device = os.path.join(root, name, "device")
+            if os.path.exists(device):
+                nodes[key][name.replace("!", "/")] = device_numa_node(device)
+    return nodes
@@ -0,0 +1,287 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import glob
+import os
+
+from iobenchmarksuite.plugins.sampler import Sampler
+
+PROC = "/proc"
+
+# cgroup v2 is mounted here, or under unified/ on hybrid hierarchies
+CGROUP_ROOTS = ("/sys/fs/cgroup", "/sys/fs/cgroup/unified")
+
+# Where docker and podman place the cgroups of their containers, which are
+# not descendants of the suite process
+CONTAINER_CGROUPS = (
+    "system.slice/docker-*.scope",
+    "docker/*",
+    "machine.slice/libpod-*.scope",
+    "user.slice/user-*.slice/user@*.service/user.slice/libpod-*.scope",
+)
+
+# Counters of /proc/<pid>/io, in file order
+IO_FIELDS = (
+    "rchar",
+    "wchar",
+    "syscr",
+    "syscw",
+    "read_bytes",
+    "write_bytes",
+    "cancelled_write_bytes",
+)
+
+# Counters of cgroup v2 io.stat
+CGROUP_FIELDS = ("rbytes", "wbytes", "rios", "wios", "dbytes", "dios")
+
+# Number of commands kept in the per-command breakdown
+TOP_COMMANDS = 10
+
+
+def cgroup_root():
+    """Mount point of the cgroup v2 hierarchy, or None."""
+    for root in CGROUP_ROOTS:
+        if os.path.exists(os.path.join(root, "cgroup.controllers")):
+            return root
+    return None
+
+
+def parse_io(text):
+    """Parse /proc/<pid>/io into a tuple ordered as IO_FIELDS."""
+    values = dict(line.split(":", 1) for line in text.splitlines() if ":" in line)
+    return tuple(int(values.get(field, 0)) for field in IO_FIELDS)
+
+
+def parse_io_stat(text):
+    """Parse a cgroup io.stat, summing every device.
+
+    Returns:
+      A tuple ordered as CGROUP_FIELDS.
+    """
+    totals = dict.fromkeys(CGROUP_FIELDS, 0)
+    for line in text.splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition("=")
+            if key in totals:
+                totals[key] += int(value)
+    return tuple(totals[field] for field in CGROUP_FIELDS)
+
+
+def read_stat(pid):
+    """Command, parent pid and start time of a process from /proc/<pid>/stat."""
+    with open(os.path.join(PROC, str(pid), "stat"), "r") as fin:
+        data = fin.read()
+
+    # The command is parenthesized and may contain spaces
+    comm = data[data.index("(") + 1 : data.rindex(")")]
+    fields = data[data.rindex(")") + 2 :].split()
+    return comm, int(fields[1]), int(fields[19])
+
+
+def process_tree(root_pid):
+    """Processes descending from root_pid, itself included.
+
+    Returns:
+      A dict {pid: (command, parent pid, start time)}.
+    """
+    parents = {}
+    info = {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            comm, ppid, start = read_stat(entry)
+        except (OSError, ValueError):
+            # Exited while scanning
+            continue
+        pid = int(entry)
+        parents.setdefault(ppid, []).append(pid)
+        info[pid] = (comm, ppid, start)
+
+    tree = {}
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid in info and pid not in tree:
+            tree[pid] = info[pid]
+            pending.extend(parents.get(pid, ()))
+    return tree
+
+
+class ProcIOSampler(Sampler):
+    """I/O done by the process tree of the suite and by its containers.
+
+    /proc/<pid>/io is read for every descendant of the suite, which covers
+    commands run by exec_wait_benchmark, singularity containers, the
+    workloads hepscore spawns and the native benchmarks. The kernel adds
+    the counters of a reaped child to its parent, so tree totals are
+    summed over the live processes; counters are also kept per process
+    as last seen for the per-command breakdown.
+
+    Docker and podman containers run outside the process tree, so the
+    cgroup v2 io.stat of the container cgroups created during the run is
+    read as well, together with the cgroups of descendants that differ
+    from the suite's own. Counters are summed over every device.
+
+    Args:
+      interval: Seconds between snapshots.
+      root_pid: Root of the process tree, the suite by default.
+    """
+
+    name = "procio"
+
+    def __init__(self, interval=1.0, root_pid=None):
+        super().__init__(interval)
+        self.root_pid = root_pid or os.getpid()
+        self._cgroup_root = cgroup_root()
+        self._own_cgroup = self._cgroup_of(self.root_pid)
+        self._baseline = None
+        self._preexisting = None
+        self._total = [0] * len(IO_FIELDS)
+        self._last = {}
+        self._alive = set()
+        self._cgroups = {}
+        self.timestamps = []
+        self.series = {"read_MBps": [], "write_MBps": []}
+
+    @classmethod
+    def available(cls):
+        return os.access(os.path.join(PROC, "self", "io"), os.R_OK)
+
+    def _cgroup_of(self, pid):
+        """cgroup v2 directory of a process, or None."""
+        if self._cgroup_root is None:
+            return None
+        try:
+            with open(os.path.join(PROC, str(pid), "cgroup"), "r") as fin:
+                for line in fin:
+                    if line.startswith("0::"):
+                        path = line[3:].strip().lstrip("/")
+                        return os.path.join(self._cgroup_root, path)
+        except OSError:
+            pass
+        return None
+
+    def snapshot(self):
+        procs = {}
+        cgroups = set()
+
+        for pid, (comm, ppid, start) in process_tree(self.root_pid).items():
+            try:
+                with open(os.path.join(PROC, str(pid), "io"), "r") as fin:
+                    counters = parse_io(fin.read())
+            except (OSError, ValueError):
+                # Gone, or owned by another user
+                continue
+            procs[(pid, start)] = (comm, ppid, counters)
+
+            cgroup = self._cgroup_of(pid)
+            if cgroup and cgroup != self._own_cgroup:
+                cgroups.add(cgroup)
+
+        if self._cgroup_root is not None:
+            for pattern in CONTAINER_CGROUPS:
+                cgroups.update(glob.glob(os.path.join(self._cgroup_root, pattern)))
+
+        stats = {}
+        for cgroup in cgroups:
+            try:
+                with open(os.path.join(cgroup, "io.stat"), "r") as fin:
+                    stats[cgroup] = parse_io_stat(fin.read())
+            except OSError:
+                continue
+
+        return {"procs": procs, "cgroups": stats}
+
+    def _tree_total(self, procs):
+        """I/O of the tree since start, from the processes alive in a snapshot.
+
+        A reaped child's counters are added to its parent's, so summing
+        the live processes counts every exited descendant exactly once.
+        """
+        total = [0] * len(IO_FIELDS)
+        for key, (_, _, counters) in procs.items():
+            before = self._baseline.get(key) or (0,) * len(IO_FIELDS)
+            for i, (after, start) in enumerate(zip(counters, before)):
+                total[i] += after - start
+        return [max(0, value) for value in total]
+
+    def record(self, elapsed, delta, previous, current):
+        if self._baseline is None:
+            # Counters of whatever existed at start are not the benchmark's
+            self._baseline = {
+                key: counters for key, (_, _, counters) in previous["procs"].items()
+            }
+            self._preexisting = set(previous["cgroups"])
+            self._last.update(previous["procs"])
+
+        before = self._tree_total(previous["procs"])
+        self._total = self._tree_total(current["procs"])
+        self._last.update(current["procs"])
+        self._alive = set(current["procs"])
+
+        # Containers of the benchmark are created after it starts, so their
+        # counters start from zero; older cgroups belong to someone else
+        for cgroup, counters in current["cgroups"].items():
+            if cgroup not in self._preexisting:
+                self._cgroups[cgroup] = counters
+
+        moved = [max(0, after - start) for after, start in zip(self._total, before)]
+        self.timestamps.append(elapsed)
+        self.series["read_MBps"].append(round(moved[4] / delta / 1e6, 3))
+        self.series["write_MBps"].append(round(moved[5] / delta / 1e6, 3))
+
+    def report(self):
+        """Totals of the process tree, top commands and container cgroups.
+
+        The per-command breakdown is approximate: the I/O of a process is
+        its last counters less those of its exited children, which a
+        last snapshot taken just before a reap can miss.
+        """
+        # Only exited children have been folded into their parent
+        children = {}
+        for key, (_, ppid, counters) in self._last.items():
+            if key in self._alive:
+                continue
+            summed = children.setdefault(ppid, [0] * len(IO_FIELDS))
+            for i, value in enumerate(counters):
+                summed[i] += value
+
+        commands = {}
+        for key, (comm, _, counters) in self._last.items():
+            before = (self._baseline or {}).get(key) or (0,) * len(IO_FIELDS)
+            nested = children.get(key[0], (0,) * len(IO_FIELDS))
+
+            command = commands.setdefault(
+                comm, dict(dict.fromkeys(IO_FIELDS, 0), processes=0)
+            )
+            command["processes"] += 1
+            for field, after, start, inner in zip(IO_FIELDS, counters, before, nested):
+                command[field] += max(0, after - start - inner)
+
+        top = sorted(
+            commands.items(),
+            key=lambda item: item[1]["read_bytes"] + item[1]["write_bytes"],
+            reverse=True,
+        )[:TOP_COMMANDS]
+
+        cgroups = {
+            os.path.relpath(cgroup, self._cgroup_root): dict(zip(CGROUP_FIELDS, last))
+            for cgroup, last in self._cgroups.items()
+        }
+
+        return {
+            "interval": self.interval,
+            "t": self.timestamps,
+            "read_MBps": self.series["read_MBps"],
+            "write_MBps": self.series["write_MBps"],
+            "processes": len(self._last),
+            "total": dict(zip(IO_FIELDS, self._total)),
+            "commands": dict(top),
+            "cgroups": cgroups,
+        }
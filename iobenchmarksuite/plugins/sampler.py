@@ -0,0 +1,101 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import logging
+import threading
+import time
+
+_log = logging.getLogger(__name__)
+
+
+class Sampler:
+    """Base class of the background samplers run alongside each benchmark.
+
+    A daemon thread takes a snapshot at start, every interval and at stop.
+    Each pair of consecutive snapshots is handed to record(), so only the
+    last raw snapshot is kept. Subclasses append one value per interval
+    to their time series, so memory grows linearly with the run length.
+    Every series has one entry per timestamp; None marks intervals where
+    a series had no value, e.g. a device that disappeared.
+
+    Subclasses implement snapshot(), record() and report().
+
+    Args:
+      interval: Seconds between snapshots.
+    """
+
+    # Key of the report in the benchmark profile
+    name = None
+
+    def __init__(self, interval=1.0):
+        self.interval = max(float(interval), 0.01)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+        self._previous = None
+        self.samples = 0
+
+    @classmethod
+    def available(cls):
+        """True if the sampler can run on this host."""
+        return True
+
+    def snapshot(self):
+        """Read the raw counters."""
+        raise NotImplementedError
+
+    def record(self, elapsed, delta, previous, current):
+        """Account for the interval between two snapshots.
+
+        Args:
+          elapsed:  Seconds since the sampler started, at current.
+          delta:    Seconds between the two snapshots.
+          previous: Earlier snapshot.
+          current:  Later snapshot.
+        """
+        raise NotImplementedError
+
+    def report(self):
+        """The time series and summary stored in the benchmark profile."""
+        raise NotImplementedError
+
+    def _sample(self):
+        now = time.monotonic()
+        try:
+            current = self.snapshot()
+        except (OSError, ValueError) as err:
+            _log.debug("%s sampler failed to read counters: %s", self.name, err)
+            return
+
+        if self._previous is not None:
+            last, previous = self._previous
+            if now > last:
+                self.record(round(now - self._start, 3), now - last, previous, current)
+                self.samples += 1
+        self._previous = (now, current)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """Take the first snapshot and start sampling in the background."""
+        self._start = time.monotonic()
+        self._sample()
+        self._thread = threading.Thread(
+            target=self._run, name="{}-sampler".format(self.name), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, take a last snapshot and return the report."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        return self.report()
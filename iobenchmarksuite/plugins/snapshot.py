@@ -0,0 +1,267 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import fnmatch
+import logging
+import os
+import time
+
+from iobenchmarksuite.plugins import procfs
+from iobenchmarksuite.plugins.procio import (
+    CONTAINER_CGROUPS,
+    PROC,
+    parse_io,
+    process_tree,
+    read_stat,
+)
+
+_log = logging.getLogger(__name__)
+
+PROC_LOADAVG = "/proc/loadavg"
+
+# Limits past which a run is flagged as contaminated, overridden by the
+# global.snapshot section of the configuration
+THRESHOLDS = {
+    # MB read or written by processes outside the suite during the run
+    "foreign_io_mb": 100,
+    # 1-minute load average per CPU before the first benchmark
+    "load_per_cpu": 0.5,
+    # Dirty and writeback memory before the first benchmark, in MB
+    "dirty_mb": 256,
+    # Relative drop of the available memory over the run, in %
+    "mem_drop_pct": 20,
+    # Relative change of the mean CPU frequency over the run, in %
+    "mhz_change_pct": 20,
+}
+
+# What the foreign I/O covers, stored next to it in the report
+IO_SCOPE = (
+    "Per-process counters of the processes alive at the end of the run. "
+    "A process that exits during the run only counts through the process "
+    "reaping it, I/O of short-lived processes whose reaper exited too is "
+    "missed."
+)
+
+# Number of foreign processes kept in the list of I/O consumers
+TOP_CONSUMERS = 5
+
+# Command prefixes of the container runtimes, which pull images and write
+# the container layers on behalf of the suite in docker and singularity mode
+CONTAINER_RUNTIMES = (
+    "dockerd",
+    "containerd",
+    "runc",
+    "crun",
+    "podman",
+    "conmon",
+    "fuse-overlayfs",
+    "squashfuse",
+    "starter",
+    "singularity",
+    "apptainer",
+)
+
+
+def read_io_counters():
+    """Bytes read and written by every process whose counters are readable.
+
+    /proc/<pid>/io of other users needs root; those processes are skipped.
+
+    Returns:
+      A dict {(pid, start time): (command, read bytes, write bytes)}.
+    """
+    counters = {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            comm, _, start = read_stat(entry)
+            with open(os.path.join(PROC, entry, "io"), "r") as fin:
+                io = parse_io(fin.read())
+        except (OSError, ValueError):
+            # Exited while scanning, or owned by another user
+            continue
+        counters[(int(entry), start)] = (comm, io[4], io[5])
+    return counters
+
+
+def container_processes():
+    """Processes running in docker or podman container cgroups.
+
+    Returns:
+      A dict {(pid, start time): cgroup of the container}.
+    """
+    containers = {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(PROC, entry, "cgroup"), "r") as fin:
+                lines = fin.read().splitlines()
+            _, _, start = read_stat(entry)
+        except (OSError, ValueError):
+            continue
+        for line in lines:
+            cgroup = line.split(":", 2)[-1].strip("/")
+            if any(fnmatch.fnmatch(cgroup, pattern) for pattern in CONTAINER_CGROUPS):
+                containers[(int(entry), start)] = cgroup
+                break
+    return containers
+
+
+def take_snapshot():
+    """Lightweight view of the conditions the benchmarks run in.
+
+    Returns:
+      A dict with the CPU governors and mean frequency, available, dirty
+      and writeback memory in kB, the load averages, the per-process
+      I/O counters and the container of the processes running in one.
+    """
+    processors = procfs.read_cpuinfo() or []
+    mhz = [float(proc["cpu MHz"]) for proc in processors if "cpu MHz" in proc]
+    meminfo = procfs.read_meminfo() or {}
+    loadavg = (procfs.read_value(PROC_LOADAVG) or "0 0 0").split()[:3]
+
+    return {
+        "time": time.time(),
+        "cpus": os.cpu_count() or 1,
+        "governor": procfs.read_cpufreq("scaling_governor"),
+        "cpu_mhz": round(sum(mhz) / len(mhz), 1) if mhz else None,
+        "mem_available_kB": meminfo.get("MemAvailable", meminfo.get("MemFree")),
+        "dirty_kB": meminfo.get("Dirty"),
+        "writeback_kB": meminfo.get("Writeback"),
+        "loadavg": [float(value) for value in loadavg],
+        "io": read_io_counters(),
+        "containers": container_processes(),
+    }
+
+
+def summary(snap):
+    """A snapshot without the per-process counters."""
+    return {
+        key: value
+        for key, value in snap.items()
+        if key not in ("io", "containers", "time")
+    }
+
+
+def diff_snapshots(before, after, thresholds=None, exclude=(), containers=False):
+    """Compare two snapshots and decide if the run was contaminated.
+
+    Args:
+      before:     Snapshot taken before the first benchmark.
+      after:      Snapshot taken after the last benchmark.
+      thresholds: Overrides of THRESHOLDS.
+      exclude:    pids of the suite's own processes.
+      containers: The suite ran containers. The I/O of the container
+                  runtimes and of the containers created during the run
+                  is then attributed to the suite, and reported apart.
+
+    The I/O counters are read per process, and the suite is told apart by
+    the pids alive when the second snapshot is taken. The kernel adds the
+    counters of a process to those of the parent reaping it, so the I/O
+    of a process that started and exited during the run is attributed
+    to its reaper: the suite for the benchmarks, which it waits for. It
+    is missed when the reaper exited as well, see IO_SCOPE.
+
+    Returns:
+      A dict with both summaries, the changes, the top foreign I/O
+      consumers, what they cover, a contaminated verdict and the reasons
+      for it.
+    """
+    limits = dict(THRESHOLDS, **(thresholds or {}))
+    reasons = []
+
+    # Containers created during the run are the suite's
+    new_containers = set(after.get("containers", {}).values()) - set(
+        before.get("containers", {}).values()
+    )
+
+    # I/O done by the processes outside the suite alive at both ends;
+    # processes that started during the run count from zero
+    consumers = []
+    runtime_bytes = 0
+    for key, (comm, read_bytes, write_bytes) in after["io"].items():
+        if key[0] in exclude:
+            continue
+        _, start_read, start_write = before["io"].get(key, (comm, 0, 0))
+        moved = (read_bytes - start_read, write_bytes - start_write)
+        if containers and (
+            comm.startswith(CONTAINER_RUNTIMES)
+            or after.get("containers", {}).get(key) in new_containers
+        ):
+            runtime_bytes += max(0, sum(moved))
+            continue
+        if sum(moved) > 0:
+            consumers.append(
+                {
+                    "pid": key[0],
+                    "command": comm,
+                    "read_MB": round(moved[0] / 1e6, 1),
+                    "write_MB": round(moved[1] / 1e6, 1),
+                }
+            )
+    consumers.sort(key=lambda item: item["read_MB"] + item["write_MB"], reverse=True)
+    foreign_mb = round(sum(item["read_MB"] + item["write_MB"] for item in consumers), 1)
+
+    if foreign_mb > limits["foreign_io_mb"]:
+        reasons.append(
+            "{} MB of I/O by other processes, e.g. {}".format(
+                foreign_mb, consumers[0]["command"]
+            )
+        )
+
+    if before["governor"] != after["governor"]:
+        reasons.append(
+            "CPU governor changed from {} to {}".format(
+                "/".join(before["governor"]) or "none",
+                "/".join(after["governor"]) or "none",
+            )
+        )
+
+    load = before["loadavg"][0] / before["cpus"]
+    if load > limits["load_per_cpu"]:
+        reasons.append("Load average per CPU was {:.2f} at start".format(load))
+
+    dirty_mb = ((before["dirty_kB"] or 0) + (before["writeback_kB"] or 0)) / 1024
+    if dirty_mb > limits["dirty_mb"]:
+        reasons.append("{:.0f} MB dirty or under writeback at start".format(dirty_mb))
+
+    changes = {"foreign_io_MB": foreign_mb}
+    if containers:
+        changes["container_io_MB"] = round(runtime_bytes / 1e6, 1)
+    for key in ("cpu_mhz", "mem_available_kB", "dirty_kB", "writeback_kB"):
+        if before[key] is not None and after[key] is not None:
+            changes[key] = round(after[key] - before[key], 1)
+
+    if before["mem_available_kB"] and "mem_available_kB" in changes:
+        drop = -100 * changes["mem_available_kB"] / before["mem_available_kB"]
+        if drop > limits["mem_drop_pct"]:
+            reasons.append("Available memory dropped by {:.0f}%".format(drop))
+
+    if before["cpu_mhz"] and "cpu_mhz" in changes:
+        shift = 100 * abs(changes["cpu_mhz"]) / before["cpu_mhz"]
+        if shift > limits["mhz_change_pct"]:
+            reasons.append("Mean CPU frequency changed by {:.0f}%".format(shift))
+
+    return {
+        "duration": round(after["time"] - before["time"], 1),
+        "before": summary(before),
+        "after": summary(after),
+        "changes": changes,
+        "top_io": consumers[:TOP_CONSUMERS],
+        "io_scope": IO_SCOPE,
+        "thresholds": limits,
+        "contaminated": bool(reasons),
+        "reasons": reasons,
+    }
+
+
+def suite_pids():
+    """pids of the suite process and its descendants."""
+    return set(process_tree(os.getpid()))
@@ -0,0 +1,194 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from iobenchmarksuite import histogram
+from iobenchmarksuite import pagecache
+from iobenchmarksuite import seqio
+from iobenchmarksuite import utils
+
+_log = logging.getLogger(__name__)
+
+# Values used when the randio section of the configuration omits a key
+DEFAULTS = {
+    "file_size": "1G",
+    "block_sizes": ["4k", "64k"],
+    "queue_depths": [1, 2, 4, 8, 16, 32],
+    "modes": ["randread", "randwrite"],
+    "runtime": 5,
+    "direct": True,
+    "cold_cache": False,
+    "drop_caches": False,
+}
+
+
+def prepare_file(path, file_size, direct):
+    """Lay out the test file so reads never hit holes.
+
+    Returns:
+      A tuple (file size in bytes, O_DIRECT supported).
+    """
+    chunk = min(file_size, utils.parse_size("1M"))
+    count = max(1, file_size // chunk)
+    buf = seqio.aligned_buffer(chunk)
+
+    try:
+        _, direct = seqio.write_pass(path, buf, count, direct)
+    finally:
+        buf.close()
+
+    return count * chunk, direct
+
+
+def worker(fd, mode, block_size, blocks, deadline, seed):
+    """Issue random aligned I/Os on fd until the deadline.
+
+    Each worker keeps exactly one request in flight, so the number of
+    workers is the emulated queue depth. Reads seek then readv into the
+    aligned buffer, so every worker needs a descriptor of its own.
+
+    Returns:
+      A Histogram with the latency of every completed request in seconds.
+    """
+    rng = random.Random(seed)
+    buf = seqio.aligned_buffer(block_size)
+    latencies = histogram.Histogram()
+
+    try:
+        while time.perf_counter() < deadline:
+            offset = rng.randrange(blocks) * block_size
+            start = time.perf_counter()
+            if mode == "randread":
+                os.lseek(fd, offset, os.SEEK_SET)
+                os.readv(fd, [buf])
+            else:
+                os.pwrite(fd, buf, offset)
+            latencies.record(time.perf_counter() - start)
+    finally:
+        buf.close()
+
+    return latencies
+
+
+def run_queue_depth(path, mode, block_size, file_size, queue_depth, runtime, direct):
+    """Measure one (mode, block size, queue depth) point.
+
+    Returns:
+      A dict with IOPS, throughput, the latency summary in ms and the
+      serialized latency histogram.
+    """
+    flags = os.O_RDONLY if mode == "randread" else os.O_WRONLY
+    fds = []
+    blocks = max(1, file_size // block_size)
+
+    try:
+        for _ in range(queue_depth):
+            fds.append(seqio.open_file(path, flags, direct)[0])
+
+        with ThreadPoolExecutor(max_workers=queue_depth) as pool:
+            start = time.perf_counter()
+            deadline = start + runtime
+            futures = [
+                pool.submit(worker, fd, mode, block_size, blocks, deadline, seed)
+                for seed, fd in enumerate(fds)
+            ]
+            latencies = histogram.Histogram()
+            for fut in futures:
+                latencies.merge(fut.result())
+            elapsed = time.perf_counter() - start
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+    return {
+        "iops": round(latencies.count / elapsed, 2),
+        "MBps": seqio.mbps(latencies.count * block_size, elapsed),
+        "latency_ms": latencies.summary(),
+        "histogram": latencies.to_dict(),
+    }
+
+
+def run_randio(rundir=".", conf=None):
+    """Run the random IOPS benchmark and save its result.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the randio configuration section.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    _log.debug("Running randio with rundir=%s settings=%s", rundir, settings)
+
+    path = os.path.join(rundir, "randio.dat")
+    result = {"randio": {"unit": {"iops": "op/s", "MBps": "MB/s", "latency": "ms"}}}
+    evictor = pagecache.Evictor(settings["cold_cache"], settings["drop_caches"])
+    filesystem = result["randio"]["filesystem"] = seqio.probe_rundir(rundir)
+
+    try:
+        file_size, direct = prepare_file(
+            path,
+            utils.parse_size(settings["file_size"]),
+            seqio.probe_direct(rundir, settings["direct"]),
+        )
+        result["randio"].update({"file_size": file_size, "direct": direct})
+
+        for mode in settings["modes"]:
+            if mode not in ("randread", "randwrite"):
+                raise ValueError("Invalid randio mode: {}".format(mode))
+
+            result["randio"][mode] = {}
+
+            for block_size in settings["block_sizes"]:
+                bs_bytes = utils.parse_size(block_size)
+                bs_direct = seqio.check_direct(
+                    bs_bytes, filesystem["alignment"], direct
+                )
+                sweep = result["randio"][mode][str(block_size)] = {}
+
+                for queue_depth in settings["queue_depths"]:
+                    _log.info(
+                        "Running randio %s bs=%s qd=%s", mode, block_size, queue_depth
+                    )
+                    evictor.evict([path])
+                    sweep[str(queue_depth)] = run_queue_depth(
+                        path,
+                        mode,
+                        bs_bytes,
+                        file_size,
+                        int(queue_depth),
+                        float(settings["runtime"]),
+                        bs_direct,
+                    )
+                    _log.debug("randio result: %s", sweep[str(queue_depth)])
+
+    except (OSError, ValueError):
+        _log.exception("randio benchmark failed.")
+        return 1
+
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    result["randio"]["cold_cache"] = evictor.report()
+
+    # Save result to json
+    with open(os.path.join(rundir, "randio_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from randio: %s", result)
+
+    return 0
@@ -0,0 +1,240 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import logging
+import math
+import statistics
+import time
+
+from iobenchmarksuite import utils
+
+_log = logging.getLogger(__name__)
+
+# Settings of the repetition controller, overridden by global.repetitions
+DEFAULTS = {
+    # Benchmarks to repeat, all selected ones if unset
+    "benchmarks": None,
+    # Stop once the CI half-width is below this fraction of the mean
+    "ci_rel_halfwidth": 0.02,
+    "confidence": 0.95,
+    # Repetitions kept after warm-up before the stopping rule applies
+    "min_runs": 3,
+    "max_runs": 10,
+    # Seconds per benchmark; no repetition starts that would end later
+    "max_time": 3600,
+    # Leading repetitions that may be discarded as warm-up
+    "max_warmup": 2,
+    # Dotted path of the primary metric in the result file, per benchmark
+    "metric": {},
+}
+
+# Two-sided Student t quantiles for 1 to 30 degrees of freedom
+# fmt: off
+T_QUANTILES = {
+    0.90: (6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+           1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697),
+    0.95: (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042),
+    0.99: (63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750),
+}
+# fmt: on
+
+# Normal quantiles used past 30 degrees of freedom
+Z_QUANTILES = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+
+
+def t_quantile(confidence, dof):
+    """Two-sided Student t quantile for a confidence level of T_QUANTILES."""
+    if dof > len(T_QUANTILES[confidence]):
+        return Z_QUANTILES[confidence]
+    return T_QUANTILES[confidence][dof - 1]
+
+
+def detect_warmup(samples, max_warmup=2):
+    """Number of leading samples that look like warm-up.
+
+    A leading sample is warm-up when it lies outside the spread of the
+    samples after it: more than 3 scaled MADs, and more than 1%, away
+    from their median. At least 3 samples are kept to judge.
+    """
+    warmup = 0
+    while warmup < max_warmup and len(samples) - warmup > 3:
+        rest = samples[warmup + 1 :]
+        median = statistics.median(rest)
+        mad = 1.4826 * statistics.median(abs(value - median) for value in rest)
+        deviation = abs(samples[warmup] - median)
+        if deviation <= 3 * mad or deviation <= 0.01 * abs(median):
+            break
+        warmup += 1
+    return warmup
+
+
+def summarize(samples, confidence=0.95, max_warmup=2):
+    """Mean, stdev and confidence interval of samples after warm-up.
+
+    Returns:
+      A dict with the number of warm-up samples discarded, the number
+      kept, their mean, stdev, CI bounds and relative CI half-width.
+    """
+    warmup = detect_warmup(samples, max_warmup)
+    kept = samples[warmup:]
+    mean = statistics.mean(kept)
+    stdev = statistics.stdev(kept) if len(kept) > 1 else 0.0
+    summary = {
+        "warmup": warmup,
+        "n": len(kept),
+        "mean": round(mean, 4),
+        "stdev": round(stdev, 4),
+        "ci_low": None,
+        "ci_high": None,
+        "ci_rel_halfwidth": None,
+    }
+
+    # No interval from a single sample
+    if len(kept) > 1:
+        half = t_quantile(confidence, len(kept) - 1) * stdev / math.sqrt(len(kept))
+        summary["ci_low"] = round(mean - half, 4)
+        summary["ci_high"] = round(mean + half, 4)
+        if mean:
+            summary["ci_rel_halfwidth"] = round(half / abs(mean), 4)
+
+    return summary
+
+
+def largest_block(block_sizes):
+    """Key of the largest block size of a sweep."""
+    return max(block_sizes, key=utils.parse_size)
+
+
+def peak_iops(profile):
+    """Peak random read (or write) IOPS at the first block size."""
+    sweeps = profile.get("randread") or profile["randwrite"]
+    return max(res["iops"] for res in next(iter(sweeps.values())).values())
+
+
+def spec_score(profiles, bench):
+    """Score of a hepspec06 or SPEC CPU2017 run, 64-bit first."""
+    for key in (bench + "_64", bench, bench + "_32"):
+        if key in profiles:
+            return profiles[key]["score"]
+    raise KeyError(bench)
+
+
+# Default primary metric of each benchmark, from its profiles
+PRIMARY_METRICS = {
+    "db12": lambda p: p["DB12"]["value"],
+    "hs06": lambda p: spec_score(p, "hs06"),
+    "spec2017": lambda p: spec_score(p, "spec2017"),
+    "hepscore": lambda p: p["hepscore"].get("report", p["hepscore"])["score"],
+    "seqio": lambda p: p["seqio"]["block_sizes"][
+        largest_block(p["seqio"]["block_sizes"])
+    ]["read_mean"],
+    "randio": lambda p: peak_iops(p["randio"]),
+    "fio": lambda p: sum(
+        res[direction]["bw_MBps"]
+        for res in p["fio"]["jobs"].values()
+        for direction in ("read", "write", "trim")
+        if direction in res
+    ),
+    "ior": lambda p: p["ior"].get("shared", p["ior"].get("fpp"))["read"][
+        "aggregate_MBps"
+    ],
+    "mdtest": lambda p: p["mdtest"]["create"],
+    "replay": lambda p: p["replay"]["aggregate_MBps"],
+    "httpio": lambda p: p["httpio"]["concurrency"][
+        max(p["httpio"]["concurrency"], key=int)
+    ]["MBps"],
+}
+
+
+class Repetitions:
+    """Decide when a repeated benchmark has converged.
+
+    Args:
+      bench: Name of the benchmark.
+      conf:  Overrides of DEFAULTS.
+    """
+
+    def __init__(self, bench, conf=None):
+        self.bench = bench
+        self.settings = dict(DEFAULTS, **(conf or {}))
+        if self.settings["confidence"] not in T_QUANTILES:
+            raise ValueError("Confidence must be one of {}".format(sorted(T_QUANTILES)))
+
+        self.metric = (self.settings["metric"] or {}).get(bench)
+        self.samples = []
+        self.durations = []
+        self.stopped_by = None
+        self._start = time.time()
+
+    def value(self, profiles):
+        """Primary metric of a repetition, None if not found."""
+        try:
+            if self.metric:
+                value = profiles
+                for key in self.metric.split("."):
+                    value = value[key]
+            else:
+                value = PRIMARY_METRICS[self.bench](profiles)
+            return float(value)
+        except (KeyError, IndexError, StopIteration, TypeError, ValueError):
+            _log.warning("No primary metric found in the %s results.", self.bench)
+            return None
+
+    def add(self, value, duration):
+        """Record the metric and wall time of a repetition."""
+        self.samples.append(value)
+        self.durations.append(round(duration, 3))
+
+    def done(self):
+        """True once the CI is narrow enough or the budget is spent."""
+        if not self.samples:
+            return False
+
+        settings = self.settings
+        summary = summarize(
+            self.samples, settings["confidence"], settings["max_warmup"]
+        )
+
+        if (
+            summary["n"] >= settings["min_runs"]
+            and summary["ci_rel_halfwidth"] is not None
+            and summary["ci_rel_halfwidth"] <= settings["ci_rel_halfwidth"]
+        ):
+            self.stopped_by = "ci_rel_halfwidth"
+        elif len(self.samples) >= settings["max_runs"]:
+            self.stopped_by = "max_runs"
+        elif time.time() - self._start + max(self.durations) > settings["max_time"]:
+            # The next repetition would not fit in the budget
+            self.stopped_by = "max_time"
+
+        return self.stopped_by is not None
+
+    def report(self):
+        """Statistics of the primary metric with all samples."""
+        report = {
+            "metric": self.metric or "default",
+            "confidence": self.settings["confidence"],
+            "target_ci_rel_halfwidth": self.settings["ci_rel_halfwidth"],
+            "stopped_by": self.stopped_by,
+            "samples": self.samples,
+            "durations": self.durations,
+        }
+        if self.samples:
+            report.update(
+                summarize(
+                    self.samples,
+                    self.settings["confidence"],
+                    self.settings["max_warmup"],
+                )
+            )
+        return report
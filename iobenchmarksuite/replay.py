@@ -0,0 +1,471 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import time
+from array import array
+
+from iobenchmarksuite import histogram
+from iobenchmarksuite import pagecache
+from iobenchmarksuite import seqio
+
+_log = logging.getLogger(__name__)
+
+# Values used when the replay section of the configuration omits a key
+DEFAULTS = {
+    "mode": "afap",
+    "parallel": 1,
+    "cold_cache": False,
+    "drop_caches": False,
+}
+
+# On-disk trace layout:
+#   header  - magic, number of records, offset of the file table
+#   records - fixed size (timestamp, offset, size, file id, op)
+#   footer  - JSON list with the file names, indexed by file id
+MAGIC = b"IOBMKTR1"
+HEADER = struct.Struct("<8sQQ")
+RECORD = struct.Struct("<dQIIB")
+
+OP_READ = 0
+OP_WRITE = 1
+
+# Syscalls understood when converting strace logs
+STRACE_CALLS = (
+    "open,openat,close,lseek,read,write,pread64,pwrite64,readv,writev,preadv,pwritev"
+)
+STRACE_LINE = re.compile(
+    r"^(?:(?P<pid>\d+)\s+)?(?P<ts>\d+\.\d+)\s+(?P<call>\w+)\((?P<args>.*)\)\s+=\s+(?P<ret>-?\d+)"
+)
+STRACE_LINE_START = re.compile(r"^(?:(?P<pid>\d+)\s+)?\d+\.\d+\s")
+STRACE_PATH = re.compile(r'"((?:[^"\\]|\\.)*)"')
+STRACE_UNFINISHED = " <unfinished ...>"
+STRACE_RESUMED = re.compile(r"^(?:(?P<pid>\d+)\s+)?\S+\s+<\.\.\. \w+ resumed>")
+
+
+class TraceWriter:
+    """Stream I/O records to a compact binary trace."""
+
+    def __init__(self, path):
+        self._fout = open(path, "wb")
+        self._fout.write(HEADER.pack(MAGIC, 0, 0))
+        self._files = {}
+        self._count = 0
+        self._t0 = None
+
+    def add(self, timestamp, name, offset, size, op):
+        """Append one record, timestamps are stored relative to the first one."""
+        if self._t0 is None:
+            self._t0 = timestamp
+
+        file_id = self._files.setdefault(name, len(self._files))
+        self._fout.write(RECORD.pack(timestamp - self._t0, offset, size, file_id, op))
+        self._count += 1
+
+    @property
+    def count(self):
+        """Number of records written so far."""
+        return self._count
+
+    def close(self):
+        """Write the file table and finalize the header."""
+        table_offset = self._fout.tell()
+        names = sorted(self._files, key=self._files.get)
+        self._fout.write(json.dumps(names).encode("utf-8"))
+        self._fout.seek(0)
+        self._fout.write(HEADER.pack(MAGIC, self._count, table_offset))
+        self._fout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trace:
+    """Read-only, memory-mapped view of a binary trace.
+
+    Records are decoded one at a time while iterating, so the trace is
+    never loaded into Python lists.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, table_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not an iobmk trace: {}".format(path))
+
+        self.files = json.loads(self._map[table_offset:].decode("utf-8"))
+        self._end = HEADER.size + self.count * RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for pos in range(HEADER.size, self._end, RECORD.size):
+            yield RECORD.unpack_from(self._map, pos)
+
+    def extents(self):
+        """Scan the trace once for the data it needs.
+
+        Returns:
+          A tuple (array with the highest byte touched per file, largest request).
+        """
+        extents = array("Q", [0] * len(self.files))
+        max_size = 0
+
+        for _, offset, size, file_id, _ in self:
+            extents[file_id] = max(extents[file_id], offset + size)
+            max_size = max(max_size, size)
+
+        return extents, max_size
+
+    def close(self):
+        """Release the mapping."""
+        self._map.close()
+        self._file.close()
+
+
+def trace_from_strace(strace_log, trace_path):
+    """Convert an strace log into a binary trace.
+
+    The log is expected from strace -f -ttt. File descriptors are tracked
+    per trace rather than per process, which matches single-process and
+    multi-threaded workloads.
+
+    Args:
+      strace_log: Path to the strace output.
+      trace_path: Path of the trace to write.
+
+    Returns:
+      The number of records written.
+    """
+    fds = {}
+    positions = {}
+    pending = {}
+
+    with open(strace_log, "r", errors="replace") as fin, TraceWriter(
+        trace_path
+    ) as trace:
+        for line in fin:
+            line = line.rstrip("\n")
+
+            # Calls interrupted by another thread are split over two lines
+            if line.endswith(STRACE_UNFINISHED):
+                match = STRACE_LINE_START.match(line)
+                if match:
+                    pending[match.group("pid")] = line[: -len(STRACE_UNFINISHED)]
+                continue
+
+            resumed = STRACE_RESUMED.match(line)
+            if resumed:
+                if resumed.group("pid") not in pending:
+                    continue
+                line = pending.pop(resumed.group("pid")) + line[resumed.end() :]
+
+            match = STRACE_LINE.match(line)
+            if match is None:
+                continue
+
+            call, args, ret = match.group("call", "args", "ret")
+            ret = int(ret)
+            if ret < 0:
+                continue
+
+            if call in ("open", "openat"):
+                path = STRACE_PATH.search(args)
+                if path:
+                    fds[ret] = path.group(1)
+                    positions[ret] = 0
+                continue
+
+            fields = args.split(", ")
+            try:
+                fd = int(fields[0])
+            except ValueError:
+                continue
+
+            if fd not in fds:
+                continue
+
+            if call == "close":
+                del fds[fd]
+            elif call == "lseek":
+                positions[fd] = ret
+            elif ret > 0:
+                op = OP_READ if call.startswith(("read", "pread")) else OP_WRITE
+
+                # Positional calls carry their offset as last argument
+                if call.startswith(("pread", "pwrite")):
+                    offset = int(fields[-1])
+                else:
+                    offset = positions[fd]
+                    positions[fd] += ret
+
+                trace.add(float(match.group("ts")), fds[fd], offset, ret, op)
+
+        return trace.count
+
+
+def record(cmd, trace_path):
+    """Run a command under strace and store its I/O as a binary trace.
+
+    Args:
+      cmd:        A list with the command and its arguments.
+      trace_path: Path of the trace to write.
+
+    Returns:
+      The number of records written.
+    """
+    if shutil.which("strace") is None:
+        raise OSError("strace is required to record a trace.")
+
+    strace_log = trace_path + ".strace"
+    subprocess.call(
+        ["strace", "-f", "-ttt", "-qq", "-e", "trace=" + STRACE_CALLS, "-o", strace_log]
+        + list(cmd)
+    )
+
+    try:
+        return trace_from_strace(strace_log, trace_path)
+    finally:
+        os.remove(strace_log)
+
+
+def prepare_files(workdir, extents):
+    """Create the files a replay reads from, filled up to their extent.
+
+    Returns:
+      A list with the path of each file, indexed by file id.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    chunk = seqio.aligned_buffer(1024 * 1024)
+    paths = []
+
+    try:
+        for file_id, extent in enumerate(extents):
+            path = os.path.join(workdir, "file.{}".format(file_id))
+            with open(path, "wb") as fout:
+                remaining = extent
+                while remaining > 0:
+                    remaining -= fout.write(chunk[: min(remaining, len(chunk))])
+                os.fsync(fout.fileno())
+            paths.append(path)
+    finally:
+        chunk.close()
+
+    return paths
+
+
+def replay_worker(args):
+    """Replay a trace once against prepared files.
+
+    Args:
+      args: A tuple (trace path, list of file paths, mode, largest request).
+
+    Returns:
+      A dict with the elapsed time, bytes moved, lag and the Histogram of
+      op latencies.
+    """
+    trace_path, paths, mode, max_size = args
+    trace = Trace(trace_path)
+    fds = [os.open(path, os.O_RDWR) for path in paths]
+    view = memoryview(bytearray(max(max_size, 1)))
+    latencies = histogram.Histogram()
+    moved = {OP_READ: 0, OP_WRITE: 0}
+    lag = 0.0
+
+    try:
+        start = time.perf_counter()
+
+        for timestamp, offset, size, file_id, op in trace:
+            if mode == "timed":
+                delay = timestamp - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lag = max(lag, -delay)
+
+            issued = time.perf_counter()
+            if op == OP_READ:
+                moved[op] += len(os.pread(fds[file_id], size, offset))
+            else:
+                moved[op] += os.pwrite(fds[file_id], view[:size], offset)
+            latencies.record(time.perf_counter() - issued)
+
+        elapsed = time.perf_counter() - start
+
+    finally:
+        for fd in fds:
+            os.close(fd)
+        trace.close()
+
+    return {
+        "elapsed": elapsed,
+        "read_bytes": moved[OP_READ],
+        "write_bytes": moved[OP_WRITE],
+        "lag": lag,
+        "latencies": latencies,
+    }
+
+
+def validate_replay(conf):
+    """Check if the configuration is valid for replay.
+
+    Args:
+      conf: A dict with the replay configuration section.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    if not conf or not conf.get("trace"):
+        _log.error("No trace found in the replay configuration.")
+        return 1
+
+    if not os.path.isfile(conf["trace"]):
+        _log.error("Trace file not found: %s", conf["trace"])
+        return 1
+
+    if conf.get("mode", DEFAULTS["mode"]) not in ("afap", "timed"):
+        _log.error("Invalid replay mode: %s", conf["mode"])
+        return 1
+
+    return 0
+
+
+def run_replay(rundir=".", conf=None):
+    """Replay a recorded I/O trace and save the result.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the replay configuration section.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    _log.debug("Running replay with rundir=%s settings=%s", rundir, settings)
+
+    parallel = max(1, int(settings["parallel"]))
+    workdir = os.path.join(rundir, "REPLAY")
+    filesystem = seqio.probe_rundir(rundir)
+
+    try:
+        trace = Trace(settings["trace"])
+        try:
+            extents, max_size = trace.extents()
+            records = len(trace)
+        finally:
+            trace.close()
+
+        _log.info(
+            "Replaying %s records over %s files, %s parallel replays in %s mode",
+            records,
+            len(extents),
+            parallel,
+            settings["mode"],
+        )
+
+        jobs = [
+            (
+                settings["trace"],
+                prepare_files(os.path.join(workdir, str(i)), extents),
+                settings["mode"],
+                max_size,
+            )
+            for i in range(parallel)
+        ]
+
+        # Preparing the data leaves it in the page cache
+        evictor = pagecache.Evictor(settings["cold_cache"], settings["drop_caches"])
+        evictor.evict([path for job in jobs for path in job[1]])
+
+        with multiprocessing.Pool(processes=parallel) as pool:
+            replays = pool.map(replay_worker, jobs, chunksize=1)
+
+    except (OSError, ValueError, KeyError):
+        _log.exception("replay benchmark failed.")
+        return 1
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    elapsed = max(rep["elapsed"] for rep in replays)
+    nbytes = sum(rep["read_bytes"] + rep["write_bytes"] for rep in replays)
+    latencies = histogram.Histogram()
+    for rep in replays:
+        latencies.merge(rep["latencies"])
+
+    result = {
+        "replay": {
+            "unit": {"throughput": "MB/s", "latency": "ms", "time": "s"},
+            "trace": os.path.basename(settings["trace"]),
+            "records": records,
+            "mode": settings["mode"],
+            "parallel": parallel,
+            "elapsed": round(elapsed, 3),
+            "read_bytes": sum(rep["read_bytes"] for rep in replays),
+            "write_bytes": sum(rep["write_bytes"] for rep in replays),
+            "aggregate_MBps": seqio.mbps(nbytes, elapsed),
+            "cold_cache": evictor.report(),
+            "filesystem": filesystem,
+            "latency_ms": latencies.summary(),
+            "histogram": latencies.to_dict(),
+        }
+    }
+
+    if settings["mode"] == "timed":
+        result["replay"]["max_lag"] = round(max(rep["lag"] for rep in replays), 3)
+
+    # Save result to json
+    with open(os.path.join(rundir, "replay_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from replay: %s", result)
+
+    return 0
+
+
+def main():
+    """Record or convert traces from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m iobenchmarksuite.replay",
+        description="Record the I/O of a workload as a trace for the replay benchmark.",
+    )
+    parser.add_argument("-o", "--output", required=True, help="Trace file to write.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--strace", help="Convert an existing strace -f -ttt log.")
+    source.add_argument("--record", nargs=argparse.REMAINDER, help="Command to trace.")
+    args = parser.parse_args()
+
+    if args.strace:
+        count = trace_from_strace(args.strace, args.output)
+    else:
+        count = record(args.record, args.output)
+
+    print("{} records written to {}".format(count, args.output))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
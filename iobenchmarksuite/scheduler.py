@@ -0,0 +1,162 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_log = logging.getLogger(__name__)
+
+# Resources a task can hold exclusively
+CPU = "cpu"
+DISK = "disk"
+
+
+class Task:
+    """A unit of work of the suite with its resource needs.
+
+    Args:
+      name:      Unique name of the task.
+      func:      Callable run without arguments.
+      resources: Resources held exclusively while the task runs, none
+                 for tasks that can overlap with anything.
+      after:     Names of the tasks that must finish first.
+    """
+
+    def __init__(self, name, func, resources=(), after=()):
+        self.name = name
+        self.func = func
+        self.resources = frozenset(resources)
+        self.after = tuple(after)
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+
+    def conflicts(self, other):
+        """True if both tasks need the same resource."""
+        return bool(self.resources & other.resources)
+
+    def __repr__(self):
+        return "Task({}, {})".format(self.name, self.state)
+
+
+class Scheduler:
+    """Run tasks concurrently as long as their resources do not conflict.
+
+    A task starts once the tasks it comes after are finished and no
+    running task holds one of its resources. Tasks are considered in
+    list order and never overtake an earlier task they conflict with,
+    so conflicting tasks keep the order they were given in.
+
+    The first task raising an exception stops the schedule: the running
+    tasks finish, the pending ones are skipped, and run() raises it.
+    """
+
+    def __init__(self, tasks):
+        names = [task.name for task in tasks]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate task names: {}".format(names))
+
+        for task in tasks:
+            unknown = set(task.after) - set(names[: names.index(task.name)])
+            if unknown:
+                raise ValueError(
+                    "Task {} comes after unknown or later tasks: {}".format(
+                        task.name, sorted(unknown)
+                    )
+                )
+
+        self.tasks = tasks
+        self._origin = None
+
+    def ready(self, task):
+        """True if the task can start now."""
+        by_name = {other.name: other for other in self.tasks}
+        if any(by_name[name].state in ("pending", "running") for name in task.after):
+            return False
+
+        for other in self.tasks:
+            if other is task:
+                break
+            # Earlier tasks that are not done yet keep their place
+            if other.state == "pending" and other.conflicts(task):
+                return False
+
+        return not any(
+            other.state == "running" and other.conflicts(task) for other in self.tasks
+        )
+
+    def _run_task(self, task):
+        """Run a task and record its timing."""
+        task.start = time.time()
+        try:
+            return task.func()
+        finally:
+            task.end = time.time()
+
+    def run(self):
+        """Run all tasks to completion.
+
+        Returns:
+          The tasks, with their state, result and timing.
+        """
+        self._origin = time.time()
+        error = None
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=len(self.tasks) or 1) as pool:
+            while True:
+                if error is None:
+                    for task in self.tasks:
+                        if task.state == "pending" and self.ready(task):
+                            _log.debug("Starting task %s", task.name)
+                            task.state = "running"
+                            futures[pool.submit(self._run_task, task)] = task
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = futures.pop(future)
+                    try:
+                        task.result = future.result()
+                        task.state = "done"
+                    except BaseException as err:
+                        task.error = err
+                        task.state = "failed"
+                        _log.debug("Task %s failed: %r", task.name, err)
+                        error = error or err
+
+        for task in self.tasks:
+            if task.state == "pending":
+                task.state = "skipped"
+
+        if error is not None:
+            raise error
+
+        return self.tasks
+
+    def timeline(self):
+        """Start and end of the finished tasks, in seconds since run().
+
+        Returns:
+          A dict {name: {"start", "end", "resources", "state"}}.
+        """
+        return {
+            task.name: {
+                "start": round(task.start - self._origin, 3),
+                "end": round(task.end - self._origin, 3),
+                "resources": sorted(task.resources),
+                "state": task.state,
+            }
+            for task in self.tasks
+            if task.state in ("done", "failed")
+        }
@@ -0,0 +1,334 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import errno
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+
+from iobenchmarksuite import histogram
+from iobenchmarksuite import pagecache
+from iobenchmarksuite import utils
+from iobenchmarksuite.plugins.extractor import Extractor
+
+_log = logging.getLogger(__name__)
+
+# Values used when the seqio section of the configuration omits a key
+DEFAULTS = {
+    "file_size": "1G",
+    "block_sizes": ["4k", "64k", "1M", "4M"],
+    "iterations": 3,
+    "direct": True,
+    "cold_cache": False,
+    "drop_caches": False,
+}
+
+# O_DIRECT is Linux specific; fall back to buffered I/O elsewhere
+O_DIRECT = getattr(os, "O_DIRECT", 0)
+
+# Filesystem kinds recorded in the results of the native benchmarks
+FS_KINDS = ("Tmpfs", "Overlay", "NFS", "Lustre", "EOS_FUSE", "CVMFS")
+
+
+def probe_rundir(rundir):
+    """Characterize the filesystem a native benchmark runs on.
+
+    Warns when the rundir is on a container overlay or in memory, where
+    the results do not measure the host storage.
+
+    Returns:
+      A dict with the filesystem type, mount point, O_DIRECT alignment,
+      NUMA node of the backing device and the kinds of FS_KINDS that apply.
+    """
+    fs_info = Extractor.get_filesystem(rundir)
+    kinds = [kind for kind in FS_KINDS if fs_info[kind]]
+
+    if fs_info["Overlay"]:
+        _log.warning(
+            "Rundir %s is on an overlay filesystem, results measure the "
+            "container layer. Mount a host volume as rundir instead.",
+            rundir,
+        )
+    elif fs_info["Tmpfs"]:
+        _log.warning("Rundir %s is in memory (%s).", rundir, fs_info["FS_Type"])
+
+    return {
+        "type": fs_info["FS_Type"],
+        "mount_point": fs_info["Mount_Point"],
+        "alignment": fs_info["Alignment"],
+        "numa_node": fs_info["NUMA_Node"],
+        "kinds": kinds,
+    }
+
+
+def check_direct(block_size, alignment, direct):
+    """O_DIRECT transfers must be a multiple of the device block size.
+
+    Returns:
+      The direct flag, disabled if block_size is not aligned.
+    """
+    if direct and block_size % alignment:
+        _log.warning(
+            "Block size %s is not a multiple of %s, disabling O_DIRECT.",
+            block_size,
+            alignment,
+        )
+        return False
+    return direct
+
+
+def probe_direct(rundir, direct):
+    """Check once per run whether the rundir accepts O_DIRECT.
+
+    tmpfs and some FUSE mounts refuse O_DIRECT with EINVAL. Probing up
+    front warns a single time instead of on every open.
+
+    Returns:
+      The direct flag, disabled if O_DIRECT is refused or unavailable.
+    """
+    if not direct or not O_DIRECT:
+        return False
+
+    fd, path = tempfile.mkstemp(prefix=".direct-probe-", dir=rundir)
+    os.close(fd)
+    try:
+        os.close(os.open(path, os.O_RDONLY | O_DIRECT))
+        return True
+    except OSError as err:
+        if err.errno != errno.EINVAL:
+            raise
+        _log.warning("O_DIRECT not supported in %s, using buffered I/O.", rundir)
+        return False
+    finally:
+        os.remove(path)
+
+
+def aligned_buffer(size):
+    """Allocate a page-aligned buffer filled with random data.
+
+    Anonymous mmap regions always start on a page boundary, which is what
+    O_DIRECT requires from user buffers.
+
+    Args:
+      size: Size of the buffer in bytes.
+
+    Returns:
+      A writable mmap object of the requested size.
+    """
+    buf = mmap.mmap(-1, size)
+    buf.write(os.urandom(size))
+    buf.seek(0)
+    return buf
+
+
+def open_file(path, flags, direct):
+    """Open a file, optionally bypassing the page cache.
+
+    Args:
+      path:   Path of the file to open.
+      flags:  os.open flags.
+      direct: Request O_DIRECT.
+
+    Returns:
+      A tuple (fd, direct) where direct reports if O_DIRECT is in use.
+    """
+    if direct and O_DIRECT:
+        try:
+            return os.open(path, flags | O_DIRECT, 0o644), True
+        except OSError as err:
+            # tmpfs and some FUSE mounts refuse O_DIRECT
+            if err.errno != errno.EINVAL:
+                raise
+            _log.warning("O_DIRECT not supported on %s, using buffered I/O.", path)
+
+    return os.open(path, flags, 0o644), False
+
+
+def write_pass(path, buf, count, direct, latencies=None):
+    """Sequentially write count blocks of buf to path.
+
+    If a Histogram is given, the latency of every write is recorded in it.
+
+    Returns:
+      A tuple (elapsed seconds, O_DIRECT in use).
+    """
+    fd, direct = open_file(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, direct)
+
+    try:
+        start = time.perf_counter()
+        issued = start
+        for _ in range(count):
+            if os.write(fd, buf) != len(buf):
+                raise OSError(errno.EIO, "Short write on {}".format(path))
+            if latencies is not None:
+                now = time.perf_counter()
+                latencies.record(now - issued)
+                issued = now
+        os.fsync(fd)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.close(fd)
+
+    return elapsed, direct
+
+
+def read_pass(path, buf, direct, latencies=None):
+    """Sequentially read path to its end using buf.
+
+    If a Histogram is given, the latency of every read is recorded in it.
+
+    Returns:
+      A tuple (elapsed seconds, bytes read, O_DIRECT in use).
+    """
+    fd, direct = open_file(path, os.O_RDONLY, direct)
+    total = 0
+
+    try:
+        start = time.perf_counter()
+        issued = start
+        nbytes = os.readv(fd, [buf])
+        while nbytes:
+            if latencies is not None:
+                now = time.perf_counter()
+                latencies.record(now - issued)
+                issued = now
+            total += nbytes
+            nbytes = os.readv(fd, [buf])
+        elapsed = time.perf_counter() - start
+    finally:
+        os.close(fd)
+
+    return elapsed, total, direct
+
+
+def mbps(nbytes, elapsed):
+    """Convert bytes over seconds to MB/s."""
+    if elapsed <= 0:
+        return 0.0
+    return round(nbytes / elapsed * (10 ** -6), 2)
+
+
+def run_block_size(
+    path, block_size, file_size, iterations, direct, evictor, alignment=mmap.PAGESIZE
+):
+    """Run all iterations of the write/read cycle for a single block size.
+
+    With a cold cache the written file is evicted before it is read back.
+    O_DIRECT is only used if block_size is a multiple of alignment.
+
+    Returns:
+      A dict with the per-iteration and mean MB/s of each phase, and the
+      per-operation latency summary and histogram of each phase.
+    """
+    count = max(1, file_size // block_size)
+    nbytes = count * block_size
+
+    direct = check_direct(block_size, alignment, direct)
+    buf = aligned_buffer(block_size)
+    result = {"write": [], "read": [], "direct": direct}
+    latencies = {"write": histogram.Histogram(), "read": histogram.Histogram()}
+
+    try:
+        for i in range(iterations):
+            elapsed, used_direct = write_pass(
+                path, buf, count, direct, latencies["write"]
+            )
+            result["write"].append(mbps(nbytes, elapsed))
+
+            evictor.evict([path])
+            elapsed, total, used_direct = read_pass(
+                path, buf, used_direct, latencies["read"]
+            )
+            result["read"].append(mbps(total, elapsed))
+            result["direct"] = used_direct
+
+            _log.debug(
+                "seqio bs=%s iteration %s: write %s MB/s, read %s MB/s",
+                block_size,
+                i,
+                result["write"][-1],
+                result["read"][-1],
+            )
+    finally:
+        buf.close()
+
+    for phase in ("write", "read"):
+        result["{}_mean".format(phase)] = round(
+            sum(result[phase]) / len(result[phase]), 2
+        )
+        result["{}_latency_ms".format(phase)] = latencies[phase].summary()
+
+    result["histograms"] = {phase: hist.to_dict() for phase, hist in latencies.items()}
+
+    return result
+
+
+def run_seqio(rundir=".", conf=None):
+    """Run the sequential throughput benchmark and save its result.
+
+    Args:
+      rundir: The running directory of benchmark.
+      conf:   A dict with the seqio configuration section.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    settings = DEFAULTS.copy()
+    settings.update(conf or {})
+    _log.debug("Running seqio with rundir=%s settings=%s", rundir, settings)
+
+    file_size = utils.parse_size(settings["file_size"])
+    iterations = max(1, int(settings["iterations"]))
+    path = os.path.join(rundir, "seqio.dat")
+    evictor = pagecache.Evictor(settings["cold_cache"], settings["drop_caches"])
+    filesystem = probe_rundir(rundir)
+
+    result = {
+        "seqio": {
+            "unit": "MB/s",
+            "file_size": file_size,
+            "iterations": iterations,
+            "filesystem": filesystem,
+            "block_sizes": {},
+        }
+    }
+
+    try:
+        direct = probe_direct(rundir, settings["direct"])
+        for block_size in settings["block_sizes"]:
+            _log.info("Running seqio with block size %s", block_size)
+            result["seqio"]["block_sizes"][str(block_size)] = run_block_size(
+                path,
+                utils.parse_size(block_size),
+                file_size,
+                iterations,
+                direct,
+                evictor,
+                filesystem["alignment"],
+            )
+
+    except (OSError, ValueError):
+        _log.exception("seqio benchmark failed.")
+        return 1
+
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    result["seqio"]["cold_cache"] = evictor.report()
+
+    # Save result to json
+    with open(os.path.join(rundir, "seqio_result.json"), "w") as fout:
+        json.dump(result, fout)
+
+    _log.debug("Result from seqio: %s", result)
+
+    return 0
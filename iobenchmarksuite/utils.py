@@ -9,6 +9,7 @@
 import json
 import logging
 import os
+import re
 import socket
 import subprocess
 import sys
@@ -19,6 +20,7 @@ from urllib.error import HTTPError, URLError
 
 from iobenchmarksuite.plugins.extractor import Extractor
 from iobenchmarksuite import __version__
+from iobenchmarksuite import histogram
 
 _log = logging.getLogger(__name__)
 
@@ -128,6 +130,31 @@ def get_tags_env():
     return tags
 
 
+def parse_size(size):
+    """Convert a human readable size into bytes.
+
+    Args:
+      size: An int, or a string such as '4k', '1M' or '2G' (powers of 1024).
+
+    Returns:
+      An int with the size in bytes.
+
+    Raises:
+      ValueError: If the size cannot be parsed.
+    """
+    if isinstance(size, int):
+        return size
+
+    UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+    match = re.fullmatch(r"([0-9]*\.?[0-9]+)\s*([kmgt]?)b?", str(size).strip().lower())
+
+    if match is None:
+        raise ValueError("Invalid size: {}".format(size))
+
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
 def exec_cmd(cmd_str):
     """Execute a command string and returns its output.
 
@@ -191,7 +218,15 @@ def bench_versions(conf):
         if bench == "hs06":
             bench_versions[bench] = conf["hepspec06"]["image"].split(":")[-1]
 
-        elif bench == "db12":
+        elif bench in (
+            "db12",
+            "seqio",
+            "randio",
+            "ior",
+            "mdtest",
+            "replay",
+            "httpio",
+        ):
             bench_versions[bench] = "v0.1"
 
         elif bench == "spec2017":
@@ -200,6 +235,12 @@ def bench_versions(conf):
         elif bench == "hepscore":
             bench_versions[bench] = conf["hepscore"]["version"]
 
+        elif bench == "fio":
+            if "image" in conf["fio"]:
+                bench_versions[bench] = conf["fio"]["image"].split(":")[-1]
+            else:
+                bench_versions[bench], _ = exec_cmd("fio --version")
+
         else:
             bench_versions[bench] = "not_available"
             _log.warning("No version found for benchmark: %s", bench)
@@ -208,12 +249,32 @@ def bench_versions(conf):
     return bench_versions
 
 
-def prepare_metadata(full_conf, extra):
+def collect_metadata(params):
+    """Collect the software, hardware and filesystem metadata of the host.
+
+    Args:
+      params: The global section of the configuration.
+
+    Returns:
+      A dict with the SW, HW and FS metadata and the privileged flag.
+    """
+    hw_data = Extractor(params)
+
+    return {
+        "SW": hw_data.collect_sw(),
+        "HW": hw_data.collect_hw(),
+        "FS": hw_data.collect_filesystem(),
+        "privileged": hw_data.privileged,
+    }
+
+
+def prepare_metadata(full_conf, extra, metadata=None):
     """Construct a json with cli inputs and extra fields.
 
     Args:
       cli_inputs: Arguments that were passed directly with cli
       extra:  Extra dict with fields to include
+      metadata: Host metadata from collect_metadata, collected now if None
 
     Returns:
       A dict containing hardware metadata, tags, flags & extra fields
@@ -245,10 +306,15 @@ def prepare_metadata(full_conf, extra):
         except:
             result["host"].update({"{}".format(i): "not_defined"})
 
+    # Collect Software and Hardware metadata from hwmetadata plugin
+    if metadata is None:
+        metadata = collect_metadata(params)
+
     # Hep-benchmark-suite flags
     flags = {
         "mp_num": params["mp_num"],
         "run_mode": params["mode"],
+        "privileged": metadata["privileged"],
     }
 
     result["suite"].update(
@@ -259,15 +325,7 @@ def prepare_metadata(full_conf, extra):
         }
     )
 
-    # Collect Software and Hardware metadata from hwmetadata plugin
-    hw_data = Extractor(params)
-
-    result["host"].update(
-        {
-            "SW": hw_data.collect_sw(),
-            "HW": hw_data.collect_hw(),
-        }
-    )
+    result["host"].update({key: metadata[key] for key in ("SW", "HW", "FS")})
 
     return result
 
@@ -285,8 +343,29 @@ def print_results(results):
     print("Suite end:   {}".format(results["_timestamp_end"]))
     print("Machine CPU Model: {}".format(results["host"]["HW"]["CPU"]["CPU_Model"]))
 
+    snap = results["suite"].get("snapshot", {})
+    if snap.get("contaminated"):
+        print("Contaminated run: {}".format("; ".join(snap["reasons"])))
+
     data = results["profiles"]
 
+    def percentiles(summary, unit="ms"):
+        # The same percentiles for every benchmark, e.g. "p50 1.2/p99 3.4 ms"
+        return "{} {}".format(
+            "/".join(
+                "p{} {}".format(pct, summary["p{}".format(pct)])
+                for pct in histogram.PERCENTILES
+                if "p{}".format(pct) in summary
+            ),
+            unit,
+        ).strip()
+
+    def parse_db12(data):
+        result = "DIRAC Benchmark = %.3f (%s)" % (float(data["value"]), data["unit"])
+        if "processes" in data:
+            result += " per process {}".format(percentiles(data["processes"], ""))
+        return result
+
     def parse_hepscore(data):
         # Attempt to use the new format of hepscore reporting
         # can be dropped in the future once metadata is standard
@@ -298,14 +377,114 @@ def print_results(results):
             result, data["benchmarks"].keys()
         )
 
+    def parse_seqio(data):
+        summary = [
+            "{}: W {} / R {}".format(bs, res["write_mean"], res["read_mean"])
+            + (
+                " (read {})".format(percentiles(res["read_latency_ms"]))
+                if "read_latency_ms" in res
+                else ""
+            )
+            for bs, res in data["block_sizes"].items()
+        ]
+        return "SEQIO Benchmark = {} ({})".format(", ".join(summary), data["unit"])
+
+    def parse_randio(data):
+        # Report the peak IOPS of each sweep and the queue depth reaching it
+        summary = []
+        for mode in ("randread", "randwrite"):
+            for bs, sweep in data.get(mode, {}).items():
+                # Every queue depth of the sweep failed
+                if not sweep:
+                    summary.append("{} {}: no result".format(mode, bs))
+                    continue
+                qd, best = max(sweep.items(), key=lambda item: item[1]["iops"])
+                summary.append(
+                    "{} {}: {} IOPS @ QD{} ({})".format(
+                        mode, bs, best["iops"], qd, percentiles(best["latency_ms"])
+                    )
+                )
+        return "RANDIO Benchmark = {}".format(", ".join(summary))
+
+    def parse_fio(data):
+        summary = []
+        for job, res in data["jobs"].items():
+            for direction in ("read", "write", "trim"):
+                if direction in res:
+                    summary.append(
+                        "{} {}: {} MB/s {} IOPS ({})".format(
+                            job,
+                            direction,
+                            res[direction]["bw_MBps"],
+                            res[direction]["iops"],
+                            percentiles(res[direction]["clat_ms"]),
+                        )
+                    )
+        return "FIO Benchmark = {}".format(", ".join(summary))
+
+    def parse_ior(data):
+        summary = [
+            "{} {}: {} (imbalance {}, {})".format(
+                mode,
+                phase,
+                data[mode][phase]["aggregate_MBps"],
+                data[mode][phase]["imbalance"],
+                percentiles(data[mode][phase]["latency_ms"]),
+            )
+            for mode in ("shared", "fpp")
+            if mode in data
+            for phase in ("write", "read")
+        ]
+        return "IOR Benchmark = {} ({}, {} ranks)".format(
+            ", ".join(summary), data["unit"], data["ranks"]
+        )
+
+    def parse_mdtest(data):
+        summary = [
+            "{} {} ({})".format(
+                phase, data[phase], percentiles(data["latency_ms"][phase])
+            )
+            for phase in ("create", "stat", "rename", "unlink")
+        ]
+        return "MDTEST Benchmark = {} ({}, {} ranks)".format(
+            ", ".join(summary), data["unit"], data["ranks"]
+        )
+
+    def parse_replay(data):
+        return "REPLAY Benchmark = {} MB/s over {} s ({} x {}, {} mode, {})".format(
+            data["aggregate_MBps"],
+            data["elapsed"],
+            data["parallel"],
+            data["trace"],
+            data["mode"],
+            percentiles(data["latency_ms"]),
+        )
+
+    def parse_httpio(data):
+        summary = [
+            "C{}: {} (TTFB {})".format(
+                concurrency, res["MBps"], percentiles(res["ttfb_ms"])
+            )
+            for concurrency, res in data["concurrency"].items()
+        ]
+        return "HTTPIO Benchmark = {} ({}, {} server)".format(
+            ", ".join(summary), data["unit"], data["server"]
+        )
+
     bmk_print_action = {
-        "DB12": lambda x: "DIRAC Benchmark = %.3f (%s)"
-        % (float(data[x]["value"]), data[x]["unit"]),
+        "DB12": lambda x: parse_db12(data[x]),
         "hs06_32": lambda x: "HS06 32 bit Benchmark = {}".format(data[x]["score"]),
         "hs06_64": lambda x: "HS06 64 bit Benchmark = {}".format(data[x]["score"]),
         "hs06": lambda x: "HS06 Benchmark = {}".format(data[x]["score"]),
         "spec2017": lambda x: "SPEC2017 64 bit Benchmark = {}".format(data[x]["score"]),
         "hepscore": lambda x: parse_hepscore(data[x]),
+        "seqio": lambda x: parse_seqio(data[x]),
+        "randio": lambda x: parse_randio(data[x]),
+        "fio": lambda x: parse_fio(data[x]),
+        "ior": lambda x: parse_ior(data[x]),
+        "mdtest": lambda x: parse_mdtest(data[x]),
+        "replay": lambda x: parse_replay(data[x]),
+        "httpio": lambda x: parse_httpio(data[x]),
     }
 
     for bmk in sorted(results["profiles"]):
@@ -0,0 +1,288 @@
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import contextlib
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+_log = logging.getLogger(__name__)
+
+# Seconds between SIGTERM and SIGKILL
+GRACE = 30
+
+# Outcomes of run_in_group
+OK = "ok"
+TIMEOUT = "timeout"
+
+# Command running a single benchmark, see main
+RUNNER = [sys.executable, "-m", "iobenchmarksuite.watchdog"]
+
+# Environment variable marking every process started by a benchmark
+MARKER = "IOBMK_SESSION"
+
+# Stop callables of the running benchmarks, keyed by session id
+_ACTIVE = {}
+_ACTIVE_LOCK = threading.Lock()
+
+
+def group_alive(pgid):
+    """True while a process of the group exists."""
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Members that changed user are still alive
+        return True
+
+
+def terminate_group(pgid, grace=GRACE, reap=None):
+    """Send SIGTERM to a process group, then SIGKILL after grace seconds.
+
+    Args:
+      pgid:  Process group to terminate.
+      grace: Seconds the processes have to exit after SIGTERM.
+      reap:  Callable collecting the exit status of the group leader,
+             whose zombie would otherwise count as alive.
+
+    Returns:
+      The signal that emptied the group, SIGTERM or SIGKILL.
+    """
+    _log.warning("Sending SIGTERM to process group %s", pgid)
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return signal.SIGTERM
+
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        if reap is not None:
+            reap()
+        if not group_alive(pgid):
+            return signal.SIGTERM
+        time.sleep(0.1)
+
+    _log.warning(
+        "Process group %s still alive after %s s, sending SIGKILL", pgid, grace
+    )
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    if reap is not None:
+        reap()
+    return signal.SIGKILL
+
+
+def session_processes(sid, marker=None):
+    """Processes left by a benchmark outside of its process group.
+
+    These are the processes of the session, and the processes carrying
+    the marker in their environment, which catches those that started a
+    session of their own, e.g. the singularity starter.
+
+    Args:
+      sid:    Session id, the pid of the benchmark process.
+      marker: Value of the MARKER environment variable of the benchmark.
+
+    Returns:
+      A list of pids.
+    """
+    tag = "{}={}".format(MARKER, marker).encode() if marker else None
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry), "r") as fin:
+                fields = fin.read().rsplit(")", 1)[1].split()
+            # Fields after the name: state ppid pgrp session
+            if fields[0] == "Z":
+                continue
+            if int(fields[3]) == sid:
+                pids.append(int(entry))
+                continue
+            if tag is not None:
+                with open("/proc/{}/environ".format(entry), "rb") as fin:
+                    if tag in fin.read().split(b"\0"):
+                        pids.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return pids
+
+
+def stop(sid, grace=GRACE, reap=None, marker=None, cleanup=None):
+    """Stop a benchmark: its process group, leftovers and containers.
+
+    Args:
+      sid:     Session id, the pid of the benchmark process.
+      grace:   Seconds between SIGTERM and SIGKILL.
+      reap:    See terminate_group.
+      marker:  See session_processes.
+      cleanup: Callable removing what lives outside of the session,
+               e.g. the docker containers of the benchmark.
+    """
+    terminate_group(sid, grace, reap)
+
+    for pid in session_processes(sid, marker):
+        _log.warning("Killing process %s left by the benchmark", pid)
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    if cleanup is not None:
+        cleanup()
+
+
+def run_in_group(cmd, timeout=None, grace=GRACE, cleanup=None):
+    """Run a command as a session leader, with a timeout.
+
+    Everything the benchmark starts, e.g. multiprocessing pools or
+    container clients, joins its process group, so a hung benchmark is
+    stopped as a whole: SIGTERM first, then SIGKILL after grace seconds.
+    Processes that left the group are found through the session and
+    the environment, see session_processes.
+
+    Args:
+      cmd:     Command to run, a list of arguments.
+      timeout: Seconds before the benchmark is stopped, None for no limit.
+      grace:   Seconds between SIGTERM and SIGKILL.
+      cleanup: See stop.
+
+    Returns:
+      A tuple (outcome, value): (OK, exit code) or (TIMEOUT, elapsed
+      seconds).
+    """
+    start = time.monotonic()
+    marker = "{}-{}".format(os.getpid(), start)
+    proc = subprocess.Popen(
+        cmd, start_new_session=True, env=dict(os.environ, **{MARKER: marker})
+    )
+
+    def halt():
+        stop(proc.pid, grace, reap=proc.poll, marker=marker, cleanup=cleanup)
+
+    with _ACTIVE_LOCK:
+        _ACTIVE[proc.pid] = halt
+
+    try:
+        try:
+            returncode = proc.wait(None if timeout is None else max(0.0, timeout))
+        except subprocess.TimeoutExpired:
+            elapsed = round(time.monotonic() - start, 3)
+            _log.error("Benchmark process %s timed out after %s s", proc.pid, elapsed)
+            halt()
+            proc.wait()
+            return TIMEOUT, elapsed
+
+        # Leftover processes of the benchmark, e.g. daemons it started
+        if group_alive(proc.pid) or session_processes(proc.pid, marker):
+            stop(proc.pid, grace, marker=marker)
+        return OK, returncode
+
+    finally:
+        with _ACTIVE_LOCK:
+            _ACTIVE.pop(proc.pid, None)
+
+
+def _forward(signum, frame):
+    """Stop the running benchmarks, then let the signal take its course."""
+    with _ACTIVE_LOCK:
+        active = list(_ACTIVE.items())
+    for sid, halt in active:
+        _log.warning("Received signal %s, stopping benchmark process %s", signum, sid)
+        halt()
+
+    previous = _forward.previous.get(signum)
+    if callable(previous):
+        previous(signum, frame)
+    else:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+_forward.previous = {}
+
+
+@contextlib.contextmanager
+def forward_signals(signums=(signal.SIGINT, signal.SIGTERM)):
+    """Pass SIGINT and SIGTERM on to the running benchmarks.
+
+    The benchmarks run in sessions of their own, out of reach of Ctrl-C
+    and of the SIGTERM of a batch system. Handlers can only be installed
+    from the main thread, elsewhere this does nothing.
+    """
+    installed = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in signums:
+            previous = signal.getsignal(signum)
+            if previous == signal.SIG_IGN:
+                continue
+            _forward.previous[signum] = previous
+            installed[signum] = signal.signal(signum, _forward)
+    try:
+        yield
+    finally:
+        for signum, previous in installed.items():
+            signal.signal(signum, previous)
+            _forward.previous.pop(signum, None)
+
+
+def main(argv=None):
+    """Run a single benchmark of the suite, the child side of supervise.
+
+    Args:
+      argv: Path of the JSON payload written by supervise, with the
+            config, the benchmark and the logging setup, followed by the
+            path to write the outcome to.
+
+    Returns:
+      Error code: 0 OK , 1 Not OK
+    """
+    # Imported here, the suite imports this module
+    from iobenchmarksuite.iobenchmarksuite import IOBenchmarkSuite
+
+    payload_path, result_path = argv if argv is not None else sys.argv[1:3]
+    with open(payload_path, "r") as fin:
+        payload = json.load(fin)
+
+    logger = logging.getLogger()
+    logger.setLevel(payload["log_level"])
+    formatter = logging.Formatter(
+        "%(asctime)s, %(name)s:%(funcName)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    handlers = [logging.StreamHandler(sys.stdout)]
+    handlers += [logging.FileHandler(path) for path in payload["log_files"]]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+    suite = IOBenchmarkSuite(payload["config"])
+    bench = payload["bench"]
+    try:
+        returncode = suite.execute(bench)
+    except Exception:
+        _log.exception("Benchmark %s failed.", bench)
+        return 1
+
+    with open(result_path, "w") as fout:
+        json.dump({"returncode": returncode, "failed": bench in suite.failures}, fout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+
+Time the metadata parsers of the Extractor.
+
+Runs every parser over the tests/data/*.sample corpora and over synthetic
+dmidecode dumps of large hosts, reporting the best time per call.
+
+    PYTHONPATH=. python3 tests/parser_benchmark.py [--dimms 1536] [--repeat 5]
+"""
+
+import argparse
+import os
+import timeit
+
+from iobenchmarksuite.plugins.extractor import Extractor
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+DIMM = """Handle 0x{handle:04X}, DMI type 17, 84 bytes
+Memory Device
+\tArray Handle: 0x1000
+\tError Information Handle: Not Provided
+\tTotal Width: 72 bits
+\tData Width: 64 bits
+\tSize: {size}
+\tForm Factor: DIMM
+\tSet: None
+\tLocator: DIMM_{slot}
+\tBank Locator: NODE {node} CHANNEL {channel}
+\tType: DDR4
+\tType Detail: Synchronous Registered (Buffered)
+\tSpeed: 3200 MT/s
+\tManufacturer: Samsung
+\tSerial Number: {handle:08X}
+\tAsset Tag: Unknown
+\tPart Number: M393A4K40DB3-CWE
+\tRank: 2
+\tConfigured Memory Speed: 3200 MT/s
+
+"""
+
+
+def synthetic_dmidecode(dimms):
+    """dmidecode -t 17 output of a host with the given number of slots.
+
+    One slot in eight is empty, as on partially populated boards.
+    """
+    header = (
+        "# dmidecode 3.3\nGetting SMBIOS data from sysfs.\nSMBIOS 3.3.0 present.\n\n"
+    )
+    return header + "".join(
+        DIMM.format(
+            handle=0x1100 + slot,
+            size="No Module Installed" if slot % 8 == 7 else "32 GB",
+            slot=slot,
+            node=slot // 64,
+            channel=slot % 8,
+        )
+        for slot in range(dimms)
+    )
+
+
+def read_sample(name):
+    """Content of a tests/data sample."""
+    with open(os.path.join(DATA, name), "r") as fin:
+        return fin.read()
+
+
+def bench(label, func, text, repeat):
+    """Print the best time of func(text) over repeat runs."""
+    number = max(1, 200000 // max(len(text), 1))
+    best = min(timeit.repeat(lambda: func(text), number=number, repeat=repeat))
+    print(
+        "{:<32} {:>9} bytes {:>10.1f} us/call".format(
+            label, len(text), best / number * 1e6
+        )
+    )
+
+
+def main():
+    """Run the parser benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--dimms", type=int, default=1536, help="Slots in the synthetic dump."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per parser.")
+    args = parser.parse_args()
+
+    hw = Extractor(extra={})
+
+    def bios(text):
+        parse = hw.get_parser(text, "bios")
+        return [parse(key) for key in ("Vendor", "Version", "Release Date")]
+
+    bench("BIOS.sample get_parser", bios, read_sample("BIOS.sample"), args.repeat)
+    for name in ("CPU_Intel.sample", "CPU_AMD.sample"):
+        bench(
+            name + " get_cpu_parser", hw.get_cpu_parser, read_sample(name), args.repeat
+        )
+    bench(
+        "MEM.sample get_mem_parser",
+        Extractor.get_mem_parser,
+        read_sample("MEM.sample"),
+        args.repeat,
+    )
+    bench(
+        "STORAGE.sample get_storage_parser",
+        Extractor.get_storage_parser,
+        read_sample("STORAGE.sample"),
+        args.repeat,
+    )
+    bench(
+        "{} DIMMs get_mem_parser".format(args.dimms),
+        Extractor.get_mem_parser,
+        synthetic_dmidecode(args.dimms),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
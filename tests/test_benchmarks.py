@@ -7,6 +7,9 @@
 ###############################################################################
 """
 
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
 from iobenchmarksuite import benchmarks
@@ -111,6 +114,123 @@ class TestSpec:
 
         assert benchmarks.run_hepspec(sample_config, bench) == valid
 
+#--------------------------------------------------------------------------------------------------------------
+# fio interface related tests
+#-------------------------------------------------------------------------------------------------------------
+
+class TestFio:
+
+    def setup(self):
+        """ Load CI configuration with a fio section """
+
+        self.tmp_dir = tempfile.mkdtemp()
+
+        with open("tests/ci/benchmarks.yml", 'r') as cfg_file:
+            self.config_file = yaml.full_load(cfg_file)
+            self.config_file['global']['parent_dir'] = '.'
+            self.config_file['global']['rundir'] = self.tmp_dir
+            self.config_file['fio'] = {
+                'global': {'size': '4k'},
+                'jobs': {'seqwrite': {'rw': 'write', 'bs': '4k'}},
+            }
+
+    def test_jobfile(self):
+        """ Test the job file generated from the fio section """
+
+        self.setup()
+        jobfile = benchmarks.build_fio_jobfile(self.config_file['fio'], self.tmp_dir)
+
+        with open(jobfile, 'r') as fin:
+            assert fin.read() == (
+                "[global]\ndirectory={}\nsize=4k\n\n"
+                "[seqwrite]\nrw=write\nbs=4k\n\n".format(self.tmp_dir))
+
+    def test_jobfile_directory(self):
+        """ Test the data files of fio stay in the workdir """
+
+        self.setup()
+        self.config_file['fio']['global']['directory'] = '/elsewhere'
+        self.config_file['fio']['jobs']['seqwrite']['directory'] = '/elsewhere'
+        jobfile = benchmarks.build_fio_jobfile(self.config_file['fio'], self.tmp_dir)
+
+        with open(jobfile, 'r') as fin:
+            assert fin.read() == (
+                "[global]\ndirectory={}\nsize=4k\n\n"
+                "[seqwrite]\nrw=write\nbs=4k\n\n".format(self.tmp_dir))
+
+    def test_parse_output(self):
+        """ Test the reduction of fio json output """
+
+        with open('tests/data/fio_output.json', 'r') as fin:
+            result = benchmarks.parse_fio_output(json.load(fin))
+
+        assert result['fio']['version'] == 'fio-3.28'
+        assert sorted(result['fio']['jobs']) == ['randread', 'seqwrite']
+
+        # Directions without io are dropped
+        assert sorted(result['fio']['jobs']['seqwrite']) == ['error', 'write']
+        assert result['fio']['jobs']['randread']['read'] == {
+            'bw_MBps': 262.14,
+            'iops': 64000.0,
+            'clat_ms': {'mean': 0.4988, 'p50': 0.4895, 'p99': 0.7987, 'p99.9': 1.1223},
+        }
+
+    @pytest.mark.parametrize('mode', ["docker", "singularity"])
+    @patch.object(utils, 'exec_wait_benchmark', side_effect=alternate_exec)
+    def test_cli_interface(self, mock, mode):
+        """ Test the command used to run fio in containers """
+
+        self.setup()
+        self.config_file['global']['mode'] = mode
+        self.config_file['fio']['image'] = 'docker://registry.example.com/fio:3.28'
+
+        workdir = os.path.join(self.tmp_dir, 'FIO')
+        fio_args = 'fio --output-format=json --output={0}/fio_output.json {0}/fio_jobs.fio'.format(workdir)
+
+        if mode == 'singularity':
+            valid = 'SINGULARITY_CACHEDIR=./singularity_cachedir singularity exec -B {0}:{0} docker://registry.example.com/fio:3.28 {1}'.format(workdir, fio_args)
+
+        elif mode == 'docker':
+            valid = 'docker run --rm --network=host -v {0}:{0}:Z registry.example.com/fio:3.28 {1}'.format(workdir, fio_args)
+
+        assert benchmarks.run_fio(self.config_file) == valid
+
+    @patch.object(utils, 'exec_wait_benchmark', side_effect=alternate_exec)
+    def test_container_name(self, mock):
+        """ Test the container is named after the watchdog session """
+
+        self.setup()
+        self.config_file['global']['mode'] = 'docker'
+        self.config_file['global']['container_name'] = 'iobmk-fio-0a1b2c'
+        self.config_file['fio']['image'] = 'docker://registry.example.com/fio:3.28'
+
+        assert benchmarks.run_fio(self.config_file).startswith(
+            'docker run --rm --name iobmk-fio-0a1b2c --network=host ')
+
+    @patch.object(utils, 'exec_cmd')
+    def test_remove_container(self, mock):
+        """ Test a container left running is removed, a gone one is not """
+
+        mock.side_effect = [('', 0)]
+        assert benchmarks.remove_container('iobmk-fio-0a1b2c') == 0
+        assert mock.call_count == 1
+
+        mock.reset_mock()
+        mock.side_effect = [('3f2a', 0), ('', 0)]
+        assert benchmarks.remove_container('iobmk-fio-0a1b2c') == 0
+        assert mock.call_args[0][0] == 'docker rm -f iobmk-fio-0a1b2c'
+
+    def test_validate(self):
+        """ Test the validation of the fio section """
+
+        self.setup()
+        self.config_file['fio']['image'] = 'docker://registry.example.com/fio:3.28'
+        assert benchmarks.validate_fio(self.config_file) == 0
+
+        self.config_file['fio']['jobs'] = {}
+        assert benchmarks.validate_fio(self.config_file) == 1
+
+
 #----------------------------------------------------------
 # This section should be ported to HEP-SCORE unittest
 #
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import checkpoint
+from iobenchmarksuite.checkpoint import RunState
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test the persisted run state."""
+
+    def test_state(self):
+        """Each change is on disk and read back by a new instance."""
+        with tempfile.TemporaryDirectory() as rundir:
+            state = RunState(os.path.join(rundir, "run"))
+            state.set_extra({"start_time": "2021-01-01T00:00:00Z"})
+            state.init_benchmarks(["db12", "seqio", "randio"])
+            state.update("db12", checkpoint.RUNNING, result="db12_result.json")
+            state.update("db12", checkpoint.DONE, returncode=0)
+            state.update("seqio", checkpoint.RUNNING)
+
+            # Nothing but the state file is left in the rundir
+            self.assertEqual(
+                os.listdir(os.path.join(rundir, "run")), [checkpoint.STATE_FILE]
+            )
+
+            resumed = RunState(os.path.join(rundir, "run"))
+            self.assertEqual(resumed.load(), 0)
+            self.assertEqual(resumed.completed(), ["db12"])
+            self.assertEqual(resumed.state("seqio"), checkpoint.RUNNING)
+            self.assertEqual(resumed.state("randio"), checkpoint.PENDING)
+            self.assertEqual(resumed.state("ior"), checkpoint.PENDING)
+
+            entry = resumed.data["benchmarks"]["db12"]
+            self.assertEqual(entry["result"], "db12_result.json")
+            self.assertGreaterEqual(entry["end"], entry["start"])
+            self.assertEqual(
+                resumed.data["extra"]["start_time"], "2021-01-01T00:00:00Z"
+            )
+
+            # Known benchmarks keep their state
+            resumed.init_benchmarks(["db12", "ior"])
+            self.assertEqual(resumed.completed(), ["db12"])
+
+    def test_load_errors(self):
+        """Missing, corrupt or newer state files are refused."""
+        with tempfile.TemporaryDirectory() as rundir:
+            state = RunState(rundir)
+            self.assertEqual(state.load(), 1)
+
+            with open(state.path, "w") as fout:
+                fout.write("{")
+            self.assertEqual(state.load(), 1)
+
+            with open(state.path, "w") as fout:
+                json.dump({"version": checkpoint.STATE_VERSION + 1}, fout)
+            self.assertEqual(state.load(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import unittest
+
+from iobenchmarksuite.plugins import cpustats
+
+PRESSURE = """some avg10=0.32 avg60=0.33 avg300=0.37 total={}
+full avg10=0.14 avg60=0.19 avg300=0.21 total={}
+"""
+
+
+class TestCPUStats(unittest.TestCase):
+    """Test the CPU time and pressure sampler."""
+
+    def test_parse_cpu(self):
+        """Old kernels without steal are padded with zeros."""
+        stats = cpustats.parse_cpu("cpu  10 1 5 100 4\ncpu0 10 1 5 100 4\n")
+        self.assertEqual(stats["user"], 10)
+        self.assertEqual(stats["iowait"], 4)
+        self.assertEqual(stats["steal"], 0)
+
+        with self.assertRaises(ValueError):
+            cpustats.parse_cpu("intr 0\n")
+
+    def test_parse_pressure(self):
+        """Only the stall totals are kept."""
+        self.assertEqual(
+            cpustats.parse_pressure(PRESSURE.format(100, 50)),
+            {"some": 100, "full": 50},
+        )
+
+    def test_record(self):
+        """Jiffies become CPU shares and stall time a share of wall time."""
+        sampler = cpustats.CPUStatsSampler()
+        previous = {
+            "stat": cpustats.parse_cpu("cpu  0 0 0 0 0 0 0 0"),
+            "io": cpustats.parse_pressure(PRESSURE.format(0, 0)),
+        }
+        current = {
+            "stat": cpustats.parse_cpu("cpu  40 10 20 100 20 0 0 10"),
+            "io": cpustats.parse_pressure(PRESSURE.format(500000, 250000)),
+        }
+        sampler.record(1.0, 1.0, previous, current)
+        sampler.record(1.5, 0.5, current, current)
+
+        report = sampler.report()
+        self.assertEqual(report["t"], [1.0, 1.5])
+        self.assertEqual(report["series"]["user"], [25.0, 0.0])
+        self.assertEqual(report["series"]["steal"], [5.0, 0.0])
+        self.assertEqual(report["series"]["io_some"], [50.0, 0.0])
+        self.assertEqual(report["series"]["io_full"], [25.0, 0.0])
+        self.assertNotIn("memory_some", report["series"])
+
+        # Means are weighted by the length of each interval
+        self.assertEqual(report["summary"]["io_some"], {"mean": 33.3, "max": 50.0})
+
+    def test_pressure_missing(self):
+        """Pressure read in some intervals only is padded with None."""
+        sampler = cpustats.CPUStatsSampler()
+        stat = {"stat": cpustats.parse_cpu("cpu  0 0 0 0 0 0 0 0")}
+        pressure = dict(stat, io=cpustats.parse_pressure(PRESSURE.format(0, 0)))
+        later = dict(stat, io=cpustats.parse_pressure(PRESSURE.format(500000, 0)))
+
+        sampler.record(1.0, 1.0, stat, pressure)
+        sampler.record(2.0, 1.0, pressure, later)
+        sampler.record(3.0, 1.0, later, stat)
+
+        report = sampler.report()
+        self.assertEqual(report["series"]["io_some"], [None, 50.0, None])
+        self.assertEqual(report["summary"]["io_some"], {"mean": 50.0, "max": 50.0})
+
+    def test_sampler(self):
+        """The sampler runs against the real /proc."""
+        sampler = cpustats.CPUStatsSampler(interval=0.01)
+        sampler.start()
+        sum(range(100000))
+        report = sampler.stop()
+
+        self.assertGreaterEqual(len(report["t"]), 1)
+        for key in cpustats.CPU_SERIES:
+            self.assertEqual(len(report["series"][key]), len(report["t"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
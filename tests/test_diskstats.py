@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from iobenchmarksuite.plugins import diskstats
+
+SNAPSHOTS = [
+    """ 253       0 vda 100 0 2000 50 10 0 800 20 0 60 70 0 0 0 0
+ 253       1 vda1 100 0 2000 50 10 0 800 20 0 60 70 0 0 0 0
+   7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0
+ 253      17 vdb1 5 40 1 8
+""",
+    """ 253       0 vda 300 0 6000 150 110 0 2800 120 2 560 1270 0 0 0 0
+ 253       1 vda1 300 0 6000 150 110 0 2800 120 2 560 1270 0 0 0 0
+   7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0
+ 253      17 vdb1 5 40 1 8
+""",
+]
+
+
+class TestDiskStats(unittest.TestCase):
+    """Test the /proc/diskstats sampler."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "diskstats")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_parse(self):
+        """Counters of every device, short partition lines are skipped."""
+        stats = diskstats.parse_diskstats(SNAPSHOTS[0])
+        self.assertEqual(sorted(stats), ["loop0", "vda", "vda1"])
+        self.assertEqual(stats["vda"], (100, 2000, 10, 800, 60, 70))
+
+    def test_record(self):
+        """Deltas become rates; idle devices are left out of the report."""
+        sampler = diskstats.DiskStatsSampler(interval=1, devices=["vda", "loop0"])
+        previous, current = (
+            {
+                dev: stats
+                for dev, stats in diskstats.parse_diskstats(snapshot).items()
+                if dev in sampler.devices
+            }
+            for snapshot in SNAPSHOTS
+        )
+        sampler.record(2.0, 2.0, previous, current)
+
+        report = sampler.report()
+        self.assertEqual(report["t"], [2.0])
+        self.assertEqual(sorted(report["devices"]), ["vda"])
+
+        vda = report["devices"]["vda"]
+        self.assertEqual(vda["read_iops"], [100.0])
+        self.assertEqual(vda["write_iops"], [50.0])
+        self.assertEqual(vda["read_MBps"], [round(4000 * 512 / 2 / 1e6, 3)])
+        self.assertEqual(vda["util_pct"], [25.0])
+        self.assertEqual(vda["avg_queue"], [0.6])
+        self.assertEqual(vda["total"]["read_bytes"], 4000 * 512)
+        self.assertEqual(vda["total"]["util_pct"], 25.0)
+
+    def test_device_removed(self):
+        """Series of a device that disappears stay aligned with t."""
+        sampler = diskstats.DiskStatsSampler(interval=1, devices=["vda"])
+        previous, current = (
+            {"vda": diskstats.parse_diskstats(snapshot)["vda"]}
+            for snapshot in SNAPSHOTS
+        )
+        sampler.record(1.0, 1.0, previous, current)
+        sampler.record(2.0, 1.0, current, {})
+        sampler.record(3.0, 1.0, {}, current)
+
+        report = sampler.report()
+        vda = report["devices"]["vda"]
+        self.assertEqual(report["t"], [1.0, 2.0, 3.0])
+        self.assertEqual(vda["read_iops"], [200.0, None, None])
+        self.assertEqual(vda["total"]["max_queue"], 1.2)
+
+    def test_sampler_thread(self):
+        """The thread samples the file until it is stopped."""
+        with open(self.path, "w") as fout:
+            fout.write(SNAPSHOTS[0])
+
+        with patch.object(diskstats, "DISKSTATS", self.path):
+            self.assertTrue(diskstats.DiskStatsSampler.available())
+            sampler = diskstats.DiskStatsSampler(interval=0.01, devices=["vda"])
+            sampler.start()
+
+            with open(self.path, "w") as fout:
+                fout.write(SNAPSHOTS[1])
+
+            report = sampler.stop()
+
+        self.assertGreaterEqual(sampler.samples, 1)
+        self.assertEqual(len(report["t"]), sampler.samples)
+        self.assertEqual(report["devices"]["vda"]["total"]["reads"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import pickle
+import unittest
+
+from iobenchmarksuite.histogram import Histogram
+
+
+class TestHistogram(unittest.TestCase):
+    """Test the log-bucketed latency histogram."""
+
+    def setUp(self):
+        self.hist = Histogram()
+        for i in range(1, 1001):
+            self.hist.record(i * 1e-6)
+
+    def test_percentiles(self):
+        """Percentiles stay within the bucket precision."""
+        for pct, expected in ((50, 500e-6), (99, 990e-6), (99.9, 999e-6)):
+            self.assertAlmostEqual(
+                self.hist.percentile(pct), expected, delta=expected / 64
+            )
+
+        self.assertEqual(self.hist.percentile(100), 1000e-6)
+        self.assertEqual(Histogram().percentile(99), 0.0)
+
+    def test_summary(self):
+        """The summary is scaled to ms and holds every percentile."""
+        summary = self.hist.summary()
+        self.assertEqual(summary["count"], 1000)
+        self.assertEqual(summary["min"], 0.001)
+        self.assertEqual(summary["max"], 1.0)
+        self.assertAlmostEqual(summary["mean"], 0.5005)
+        self.assertEqual(
+            sorted(summary), ["count", "max", "mean", "min", "p50", "p99", "p99.9"]
+        )
+
+    def test_fixed_memory(self):
+        """Recording more values does not grow the histogram."""
+        size = len(pickle.dumps(self.hist))
+        for _ in range(10000):
+            self.hist.record(0.5)
+        self.assertEqual(len(pickle.dumps(self.hist)), size)
+
+    def test_out_of_range(self):
+        """Values beyond the tracked range land in the last bucket."""
+        hist = Histogram(max_value=1.0)
+        hist.record(10.0)
+        hist.record(-1.0)
+        self.assertEqual(hist.count, 2)
+        self.assertEqual(hist.percentile(100), 10.0)
+
+    def test_merge(self):
+        """Merging is equivalent to recording everything in one histogram."""
+        other = Histogram()
+        for i in range(1001, 2001):
+            other.record(i * 1e-6)
+
+        merged = Histogram()
+        merged += self.hist
+        merged.merge(pickle.loads(pickle.dumps(other)))
+
+        self.assertEqual(merged.count, 2000)
+        self.assertEqual(merged.min, 1e-6)
+        self.assertEqual(merged.max, 2000e-6)
+        self.assertAlmostEqual(merged.percentile(50), 1000e-6, delta=1000e-6 / 64)
+
+        with self.assertRaises(ValueError):
+            merged.merge(Histogram(resolution=1e-6))
+
+    def test_serialization(self):
+        """to_dict survives a JSON round trip."""
+        data = json.loads(json.dumps(self.hist.to_dict()))
+        restored = Histogram.from_dict(data)
+
+        self.assertEqual(restored.summary(), self.hist.summary())
+        self.assertEqual(Histogram.from_dict(Histogram().to_dict()).count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
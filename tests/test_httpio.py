@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from iobenchmarksuite import httpio
+
+
+class TestHttpIO(unittest.TestCase):
+    """Test the remote read benchmark and its built-in range server."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.conf = {
+            "file_size": "1M",
+            "block_size": "64k",
+            "concurrency": [1, 4],
+            "runtime": 0.2,
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_range_server(self):
+        """Byte ranges are honoured over a single persistent connection."""
+        data = os.urandom(4096)
+        with open(os.path.join(self.rundir, "data"), "wb") as fout:
+            fout.write(data)
+
+        server = httpio.serve(self.rundir)
+        url = "http://{}:{}/data".format(*server.server_address[:2])
+        pool = httpio.ConnectionPool(url)
+
+        try:
+            self.assertEqual(httpio.remote_size(pool), 4096)
+
+            response, body, _ = pool.request("GET", {"Range": "bytes=100-199"})
+            self.assertEqual(response.status, 206)
+            self.assertEqual(body, data[100:200])
+            self.assertEqual(response.getheader("Content-Range"), "bytes 100-199/4096")
+
+            response, body, _ = pool.request("GET", {"Range": "bytes=-10"})
+            self.assertEqual(body, data[-10:])
+
+            response, body, _ = pool.request("GET", {"Range": "bytes=5000-"})
+            self.assertEqual(response.status, 416)
+
+            response, body, _ = pool.request("GET")
+            self.assertEqual(response.status, 200)
+            self.assertEqual(body, data)
+
+            self.assertEqual(pool.opened, 1)
+        finally:
+            pool.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_range_server_outside_root(self):
+        """Paths escaping the served directory are not found."""
+        server = httpio.serve(self.rundir)
+        url = "http://{}:{}/../../etc/passwd".format(*server.server_address[:2])
+        pool = httpio.ConnectionPool(url)
+
+        try:
+            response, _, _ = pool.request("GET")
+            self.assertEqual(response.status, 404)
+        finally:
+            pool.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_run_httpio(self):
+        """Run a tiny sweep against the built-in server."""
+        self.assertEqual(httpio.run_httpio(rundir=self.rundir, conf=self.conf), 0)
+
+        with open(os.path.join(self.rundir, "httpio_result.json"), "r") as fin:
+            result = json.load(fin)["httpio"]
+
+        self.assertEqual(result["server"], "builtin")
+        self.assertEqual(result["size"], 1024 * 1024)
+        self.assertEqual(sorted(result["concurrency"]), ["1", "4"])
+
+        for concurrency, point in result["concurrency"].items():
+            self.assertGreater(point["MBps"], 0)
+            self.assertGreater(point["requests"], 0)
+            # Connections are reused, never more than requests in flight
+            self.assertLessEqual(point["connections"], int(concurrency))
+            self.assertLessEqual(point["ttfb_ms"]["p50"], point["ttfb_ms"]["p99"])
+
+        self.assertEqual(os.listdir(self.rundir), ["httpio_result.json"])
+        self.assertEqual(result["cold_cache"], {"enabled": False})
+
+    def test_run_httpio_cold_cache(self):
+        """Only the data file is served, evicted before every step."""
+        self.conf["cold_cache"] = True
+        served = []
+
+        def serve(directory):
+            served.extend(os.listdir(directory))
+            return real_serve(directory)
+
+        real_serve = httpio.serve
+        with patch.object(httpio, "serve", side_effect=serve):
+            self.assertEqual(httpio.run_httpio(rundir=self.rundir, conf=self.conf), 0)
+
+        self.assertEqual(served, [httpio.DATA_FILE])
+
+        with open(os.path.join(self.rundir, "httpio_result.json"), "r") as fin:
+            result = json.load(fin)["httpio"]
+
+        self.assertTrue(result["cold_cache"]["enabled"])
+        self.assertEqual(result["cold_cache"]["evictions"], 2)
+
+    def test_invalid_url(self):
+        """An unsupported URL is reported as a failure."""
+        self.conf["url"] = "ftp://example.com/file"
+        with self.assertLogs("iobenchmarksuite.httpio", level="ERROR"):
+            self.assertEqual(httpio.run_httpio(rundir=self.rundir, conf=self.conf), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
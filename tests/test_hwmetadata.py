@@ -8,6 +8,8 @@
 """
 
 import json
+import os
+import tempfile
 import unittest
 from iobenchmarksuite.plugins.extractor import Extractor
 from schema import Schema, And, Use, Optional, Or
@@ -164,6 +166,15 @@ class TestHWExtractor(unittest.TestCase):
 
         self.assertEqual(mem_output, MEM_OK, "Memory parser mismatch!")
 
+        # Empty slots are left out, whichever way the BIOS reports them
+        empty = [
+            "Handle 0x1200, DMI type 17, 40 bytes\nMemory Device\n\tSize: 8192 MB\n"
+            "\tLocator: {}\n\tType: {}\n\tManufacturer: {}\n\tPart Number: {}\n".format(*slot)
+            for slot in (("A9", "DDR3", "NO DIMM", "NO DIMM"),
+                         ("A10", "Unknown", "Not Specified", "Not Specified"))
+        ]
+        self.assertEqual(hw.get_mem_parser(mem_text + "\n" + "\n".join(empty)), MEM_OK)
+
     def test_parser_storage(self):
         """
         Test the parser for a storage output.
@@ -185,6 +196,184 @@ class TestHWExtractor(unittest.TestCase):
         self.assertEqual(storage_output, STORAGE_OK,
                          "Storage parser mismatch!")
 
+    def test_parser_blocks(self):
+        """
+        Test that fields missing from a block do not shift the others.
+        """
+
+        mem_text = ('Handle 0x0040, DMI type 17, 28 bytes\n'
+                    'Memory Device\n'
+                    '\tSize: 16 GB\n\tLocator: A1\n\tType: DDR4\n'
+                    '\tManufacturer: Samsung\n\tPart Number: M393A2K40BB1\n\n'
+                    'Handle 0x0041, DMI type 17, 28 bytes\n'
+                    'Memory Device\n'
+                    '\tSize: No Module Installed\n\tLocator: A2\n\tType: Unknown\n'
+                    '\tManufacturer: NO DIMM\n\tPart Number: NO DIMM\n\n'
+                    'Handle 0x0042, DMI type 17, 28 bytes\n'
+                    'Memory Device\n'
+                    '\tSize: 32 GB\n\tLocator: A3\n\tType: DDR4\n'
+                    '\tType Detail: Synchronous\n\tManufacturer: Micron\n\n')
+
+        self.assertEqual(Extractor.get_mem_parser(mem_text), {
+            'dimm1': '16 GB DDR4 | Samsung | M393A2K40BB1',
+            'dimm2': '32 GB DDR4 | Micron | not_available',
+        })
+
+        storage_text = ('  *-cdrom\n'
+                        '       product: DVD-ROM\n'
+                        '       logical name: /dev/sr0\n'
+                        '  *-disk\n'
+                        '       product: SAMSUNG MZ7LH960\n'
+                        '       logical name: /dev/sda\n'
+                        '       size: 894GiB (960GB)\n')
+
+        self.assertEqual(Extractor.get_storage_parser(storage_text), {
+            'disk1': '/dev/sr0 | DVD-ROM | not_available',
+            'disk2': '/dev/sda | SAMSUNG MZ7LH960 | 894GiB (960GB)',
+        })
+
+        # First occurrence wins and values are stripped
+        fields = Extractor.parse_key_values('Version: 1.0  \nVersion: 2.0\nno colon\n')
+        self.assertEqual(fields, {'Version': '1.0'})
+
+    def test_block_queues(self):
+        """
+        Test reading the block-queue settings from sysfs.
+        """
+
+        queue = {
+            'scheduler'          : 'mq-deadline kyber [none]',
+            'rotational'         : '0',
+            'nr_requests'        : '1023',
+            'read_ahead_kb'      : '128',
+            'logical_block_size' : '512',
+            'physical_block_size': '4096',
+            'max_sectors_kb'     : '1280',
+            'discard_max_bytes'  : '2199023255040',
+        }
+
+        with tempfile.TemporaryDirectory() as sys_block:
+            for dev in ('nvme0n1', 'loop0', 'cciss!c0d0'):
+                os.makedirs(os.path.join(sys_block, dev, 'queue'))
+            for name, value in queue.items():
+                with open(os.path.join(sys_block, 'nvme0n1', 'queue', name), 'w') as fout:
+                    fout.write(value + '\n')
+            for i in range(4):
+                os.makedirs(os.path.join(sys_block, 'nvme0n1', 'mq', str(i)))
+
+            queues = Extractor.get_block_queues(sys_block)
+
+        self.assertEqual(sorted(queues), ['cciss/c0d0', 'nvme0n1'])
+        self.assertEqual(queues['nvme0n1'], {
+            'Scheduler'          : 'none',
+            'Rotational'         : False,
+            'Nr_Requests'        : 1023,
+            'Read_Ahead_KB'      : 128,
+            'Logical_Block_Size' : 512,
+            'Physical_Block_Size': 4096,
+            'Max_Sectors_KB'     : 1280,
+            'Discard'            : True,
+            'HW_Queues'          : 4,
+        })
+
+        # Missing attributes are reported as unknown
+        self.assertIsNone(queues['cciss/c0d0']['Scheduler'])
+        self.assertIsNone(queues['cciss/c0d0']['Discard'])
+        self.assertEqual(Extractor.get_block_queues('/non/existent'), {})
+
+    def test_command_timeout(self):
+        """
+        Test a command running past the timeout is killed.
+        """
+
+        hw = Extractor(extra={})
+        hw.CMD_TIMEOUT = 0.5
+        result = hw.exec_cmd('sleep 30 | cat')
+        self.assertEqual(result, 'not_available')
+
+    def test_filesystem(self):
+        """
+        Test resolving a path to its mount from mountinfo.
+        """
+
+        mountinfo = ('22 1 0:21 / / rw,relatime - overlay overlay rw,lowerdir=/l,upperdir=/u\n'
+                     '23 22 0:40 / /tmp rw,nosuid shared:3 - tmpfs tmpfs rw,size=1024k\n'
+                     '24 22 0:41 / /cvmfs/atlas.cern.ch ro - fuse cvmfs2 ro,user_id=0\n'
+                     '25 22 0:42 / /eos/home\\040dir rw - fuse.eosxd eosxd rw\n'
+                     '26 22 0:43 / /scratch rw - nfs4 server:/export rw,vers=4.2\n')
+
+        with tempfile.NamedTemporaryFile('w') as fin:
+            fin.write(mountinfo)
+            fin.flush()
+
+            mounts = Extractor.get_mounts(fin.name)
+            self.assertEqual(mounts[3]['Mount_Point'], '/eos/home dir')
+
+            root = Extractor.get_filesystem('/', fin.name)
+            self.assertEqual(root['FS_Type'], 'overlay')
+            self.assertEqual(root['Mount_Options'], 'rw,relatime,rw,lowerdir=/l,upperdir=/u')
+            self.assertTrue(root['Overlay'])
+            self.assertFalse(root['Tmpfs'])
+            self.assertGreater(root['Block_Size'], 0)
+
+            # The deepest mount holding the path wins
+            tmp = Extractor.get_filesystem('/tmp', fin.name)
+            self.assertEqual(tmp['Mount_Point'], '/tmp')
+            self.assertTrue(tmp['Tmpfs'])
+            self.assertFalse(tmp['Overlay'])
+
+            kinds = {
+                '/cvmfs/atlas.cern.ch/repo': 'CVMFS',
+                '/eos/home dir/user'       : 'EOS_FUSE',
+                '/scratch/job'             : 'NFS',
+            }
+            for path, kind in kinds.items():
+                fs_info = Extractor.get_filesystem(path, fin.name)
+                flags = [key for key in ('Tmpfs', 'Overlay', 'NFS', 'Lustre', 'EOS_FUSE', 'CVMFS')
+                         if fs_info[key]]
+                self.assertEqual(flags, [kind])
+
+        # Without mountinfo the statvfs data is still reported
+        fs_info = Extractor.get_filesystem('.', '/non/existent')
+        self.assertEqual(fs_info['FS_Type'], 'not_available')
+        self.assertGreater(fs_info['Alignment'], 0)
+
+    def test_cache(self):
+        """
+        Test reusing the HW metadata within a boot.
+        """
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            extra = {'metadata_cache': os.path.join(tmpdir, 'cache', 'hw.json')}
+
+            hw = Extractor(extra=extra)
+            if hw.cache_key() is None:
+                self.skipTest('No boot_id on this host')
+
+            collected = hw.collect_hw()
+            self.assertFalse(collected['Cached'])
+            cached = Extractor(extra=extra).collect_hw()
+            self.assertTrue(cached['Cached'])
+            self.assertIn('Mem_Available', cached['MEMORY'])
+
+            # The report tells when the data was collected and what this run did
+            self.assertEqual(cached['Collected_At'], collected['Collected_At'])
+            self.assertEqual(list(cached['Collect_Time_s']), ['Cache'])
+
+            # Forced refresh
+            extra['refresh_metadata'] = True
+            self.assertFalse(Extractor(extra=extra).collect_hw()['Cached'])
+
+            # A different boot invalidates the cache
+            with open(extra['metadata_cache'], 'r') as fin:
+                cache = json.load(fin)
+            cache['key']['boot_id'] = 'another-boot'
+            with open(extra['metadata_cache'], 'w') as fout:
+                json.dump(cache, fout)
+
+            extra['refresh_metadata'] = False
+            self.assertFalse(Extractor(extra=extra).collect_hw()['Cached'])
+
     def test_full_metadata(self):
         """
         Test the metadata schema
@@ -206,7 +395,18 @@ class TestHWExtractor(unittest.TestCase):
                                                       "Mem_Total"     : int,
                                                       "Mem_Swap"      : int,
                                                     },
-                                         "STORAGE": { Optional(str) : Optional(str) },
+                                         "STORAGE": { "Block_Devices" : { Optional(str) : dict },
+                                                      Optional(str) : Optional(str) },
+                                         "NUMA"   : { "Block_Devices" : { Optional(str) : int },
+                                                      "NICs"          : { Optional(str) : int },
+                                                      "Nodes"         : { Optional(str) : {
+                                                          "CPUs"        : str,
+                                                          "Mem_Total_kB": int,
+                                                          "Distances"   : [int] } },
+                                                    },
+                                         "Collect_Time_s": { str : float },
+                                         "Collected_At" : str,
+                                         "Cached" : bool,
                                          "CPU"    : { str : str,
                                                       "SMT_Enabled?"     : bool,
                                                       "CPU_num"          : int,
@@ -222,6 +422,7 @@ class TestHWExtractor(unittest.TestCase):
                                                     }
                                  },
                                  "SW" : { str : str },
+                                 "FS" : { str : Or(str, int, bool) },
                                  "Hostname" : str,
                                 }))
 
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import ior
+
+
+class TestIOR(unittest.TestCase):
+    """Test the IOR-style parallel benchmark."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.conf = {"transfer_size": "64k", "segment_size": "256k"}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_summarize(self):
+        """Aggregate bandwidth spans the slowest rank, imbalance is max/min."""
+        summary = ior.summarize([(0.0, 1.0), (0.5, 2.5)], 10 ** 6)
+        self.assertEqual(summary["aggregate_MBps"], 0.8)
+        self.assertEqual(summary["rank_MBps"], {"min": 0.5, "max": 1.0})
+        self.assertEqual(summary["imbalance"], 2.0)
+
+    def test_run_ior(self):
+        """Run both modes with a few ranks and check the report."""
+        self.assertEqual(ior.run_ior(rundir=self.rundir, conf=self.conf, mp_num=3), 0)
+
+        with open(os.path.join(self.rundir, "ior_result.json"), "r") as fin:
+            result = json.load(fin)["ior"]
+
+        self.assertEqual(result["ranks"], 3)
+        self.assertEqual(result["segment_size"], 256 * 1024)
+
+        for mode in ("shared", "fpp"):
+            for phase in ("write", "read"):
+                self.assertGreater(result[mode][phase]["aggregate_MBps"], 0)
+                self.assertGreaterEqual(result[mode][phase]["imbalance"], 1.0)
+                # One latency sample per transfer and rank
+                self.assertEqual(
+                    result[mode][phase]["latency_ms"]["count"],
+                    3 * result["segment_size"] // result["transfer_size"],
+                )
+
+        self.assertEqual(result["cold_cache"], {"enabled": False})
+
+        # Data files must not be left behind
+        self.assertEqual(os.listdir(self.rundir), ["ior_result.json"])
+
+    def test_cold_cache(self):
+        """Rank 0 evicts the data between phases in each mode."""
+        self.conf["cold_cache"] = True
+        self.assertEqual(ior.run_ior(rundir=self.rundir, conf=self.conf, mp_num=2), 0)
+
+        with open(os.path.join(self.rundir, "ior_result.json"), "r") as fin:
+            result = json.load(fin)["ior"]
+
+        self.assertEqual(result["cold_cache"]["evictions"], 2)
+        self.assertEqual(result["cold_cache"]["method"], "fadvise")
+
+    def test_invalid_mode(self):
+        """An unknown mode is reported as a failure."""
+        self.conf["modes"] = ["mpiio"]
+        with self.assertLogs("iobenchmarksuite.ior", level="ERROR"):
+            self.assertEqual(ior.run_ior(rundir=self.rundir, conf=self.conf, mp_num=2), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import lock
+from iobenchmarksuite.lock import BenchmarkLock
+
+
+class TestLock(unittest.TestCase):
+    """Test the node-wide benchmark lock."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "iobmk.lock")
+        lock.POLL_INTERVAL = 0.01
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_policies(self):
+        """A held lock is waited for or skipped following the policy."""
+        holder = BenchmarkLock(self.path)
+        status = holder.acquire("seqio")
+        self.assertTrue(status["locked"])
+        self.assertIsNone(status["holder"])
+        self.assertIn("seqio", holder.holder())
+
+        # flock conflicts between open file descriptions of a process too
+        status = BenchmarkLock(self.path, policy="skip").acquire("randio")
+        self.assertTrue(status["skipped"])
+        self.assertFalse(status["locked"])
+        self.assertIn("seqio", status["holder"])
+
+        status = BenchmarkLock(self.path, policy="timeout", timeout=0.1).acquire("ior")
+        self.assertTrue(status["skipped"])
+        self.assertGreaterEqual(status["wait_s"], 0.1)
+
+        holder.release()
+        waiter = BenchmarkLock(self.path, policy="skip")
+        status = waiter.acquire("randio")
+        self.assertTrue(status["locked"])
+        self.assertEqual(status["wait_s"], 0.0)
+        waiter.release()
+        self.assertEqual(holder.holder(), "unknown")
+
+    def test_planted_files(self):
+        """Symlinks, hard links and special files are never modified."""
+        target = os.path.join(self.tmp.name, "shadow")
+        with open(target, "w") as fout:
+            fout.write("secret\n")
+        os.chmod(target, 0o600)
+
+        os.symlink(target, self.path)
+        status = BenchmarkLock(self.path).acquire("seqio")
+        self.assertFalse(status["locked"])
+        os.remove(self.path)
+
+        os.link(target, self.path)
+        holder = BenchmarkLock(self.path)
+        self.assertTrue(holder.acquire("seqio")["locked"])
+        holder.release()
+        os.remove(self.path)
+
+        with open(target, "r") as fin:
+            self.assertEqual(fin.read(), "secret\n")
+        self.assertEqual(os.stat(target).st_mode & 0o777, 0o600)
+
+        os.mkfifo(self.path)
+        status = BenchmarkLock(self.path).acquire("seqio")
+        self.assertFalse(status["locked"])
+
+    def test_created_shared(self):
+        """A new lock file is writable by the instances of other users."""
+        BenchmarkLock(self.path).acquire("seqio")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o666)
+
+    def test_unavailable(self):
+        """Without a usable lock file the benchmark runs unlocked."""
+        status = BenchmarkLock(os.path.join(self.path, "missing")).acquire("db12")
+        self.assertFalse(status["locked"])
+        self.assertFalse(status["skipped"])
+
+        with self.assertRaises(ValueError):
+            BenchmarkLock(self.path, policy="retry")
+
+
+if __name__ == "__main__":
+    unittest.main()
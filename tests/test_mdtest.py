@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import mdtest
+
+
+class TestMDTest(unittest.TestCase):
+    """Test the metadata operations benchmark."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.conf = {"files_per_rank": 50, "fanout": 4, "file_size": 16}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_required_inodes(self):
+        """Files, fan-out dirs and rank dirs are all accounted for."""
+        self.assertEqual(mdtest.required_inodes(self.conf, 2), 2 * (50 + 4 + 1) + 1)
+        self.assertEqual(mdtest.required_inodes(None, 1), 10000 + 16 + 1 + 1)
+
+    def test_run_mdtest(self):
+        """Run every phase with a couple of ranks."""
+        self.assertEqual(
+            mdtest.run_mdtest(rundir=self.rundir, conf=self.conf, mp_num=2), 0
+        )
+
+        with open(os.path.join(self.rundir, "mdtest_result.json"), "r") as fin:
+            result = json.load(fin)["mdtest"]
+
+        for phase in mdtest.PHASES:
+            self.assertGreater(result[phase], 0)
+            # One latency sample per file and rank
+            self.assertEqual(result["latency_ms"][phase]["count"], 2 * 50)
+
+        # The working tree must be removed
+        self.assertEqual(os.listdir(self.rundir), ["mdtest_result.json"])
+
+    def test_leftover_tree(self):
+        """Files left by an interrupted run do not make creates fail."""
+        path = mdtest.file_path(os.path.join(self.rundir, "MDTEST"), 0, 4, 0)
+        os.makedirs(os.path.dirname(path))
+        open(path, "w").close()
+
+        self.assertEqual(
+            mdtest.run_mdtest(rundir=self.rundir, conf=self.conf, mp_num=1), 0
+        )
+        self.assertEqual(os.listdir(self.rundir), ["mdtest_result.json"])
+
+    def test_invalid_conf(self):
+        """A malformed setting fails the benchmark instead of raising."""
+        self.conf["files_per_rank"] = "many"
+        self.assertEqual(
+            mdtest.run_mdtest(rundir=self.rundir, conf=self.conf, mp_num=2), 1
+        )
+        self.assertEqual(os.listdir(self.rundir), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
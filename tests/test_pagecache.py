@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from iobenchmarksuite import pagecache
+
+
+class TestPageCache(unittest.TestCase):
+    """Test page cache eviction and residency checks."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "data")
+
+        with open(self.path, "wb") as fout:
+            fout.write(os.urandom(1024 * 1024))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_residency(self):
+        """Freshly written data is resident, evicted data is not."""
+        self.assertGreater(pagecache.residency(self.path), 0.5)
+
+        pagecache.fadvise_dontneed(self.path)
+        self.assertLessEqual(
+            pagecache.residency(self.path), pagecache.RESIDENT_THRESHOLD
+        )
+
+    def test_evictor(self):
+        """The evictor verifies and reports its evictions."""
+        evictor = pagecache.Evictor(enabled=True)
+        evictor.evict([self.path])
+        evictor.evict([self.path])
+
+        self.assertEqual(
+            evictor.report(),
+            {
+                "enabled": True,
+                "method": "fadvise",
+                "evictions": 2,
+                "verified": True,
+                "max_resident_pct": 0.0,
+            },
+        )
+
+    def test_evictor_disabled(self):
+        """A disabled evictor leaves the cache untouched."""
+        evictor = pagecache.Evictor()
+        evictor.evict([self.path])
+
+        self.assertEqual(evictor.report(), {"enabled": False})
+        self.assertGreater(pagecache.residency(self.path), 0.5)
+
+    @patch.object(pagecache, "residency", return_value=0.5)
+    def test_evictor_not_verified(self, mock_residency):
+        """Pages left in the cache are flagged."""
+        evictor = pagecache.Evictor(enabled=True)
+
+        with self.assertLogs("iobenchmarksuite.pagecache", level="WARNING"):
+            evictor.evict([self.path])
+
+        self.assertFalse(evictor.report()["verified"])
+        self.assertEqual(evictor.report()["max_resident_pct"], 50.0)
+
+    @patch.object(pagecache.os, "geteuid", return_value=1000)
+    def test_drop_caches_unprivileged(self, mock_euid):
+        """drop_caches falls back to fadvise without root."""
+        self.assertFalse(pagecache.drop_caches())
+
+        evictor = pagecache.Evictor(enabled=True, drop_caches=True)
+        evictor.evict([self.path])
+        self.assertEqual(evictor.report()["method"], "fadvise")
+
+    def test_merge(self):
+        """Reports from other processes are folded in."""
+        evictor = pagecache.Evictor(enabled=True)
+        evictor.merge(
+            {
+                "enabled": True,
+                "method": "drop_caches",
+                "evictions": 3,
+                "verified": None,
+                "max_resident_pct": 2.0,
+            }
+        )
+
+        self.assertEqual(
+            evictor.report(),
+            {
+                "enabled": True,
+                "method": "drop_caches",
+                "evictions": 3,
+                "verified": None,
+                "max_resident_pct": 2.0,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
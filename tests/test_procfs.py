@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite.plugins import procfs
+
+MEMINFO = """MemTotal:       65843508 kB
+MemFree:        10912292 kB
+MemAvailable:   52410836 kB
+SwapTotal:       8388604 kB
+HugePages_Total:       0
+"""
+
+PROCESSOR = """processor\t: {cpu}
+vendor_id\t: GenuineIntel
+cpu family\t: 6
+model name\t: Intel(R) Xeon(R) CPU E5-2695 v2 @ 2.40GHz
+stepping\t: 4
+microcode\t: 0x42e
+cpu MHz\t\t: 1255.664
+physical id\t: {socket}
+siblings\t: 4
+cpu cores\t: 2
+bogomips\t: 4788.43
+flags\t\t: fpu vme de pse
+
+"""
+
+
+def write(root, path, value):
+    """Create a fake sysfs attribute."""
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fout:
+        fout.write(value + "\n")
+
+
+class TestProcfs(unittest.TestCase):
+    """Test the in-process procfs and sysfs readers."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sys_cpu = os.path.join(self.tmp.name, "cpu")
+        self.sys_node = os.path.join(self.tmp.name, "node")
+
+        for cpu in range(8):
+            write(
+                self.sys_cpu,
+                "cpu{}/cpufreq/scaling_governor".format(cpu),
+                "performance",
+            )
+        write(self.sys_cpu, "cpu7/cpufreq/scaling_governor", "powersave")
+        write(self.sys_cpu, "cpu0/cpufreq/cpuinfo_max_freq", "3200000")
+        write(self.sys_cpu, "online", "0-7")
+        write(self.sys_cpu, "smt/active", "0")
+        for index, (level, kind, size) in enumerate(
+            [("1", "Data", "32K"), ("2", "Unified", "256K"), ("3", "Unified", "30720K")]
+        ):
+            write(self.sys_cpu, "cpu0/cache/index{}/level".format(index), level)
+            write(self.sys_cpu, "cpu0/cache/index{}/type".format(index), kind)
+            write(self.sys_cpu, "cpu0/cache/index{}/size".format(index), size)
+        write(self.sys_node, "node0/cpulist", "0-3")
+        write(self.sys_node, "node1/cpulist", "4-7")
+        write(self.sys_node, "node0/distance", "10 21")
+        write(self.sys_node, "node1/distance", "21 10")
+        write(self.sys_node, "node1/meminfo", "Node 1 MemTotal:       32768 kB")
+        os.makedirs(os.path.join(self.sys_node, "power"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_meminfo(self):
+        """Sizes are kept in kB, counters without unit as is."""
+        meminfo = procfs.parse_meminfo(MEMINFO)
+        self.assertEqual(meminfo["MemAvailable"], 52410836)
+        self.assertEqual(meminfo["HugePages_Total"], 0)
+
+    def test_cpufreq_and_smt(self):
+        """Values are deduplicated over CPUs like sort | uniq."""
+        self.assertEqual(
+            procfs.read_cpufreq("scaling_governor", self.sys_cpu),
+            ["performance", "powersave"],
+        )
+        self.assertEqual(procfs.read_cpufreq("scaling_driver", self.sys_cpu), [])
+        self.assertFalse(procfs.smt_active(self.sys_cpu))
+        self.assertIsNone(procfs.smt_active(self.sys_node))
+
+    def test_cpu_topology(self):
+        """The lscpu fields are derived from cpuinfo and sysfs."""
+        processors = procfs.parse_cpuinfo(
+            "".join(PROCESSOR.format(cpu=cpu, socket=cpu // 4) for cpu in range(8))
+        )
+        self.assertEqual(len(processors), 8)
+        self.assertEqual(processors[0]["microcode"], "0x42e")
+
+        cpu = procfs.cpu_topology(processors, self.sys_cpu, self.sys_node)
+        self.assertEqual(cpu["CPU_Model"], "Intel(R) Xeon(R) CPU E5-2695 v2 @ 2.40GHz")
+        self.assertEqual(cpu["CPU_num"], 8)
+        self.assertEqual(cpu["Online_CPUs_list"], "0-7")
+        self.assertEqual(cpu["Sockets"], 2)
+        self.assertEqual(cpu["Cores_per_socket"], 2)
+        self.assertEqual(cpu["Threads_per_core"], 2)
+        self.assertEqual(cpu["CPU_MHz"], 1255.664)
+        self.assertEqual(cpu["CPU_Max_Speed_MHz"], 3200.0)
+        self.assertEqual(cpu["CPU_Min_Speed_MHz"], -1.0)
+        self.assertEqual(cpu["L2_cache"], "256K")
+        self.assertEqual(cpu["L3_cache"], "30720K")
+        self.assertEqual(cpu["NUMA_nodes"], 2)
+        self.assertEqual(cpu["NUMA_node1_CPUs"], "4-7")
+
+    def test_cpu_topology_needs_lscpu(self):
+        """Without a model name (e.g. on ARM) lscpu is needed."""
+        processors = procfs.parse_cpuinfo("processor\t: 0\nBogoMIPS\t: 50.00\n")
+        self.assertIsNone(procfs.cpu_topology(processors, self.sys_cpu, self.sys_node))
+        self.assertIsNone(procfs.cpu_topology([], self.sys_cpu, self.sys_node))
+
+    def test_numa(self):
+        """Nodes, distances and the node of each physical device."""
+        numa = procfs.read_numa(self.sys_node)
+        self.assertEqual(sorted(numa), ["node0", "node1"])
+        self.assertEqual(numa["node1"]["CPUs"], "4-7")
+        self.assertEqual(numa["node1"]["Distances"], [21, 10])
+        self.assertEqual(numa["node1"]["Mem_Total_kB"], 32768)
+        self.assertEqual(numa["node0"]["Mem_Total_kB"], -1)
+        self.assertEqual(procfs.read_numa(self.sys_cpu), {})
+
+        # The node is on the PCI function above the NVMe controller
+        pci = os.path.join(self.tmp.name, "devices", "0000:81:00.0")
+        write(pci, "numa_node", "1")
+        write(pci, "nvme/nvme0/dev", "259:0")
+        write(self.tmp.name, "devices/0000:00:1f.0/numa_node", "-1")
+        block = os.path.join(self.tmp.name, "block")
+        net = os.path.join(self.tmp.name, "net")
+        os.makedirs(os.path.join(block, "nvme0n1"))
+        os.makedirs(os.path.join(block, "loop0"))
+        os.makedirs(os.path.join(net, "eth0"))
+        os.symlink(
+            os.path.join(pci, "nvme", "nvme0"), os.path.join(block, "nvme0n1", "device")
+        )
+        os.symlink(
+            os.path.join(self.tmp.name, "devices", "0000:00:1f.0"),
+            os.path.join(net, "eth0", "device"),
+        )
+
+        self.assertEqual(
+            procfs.device_nodes(block, net),
+            {"Block_Devices": {"nvme0n1": 1}, "NICs": {"eth0": -1}},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+
+from iobenchmarksuite.plugins import procio
+
+
+class TestProcIO(unittest.TestCase):
+    """Test the per-process I/O accounting sampler."""
+
+    def test_parse_io(self):
+        """Counters follow IO_FIELDS, missing ones are zero."""
+        text = "rchar: 10\nwchar: 20\nsyscr: 3\nsyscw: 4\nread_bytes: 4096\n"
+        self.assertEqual(procio.parse_io(text), (10, 20, 3, 4, 4096, 0, 0))
+
+    def test_parse_io_stat(self):
+        """Devices are summed."""
+        text = (
+            "8:0 rbytes=100 wbytes=200 rios=1 wios=2 dbytes=0 dios=0\n"
+            "8:16 rbytes=50 wbytes=0 rios=3 wios=0 dbytes=0 dios=0\n"
+        )
+        self.assertEqual(procio.parse_io_stat(text), (150, 200, 4, 2, 0, 0))
+
+    def test_process_tree(self):
+        """Children of the root are found, the rest of the host is not."""
+        child = subprocess.Popen(["sleep", "5"])
+        try:
+            tree = procio.process_tree(os.getpid())
+            self.assertIn(os.getpid(), tree)
+            self.assertEqual(tree[child.pid][:2], ("sleep", os.getpid()))
+            self.assertNotIn(1, tree)
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_sampler(self):
+        """Writes of exited children are counted once."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "data")
+
+            sampler = procio.ProcIOSampler(interval=0.01)
+            sampler.start()
+            subprocess.run(
+                "dd if=/dev/zero of={} bs=64k count=64 conv=fsync 2>/dev/null; "
+                "sleep 0.05".format(path),
+                shell=True,
+                check=True,
+            )
+            report = sampler.stop()
+
+        self.assertGreaterEqual(report["processes"], 2)
+        self.assertGreaterEqual(report["total"]["wchar"], 64 * 64 * 1024)
+        self.assertLess(report["total"]["wchar"], 2 * 64 * 64 * 1024)
+        self.assertEqual(len(report["t"]), len(report["write_MBps"]))
+        self.assertIn("sh", report["commands"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
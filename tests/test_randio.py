@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import randio
+
+
+class TestRandIO(unittest.TestCase):
+    """Test the native random IOPS benchmark."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.conf = {
+            "file_size": "1M",
+            "block_sizes": ["4k"],
+            "queue_depths": [1, 4],
+            "modes": ["randread", "randwrite"],
+            "runtime": 0.1,
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_randio(self):
+        """Run a tiny sweep and check every point is reported."""
+        self.assertEqual(randio.run_randio(rundir=self.rundir, conf=self.conf), 0)
+
+        with open(os.path.join(self.rundir, "randio_result.json"), "r") as fin:
+            result = json.load(fin)["randio"]
+
+        for mode in ("randread", "randwrite"):
+            self.assertEqual(sorted(result[mode]["4k"]), ["1", "4"])
+            for point in result[mode]["4k"].values():
+                self.assertGreater(point["iops"], 0)
+                latency = point["latency_ms"]
+                self.assertEqual(latency["count"], point["histogram"]["count"])
+                self.assertLessEqual(latency["p50"], latency["p99"])
+                self.assertLessEqual(latency["p99"], latency["p99.9"])
+
+        self.assertFalse(os.path.exists(os.path.join(self.rundir, "randio.dat")))
+
+    def test_invalid_mode(self):
+        """An unknown access pattern is reported as a failure."""
+        self.conf["modes"] = ["seqread"]
+        with self.assertLogs("iobenchmarksuite.randio", level="ERROR"):
+            self.assertEqual(randio.run_randio(rundir=self.rundir, conf=self.conf), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
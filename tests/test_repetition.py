@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import unittest
+
+from iobenchmarksuite import repetition
+from iobenchmarksuite.repetition import Repetitions
+
+
+class TestRepetition(unittest.TestCase):
+    """Test the adaptive repetition controller."""
+
+    def test_warmup(self):
+        """Slow leading samples are discarded, steady ones kept."""
+        self.assertEqual(repetition.detect_warmup([50.0, 98.0, 100.0, 99.0, 101.0]), 1)
+        self.assertEqual(
+            repetition.detect_warmup([10.0, 50.0, 98.0, 100.0, 99.0, 101.0]), 2
+        )
+        self.assertEqual(repetition.detect_warmup([99.5, 98.0, 100.0, 99.0, 101.0]), 0)
+        # Too few samples to judge
+        self.assertEqual(repetition.detect_warmup([50.0, 98.0, 100.0]), 0)
+
+    def test_summarize(self):
+        """Student t interval over the kept samples."""
+        summary = repetition.summarize([50.0, 98.0, 100.0, 99.0, 101.0])
+        self.assertEqual(summary["warmup"], 1)
+        self.assertEqual(summary["n"], 4)
+        self.assertEqual(summary["mean"], 99.5)
+        self.assertAlmostEqual(summary["stdev"], 1.291, places=3)
+        # t(0.95, 3) = 3.182
+        self.assertAlmostEqual(summary["ci_high"] - 99.5, 2.054, places=3)
+        self.assertAlmostEqual(summary["ci_rel_halfwidth"], 0.0206, places=4)
+
+        single = repetition.summarize([42.0])
+        self.assertIsNone(single["ci_rel_halfwidth"])
+        self.assertIsNone(single["ci_low"])
+
+        self.assertEqual(repetition.t_quantile(0.99, 1), 63.657)
+        self.assertEqual(repetition.t_quantile(0.95, 100), 1.960)
+
+    def test_stopping_rule(self):
+        """Stop on a narrow interval, or when a budget is spent."""
+        steady = Repetitions("db12", {"min_runs": 3, "ci_rel_halfwidth": 0.05})
+        for value in (10.0, 10.1, 9.9):
+            self.assertFalse(steady.done())
+            steady.add(value, 1.0)
+        self.assertTrue(steady.done())
+        self.assertEqual(steady.stopped_by, "ci_rel_halfwidth")
+
+        noisy = Repetitions("db12", {"max_runs": 4})
+        for value in (10.0, 20.0, 5.0):
+            noisy.add(value, 1.0)
+            self.assertFalse(noisy.done())
+        noisy.add(15.0, 1.0)
+        self.assertTrue(noisy.done())
+        self.assertEqual(noisy.stopped_by, "max_runs")
+
+        report = noisy.report()
+        self.assertEqual(report["samples"], [10.0, 20.0, 5.0, 15.0])
+        self.assertEqual(report["n"], 4)
+
+        # A next repetition as long as the first one would not fit
+        budget = Repetitions("db12", {"max_time": 5})
+        budget.add(10.0, 8.0)
+        self.assertTrue(budget.done())
+        self.assertEqual(budget.stopped_by, "max_time")
+
+        with self.assertRaises(ValueError):
+            Repetitions("db12", {"confidence": 0.5})
+
+    def test_metric(self):
+        """Default primary metrics and configured paths."""
+        seqio = {
+            "seqio": {
+                "block_sizes": {
+                    "4k": {"read_mean": 50.0},
+                    "1M": {"read_mean": 900.0},
+                    "64k": {"read_mean": 400.0},
+                }
+            }
+        }
+        self.assertEqual(Repetitions("seqio").value(seqio), 900.0)
+        self.assertEqual(
+            Repetitions(
+                "seqio", {"metric": {"seqio": "seqio.block_sizes.4k.read_mean"}}
+            ).value(seqio),
+            50.0,
+        )
+        self.assertEqual(
+            Repetitions("hs06").value(
+                {"hs06_32": {"score": 1}, "hs06_64": {"score": 2}}
+            ),
+            2.0,
+        )
+        self.assertIsNone(Repetitions("db12").value({"DB12": {}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
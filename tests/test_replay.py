@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from iobenchmarksuite import replay
+
+
+class TestReplay(unittest.TestCase):
+    """Test the trace recorder and replay engine."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.trace_path = os.path.join(self.rundir, "job.iobt")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_strace_conversion(self):
+        """Offsets, sizes and ops are reconstructed from an strace log."""
+        count = replay.trace_from_strace("tests/data/strace.sample", self.trace_path)
+        self.assertEqual(count, 4)
+
+        trace = replay.Trace(self.trace_path)
+        records = list(trace)
+
+        self.assertEqual(trace.files, ["/data/run1/AOD.root", "/tmp/out.root"])
+        self.assertEqual(
+            [rec[1:] for rec in records],
+            [
+                (0, 4096, 0, replay.OP_READ),
+                (1048576, 65536, 0, replay.OP_READ),
+                (0, 1000, 1, replay.OP_WRITE),
+                (8192, 16384, 0, replay.OP_READ),
+            ],
+        )
+        # Timestamps are relative to the first record, resumed calls keep
+        # the time they were issued at
+        self.assertEqual(records[0][0], 0.0)
+        self.assertAlmostEqual(records[3][0], 0.0003, places=6)
+
+        extents, max_size = trace.extents()
+        self.assertEqual(list(extents), [1048576 + 65536, 1000])
+        self.assertEqual(max_size, 65536)
+        trace.close()
+
+    def test_invalid_trace(self):
+        """Files without the trace header are rejected."""
+        with open(self.trace_path, "wb") as fout:
+            fout.write(b"\0" * 64)
+
+        with self.assertRaises(ValueError):
+            replay.Trace(self.trace_path)
+
+    def test_run_replay(self):
+        """Replay a small trace in both modes with parallel replays."""
+        with replay.TraceWriter(self.trace_path) as trace:
+            for i in range(20):
+                trace.add(i * 0.001, "in.dat", i * 4096, 4096, replay.OP_READ)
+                trace.add(i * 0.001, "out.dat", i * 1024, 1024, replay.OP_WRITE)
+
+        for mode in ("afap", "timed"):
+            conf = {"trace": self.trace_path, "mode": mode, "parallel": 2}
+            self.assertEqual(replay.validate_replay(conf), 0)
+            self.assertEqual(replay.run_replay(rundir=self.rundir, conf=conf), 0)
+
+            with open(os.path.join(self.rundir, "replay_result.json"), "r") as fin:
+                result = json.load(fin)["replay"]
+
+            self.assertEqual(result["records"], 40)
+            self.assertEqual(result["read_bytes"], 2 * 20 * 4096)
+            self.assertEqual(result["write_bytes"], 2 * 20 * 1024)
+            self.assertEqual("max_lag" in result, mode == "timed")
+            self.assertEqual(result["latency_ms"]["count"], 2 * 40)
+
+        # Timed replays follow the original pacing
+        self.assertGreaterEqual(result["elapsed"], 0.019)
+        self.assertFalse(os.path.exists(os.path.join(self.rundir, "REPLAY")))
+
+    def test_validate(self):
+        """Missing traces and unknown modes fail validation."""
+        with self.assertLogs("iobenchmarksuite.replay", level="ERROR"):
+            self.assertEqual(replay.validate_replay({}), 1)
+            self.assertEqual(replay.validate_replay({"trace": "missing.iobt"}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import threading
+import unittest
+
+from iobenchmarksuite.scheduler import CPU, DISK, Scheduler, Task
+
+
+class TestScheduler(unittest.TestCase):
+    """Test the resource-aware task scheduler."""
+
+    def test_overlap(self):
+        """Tasks without conflicting resources run at the same time."""
+        pulled = threading.Event()
+
+        def bench():
+            # Only returns if the pull runs concurrently
+            return pulled.wait(timeout=5)
+
+        tasks = Scheduler(
+            [
+                Task("bench", bench, resources=(CPU,)),
+                Task("pull", pulled.set, resources=(DISK,)),
+                Task("metadata", lambda: "host"),
+            ]
+        ).run()
+
+        self.assertTrue(tasks[0].result)
+        self.assertEqual(tasks[2].result, "host")
+        self.assertEqual({task.state for task in tasks}, {"done"})
+
+    def test_order(self):
+        """Conflicting tasks run one at a time, in the given order."""
+        order = []
+        active = []
+
+        def task(name):
+            def run():
+                active.append(name)
+                self.assertEqual(len(active), 1)
+                order.append(name)
+                active.remove(name)
+
+            return run
+
+        scheduler = Scheduler(
+            [
+                Task("seqio", task("seqio"), resources=(CPU, DISK)),
+                Task("db12", task("db12"), resources=(CPU,)),
+                Task("pull", task("pull"), resources=(DISK,)),
+                Task(
+                    "cleanup", lambda: order.append("cleanup"), after=("db12", "pull")
+                ),
+            ]
+        )
+        scheduler.run()
+
+        self.assertEqual(order[0], "seqio")
+        self.assertEqual(sorted(order[1:3]), ["db12", "pull"])
+        self.assertEqual(order[3], "cleanup")
+
+        timeline = scheduler.timeline()
+        self.assertEqual(timeline["db12"]["resources"], ["cpu"])
+        self.assertGreaterEqual(timeline["db12"]["start"], timeline["seqio"]["end"])
+
+    def test_failure(self):
+        """A failed task stops the schedule and its error is raised."""
+
+        def fail():
+            raise RuntimeError("pre-flight")
+
+        tasks = [
+            Task("preflight", fail),
+            Task("db12", lambda: 0, resources=(CPU,), after=("preflight",)),
+        ]
+        with self.assertRaises(RuntimeError):
+            Scheduler(tasks).run()
+
+        self.assertEqual([task.state for task in tasks], ["failed", "skipped"])
+
+    def test_invalid(self):
+        """Dependencies must name earlier tasks."""
+        with self.assertRaises(ValueError):
+            Scheduler([Task("db12", int, after=("preflight",))])
+        with self.assertRaises(ValueError):
+            Scheduler([Task("db12", int), Task("db12", int)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import errno
+import json
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from iobenchmarksuite import seqio
+
+
+class TestSeqIO(unittest.TestCase):
+    """Test the native sequential throughput benchmark."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rundir = self.tmp_dir.name
+        self.conf = {
+            "file_size": "256k",
+            "block_sizes": ["4k", "64k"],
+            "iterations": 2,
+            "direct": True,
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_aligned_buffer(self):
+        """Buffers must be page sized multiples and writable."""
+        buf = seqio.aligned_buffer(mmap.PAGESIZE * 2)
+        self.assertEqual(len(buf), mmap.PAGESIZE * 2)
+        buf.close()
+
+    def test_run_seqio(self):
+        """Run a tiny benchmark and check the result file."""
+        self.assertEqual(seqio.run_seqio(rundir=self.rundir, conf=self.conf), 0)
+
+        with open(os.path.join(self.rundir, "seqio_result.json"), "r") as fin:
+            result = json.load(fin)["seqio"]
+
+        self.assertEqual(result["unit"], "MB/s")
+        self.assertEqual(result["file_size"], 256 * 1024)
+        self.assertEqual(sorted(result["block_sizes"]), ["4k", "64k"])
+        self.assertGreater(result["filesystem"]["alignment"], 0)
+
+        for res in result["block_sizes"].values():
+            self.assertEqual(len(res["write"]), 2)
+            self.assertEqual(len(res["read"]), 2)
+            self.assertGreater(res["read_mean"], 0)
+            self.assertEqual(
+                res["write_latency_ms"]["count"], res["histograms"]["read"]["count"]
+            )
+
+        # The data file must not be left behind
+        self.assertFalse(os.path.exists(os.path.join(self.rundir, "seqio.dat")))
+
+    def test_run_seqio_cold_cache(self):
+        """Buffered runs evict the file before every read."""
+        self.conf.update({"direct": False, "cold_cache": True})
+        self.assertEqual(seqio.run_seqio(rundir=self.rundir, conf=self.conf), 0)
+
+        with open(os.path.join(self.rundir, "seqio_result.json"), "r") as fin:
+            result = json.load(fin)["seqio"]
+
+        # Two block sizes with two iterations each
+        self.assertEqual(result["cold_cache"]["evictions"], 4)
+        self.assertTrue(result["cold_cache"]["verified"])
+
+    def test_check_direct(self):
+        """O_DIRECT is dropped for block sizes off the device alignment."""
+        self.assertTrue(seqio.check_direct(4096, 512, True))
+        with self.assertLogs("iobenchmarksuite.seqio", level="WARNING"):
+            self.assertFalse(seqio.check_direct(512, 4096, True))
+        self.assertFalse(seqio.check_direct(4096, 4096, False))
+
+    def test_direct_refused(self):
+        """A rundir refusing O_DIRECT is probed and reported only once."""
+        real_open = os.open
+
+        def refuse_direct(path, flags, *args):
+            if seqio.O_DIRECT and flags & seqio.O_DIRECT:
+                raise OSError(errno.EINVAL, "Invalid argument")
+            return real_open(path, flags, *args)
+
+        with patch("os.open", side_effect=refuse_direct):
+            with self.assertLogs("iobenchmarksuite.seqio", level="WARNING") as logs:
+                self.assertEqual(seqio.run_seqio(rundir=self.rundir, conf=self.conf), 0)
+
+        warnings = [line for line in logs.output if "O_DIRECT not supported" in line]
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual(os.listdir(self.rundir), ["seqio_result.json"])
+
+    def test_run_seqio_invalid_size(self):
+        """An invalid block size is reported as a failure."""
+        self.conf["block_sizes"] = ["big"]
+        with self.assertLogs("iobenchmarksuite.seqio", level="ERROR"):
+            self.assertEqual(seqio.run_seqio(rundir=self.rundir, conf=self.conf), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from iobenchmarksuite.plugins import snapshot
+
+
+def make_snapshot(**fields):
+    """A quiet snapshot with some fields replaced."""
+    snap = {
+        "time": 1000.0,
+        "cpus": 8,
+        "governor": ["performance"],
+        "cpu_mhz": 2400.0,
+        "mem_available_kB": 64000000,
+        "dirty_kB": 1024,
+        "writeback_kB": 0,
+        "loadavg": [0.1, 0.2, 0.3],
+        "io": {},
+        "containers": {},
+    }
+    snap.update(fields)
+    return snap
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test the before/after system snapshot diff."""
+
+    def test_take_snapshot(self):
+        """A snapshot of this host has every field and our own counters."""
+        snap = snapshot.take_snapshot()
+        self.assertEqual(len(snap["loadavg"]), 3)
+        self.assertIsNotNone(snap["mem_available_kB"])
+        self.assertTrue(any(pid == os.getpid() for pid, _ in snap["io"]))
+        self.assertIsInstance(snap["containers"], dict)
+        self.assertIn(os.getpid(), snapshot.suite_pids())
+
+    def test_clean_run(self):
+        """Nothing crosses a threshold."""
+        diff = snapshot.diff_snapshots(
+            make_snapshot(), make_snapshot(time=1600.0, cpu_mhz=2300.0)
+        )
+        self.assertFalse(diff["contaminated"])
+        self.assertEqual(diff["reasons"], [])
+        self.assertEqual(diff["duration"], 600.0)
+        self.assertEqual(diff["changes"]["cpu_mhz"], -100.0)
+        self.assertNotIn("io", diff["after"])
+
+    def test_exited_children(self):
+        """I/O of a child that exited is counted with its parent."""
+        write = "import os; fd = os.open({!r}, os.O_WRONLY); os.write(fd, b'x' * 2000000); os.fsync(fd)"
+        with tempfile.NamedTemporaryFile(dir=os.getcwd()) as fout:
+            before = snapshot.take_snapshot()
+            subprocess.run([sys.executable, "-c", write.format(fout.name)], check=True)
+            after = snapshot.take_snapshot()
+
+        diff = snapshot.diff_snapshots(before, after, exclude={os.getpid()})
+        self.assertEqual(diff["io_scope"], snapshot.IO_SCOPE)
+        key = [key for key in after["io"] if key[0] == os.getpid()][0]
+        self.assertGreaterEqual(after["io"][key][2] - before["io"][key][2], 2000000)
+
+    def test_foreign_io(self):
+        """I/O of other processes is attributed, the suite's is excluded."""
+        before = make_snapshot(
+            io={(100, 5): ("rsync", 0, 0), (200, 6): ("iobmk", 0, 0)}
+        )
+        after = make_snapshot(
+            io={
+                (100, 5): ("rsync", 150 * 10**6, 10**6),
+                (200, 6): ("iobmk", 10**9, 10**9),
+                (300, 7): ("tar", 0, 2 * 10**6),
+            }
+        )
+
+        diff = snapshot.diff_snapshots(before, after, exclude={200})
+        self.assertTrue(diff["contaminated"])
+        self.assertEqual([item["command"] for item in diff["top_io"]], ["rsync", "tar"])
+        self.assertEqual(diff["changes"]["foreign_io_MB"], 153.0)
+
+        # Thresholds come from the configuration
+        diff = snapshot.diff_snapshots(
+            before, after, thresholds={"foreign_io_mb": 1000}, exclude={200}
+        )
+        self.assertFalse(diff["contaminated"])
+
+    def test_container_io(self):
+        """Container runtimes and the suite's containers are not foreign."""
+        before = make_snapshot(
+            io={(100, 5): ("dockerd", 0, 0), (150, 5): ("postgres", 0, 0)},
+            containers={(150, 5): "system.slice/docker-old.scope"},
+        )
+        after = make_snapshot(
+            io={
+                (100, 5): ("dockerd", 500 * 10**6, 0),
+                (150, 5): ("postgres", 0, 3 * 10**6),
+                (300, 7): ("containerd-shim", 0, 10**6),
+                (400, 8): ("fio", 10**9, 10**9),
+            },
+            containers={
+                (150, 5): "system.slice/docker-old.scope",
+                (400, 8): "system.slice/docker-new.scope",
+            },
+        )
+
+        diff = snapshot.diff_snapshots(before, after, containers=True)
+        self.assertFalse(diff["contaminated"])
+        self.assertEqual([item["command"] for item in diff["top_io"]], ["postgres"])
+        self.assertEqual(diff["changes"]["foreign_io_MB"], 3.0)
+        self.assertEqual(diff["changes"]["container_io_MB"], 2501.0)
+
+        # Without containers in the run, their I/O is foreign
+        diff = snapshot.diff_snapshots(before, after)
+        self.assertTrue(diff["contaminated"])
+        self.assertNotIn("container_io_MB", diff["changes"])
+
+    def test_thresholds(self):
+        """Each condition is reported with its own reason."""
+        before = make_snapshot(loadavg=[6.0, 2.0, 1.0], dirty_kB=512 * 1024)
+        after = make_snapshot(
+            governor=["powersave"], cpu_mhz=1200.0, mem_available_kB=32000000
+        )
+
+        diff = snapshot.diff_snapshots(before, after)
+        self.assertTrue(diff["contaminated"])
+        self.assertEqual(len(diff["reasons"]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
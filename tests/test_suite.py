@@ -12,13 +12,18 @@ import unittest
 from iobenchmarksuite.iobenchmarksuite import IOBenchmarkSuite
 from iobenchmarksuite.exceptions import PreFlightError, BenchmarkFailure, BenchmarkFullFailure
 from iobenchmarksuite import benchmarks
+from iobenchmarksuite import checkpoint
 from iobenchmarksuite import utils
+from iobenchmarksuite import watchdog
+from iobenchmarksuite.plugins import snapshot
+from iobenchmarksuite.lock import BenchmarkLock
 import yaml
 from unittest.mock import patch, mock_open, MagicMock
 import pytest
 import os
 import sys
 import shutil
+import tempfile
 import time
 
 class TestSuite(unittest.TestCase):
@@ -55,6 +60,36 @@ class TestSuite(unittest.TestCase):
             self.assertIn('ERROR:iobenchmarksuite.iobenchmarksuite:   - singularity is not installed in the system.', " ".join(log.output))
 
 
+    @patch.object(shutil, 'which', return_value=None)
+    def test_preflight_native(self, mock_which):
+        """ Test native benchmarks need no container runtime. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['db12', 'seqio']
+        sample_config['seqio'] = {'file_size': '1M'}
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            suite = IOBenchmarkSuite(sample_config)
+            assert not suite.uses_containers()
+            assert suite.required_space() == 0
+            assert suite.preflight()
+            mock_which.assert_not_called()
+
+            # fio only needs the runtime with an image
+            suite.selected_benchmarks = ['fio']
+            sample_config['fio'] = {'jobs': {'read': {'rw': 'read'}}}
+            assert not suite.uses_containers()
+            sample_config['fio']['image'] = 'docker://registry.example.com/fio:3.28'
+            assert suite.uses_containers()
+            assert suite.required_space() == suite.DISK_THRESHOLD
+
+            suite.selected_benchmarks = ['ior']
+            sample_config['global']['mp_num'] = 4
+            sample_config['ior'] = {'segment_size': '1G'}
+            assert suite.required_space() == 4.29
+
     @patch.object(IOBenchmarkSuite, 'preflight', return_code=1)
     @patch.object(IOBenchmarkSuite, 'cleanup', return_code=0)
     def test_suite_run(self, mock_clean, mock_preflight):
@@ -76,8 +111,12 @@ class TestSuite(unittest.TestCase):
 
         suite = IOBenchmarkSuite(sample_config)
 
+        # The stubs above only exist in this process, skip the benchmark process
+        in_process = lambda bench, deadline: suite.execute(bench)
+
         # Suite should print successful message after each benchmark completion
-        with self.assertLogs('iobenchmarksuite.iobenchmarksuite', level='INFO') as log:
+        with self.assertLogs('iobenchmarksuite.iobenchmarksuite', level='INFO') as log, \
+                patch.object(suite, 'supervise', side_effect=in_process):
             suite.start()
             self.assertIn('INFO:iobenchmarksuite.iobenchmarksuite:Completed hs06 with return code 0', " ".join(log.output))
             self.assertIn('INFO:iobenchmarksuite.iobenchmarksuite:Completed spec2017 with return code 0', " ".join(log.output))
@@ -109,6 +148,279 @@ class TestSuite(unittest.TestCase):
         with self.assertRaises(BenchmarkFullFailure):
             suite.cleanup()
 
+    @patch.object(os, 'statvfs')
+    def test_check_inodes(self, mock_statvfs):
+        """ Test the inode pre-flight check for mdtest. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['mp_num'] = 2
+        sample_config['mdtest'] = {'files_per_rank': 100, 'fanout': 4}
+
+        suite = IOBenchmarkSuite(sample_config)
+
+        mock_statvfs.return_value = MagicMock(f_files=1000, f_favail=1000)
+        assert suite.check_inodes() == 0
+
+        mock_statvfs.return_value = MagicMock(f_files=1000, f_favail=100)
+        with self.assertLogs('iobenchmarksuite.iobenchmarksuite', level='ERROR'):
+            assert suite.check_inodes() == 1
+
+        # Filesystems without an inode table are not checked
+        mock_statvfs.return_value = MagicMock(f_files=0, f_favail=0)
+        assert suite.check_inodes() == 0
+
+    def test_samplers(self):
+        """ Test the samplers are attached to the benchmark profile. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['mp_num'] = 2
+        sample_config['global']['monitoring'] = {'interval': 0.05}
+
+        suite = IOBenchmarkSuite(sample_config)
+        suite._extra['start_time'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        suite._extra['end_time'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            with open(os.path.join(rundir, 'db12_result.json'), 'w') as fout:
+                json.dump({'DB12': {'value': 1.0, 'unit': 'est. HS06'}}, fout)
+
+            suite._snapshot = snapshot.take_snapshot()
+            samplers = suite.start_samplers()
+            time.sleep(0.1)
+            suite.stop_samplers('db12', samplers)
+            assert sorted(suite._monitoring['db12']) == sorted(samplers)
+
+            suite.selected_benchmarks = ['db12']
+            suite.cleanup()
+
+            with open(os.path.join(rundir, 'bmkrun_report.json'), 'r') as fin:
+                report = json.load(fin)
+                profile = report['profiles']['DB12']
+
+        assert profile['value'] == 1.0
+        assert isinstance(report['suite']['snapshot']['contaminated'], bool)
+        if 'diskstats' in samplers:
+            assert profile['diskstats']['interval'] == 0.05
+            assert len(profile['diskstats']['t']) >= 2
+
+        # Samplers can be disabled one by one
+        sample_config['global']['monitoring'] = {'diskstats': False}
+        assert 'diskstats' not in suite.start_samplers()
+
+    def test_samplers_stopped(self):
+        """ Test the samplers are stopped when the benchmark raises. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['monitoring'] = {'interval': 0.05}
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            suite = IOBenchmarkSuite(sample_config)
+
+            started = []
+            start_samplers = suite.start_samplers
+            with patch.object(suite, 'supervise', side_effect=OSError('no space')), \
+                    patch.object(suite, 'start_samplers',
+                                 side_effect=lambda: started.append(start_samplers()) or started[0]):
+                with pytest.raises(OSError):
+                    suite.measure('seqio')
+
+        assert started[0]
+        assert sorted(suite._monitoring['seqio']) == sorted(started[0])
+
+    def test_tasks(self):
+        """ Test the suite phases are scheduled around the benchmarks. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['mode'] = 'docker'
+        sample_config['global']['benchmarks'] = ['db12', 'hs06']
+
+        suite = IOBenchmarkSuite(sample_config)
+        tasks = {task.name: task for task in suite.tasks()}
+
+        assert list(tasks) == ['preflight', 'metadata', 'pull', 'db12', 'hs06', 'cleanup']
+        # The metadata tools overlap with db12, never with an I/O benchmark
+        assert not tasks['metadata'].conflicts(tasks['db12'])
+        assert tasks['metadata'].conflicts(tasks['hs06'])
+        # The image pull overlaps with db12 but not with hs06
+        assert not tasks['pull'].conflicts(tasks['db12'])
+        assert tasks['pull'].conflicts(tasks['hs06'])
+        assert 'pull' in tasks['hs06'].after
+        assert 'pull' not in tasks['db12'].after
+        assert len(tasks['cleanup'].after) == 5
+
+        # Nothing to pull for singularity
+        sample_config['global']['mode'] = 'singularity'
+        assert 'pull' not in [task.name for task in suite.tasks()]
+
+    @patch.object(utils, 'collect_metadata', side_effect=OSError('lshw hung'))
+    @patch.object(IOBenchmarkSuite, 'run_benchmark', return_value=0)
+    @patch.object(IOBenchmarkSuite, 'cleanup')
+    def test_metadata_failure(self, mock_cleanup, mock_run, mock_metadata):
+        """ Test a metadata failure does not stop the benchmarks. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['db12', 'seqio']
+
+        suite = IOBenchmarkSuite(sample_config)
+        with patch.object(suite, 'check_preflight'):
+            with self.assertLogs('iobenchmarksuite.iobenchmarksuite', level='ERROR'):
+                suite.run()
+
+        assert [call[0][0] for call in mock_run.call_args_list] == ['db12', 'seqio']
+        mock_cleanup.assert_called_once()
+        assert suite._metadata is None
+
+    @patch.object(IOBenchmarkSuite, 'measure', return_value=0)
+    def test_node_lock(self, mock_measure):
+        """ Test benchmarks are skipped or measured under the node lock. """
+
+        self.setup()
+        suite = IOBenchmarkSuite(self.config_file.copy())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'iobmk.lock')
+            other = BenchmarkLock(path)
+            other.acquire('seqio')
+
+            suite._lock = BenchmarkLock(path, policy='skip')
+            with self.assertLogs('iobenchmarksuite.iobenchmarksuite', level='ERROR'):
+                assert suite.run_benchmark('randio') is None
+            assert suite.failures == ['randio']
+            assert suite._locks['randio']['skipped']
+            mock_measure.assert_not_called()
+
+            other.release()
+            assert suite.run_benchmark('randio') == 0
+            assert suite._locks['randio']['locked']
+            # Released after the measurement
+            assert other.acquire('seqio')['locked']
+            other.release()
+
+    @patch.object(IOBenchmarkSuite, 'run')
+    def test_resume(self, mock_run):
+        """ Test a resumed run skips the completed benchmarks. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['db12', 'seqio', 'randio']
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+
+            # A run killed while seqio was running
+            state = checkpoint.RunState(rundir)
+            state.set_extra({'start_time': '2021-01-01T00:00:00Z'})
+            state.init_benchmarks(['db12', 'seqio', 'randio'])
+            state.update('db12', checkpoint.DONE, monitoring={'cpustats': {'interval': 1}})
+            state.update('seqio', checkpoint.RUNNING)
+
+            sample_config['global']['resume'] = rundir
+            suite = IOBenchmarkSuite(sample_config)
+            suite.start()
+
+            assert suite._extra['start_time'] == '2021-01-01T00:00:00Z'
+            assert suite._monitoring == {'db12': {'cpustats': {'interval': 1}}}
+            names = [task.name for task in suite.tasks()]
+            assert 'db12' not in names
+            assert 'seqio' in names and 'randio' in names
+            mock_run.assert_called_once()
+
+            # Without a state there is nothing to resume
+            os.remove(state.path)
+            with self.assertRaises(PreFlightError):
+                IOBenchmarkSuite(sample_config).start()
+
+    def test_repetitions(self):
+        """ Test benchmarks are repeated until their metric converges. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['db12', 'seqio']
+        sample_config['global']['repetitions'] = {'benchmarks': ['db12'], 'min_runs': 3,
+                                                  'ci_rel_halfwidth': 0.05}
+        values = iter([2.0, 10.0, 10.1, 9.9, 10.0])
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            suite = IOBenchmarkSuite(sample_config)
+
+            def supervise(bench, deadline):
+                with open(os.path.join(rundir, 'db12_result.json'), 'w') as fout:
+                    json.dump({'DB12': {'value': next(values), 'unit': 'est. HS06'}}, fout)
+                return 0
+
+            assert suite.repeated('db12') and not suite.repeated('seqio')
+            with patch.object(suite, 'supervise', side_effect=supervise):
+                suite.repeat('db12')
+
+        report = suite._repetitions['db12']
+        assert report['samples'] == [2.0, 10.0, 10.1, 9.9]
+        assert report['warmup'] == 1
+        assert report['stopped_by'] == 'ci_rel_halfwidth'
+        assert report['mean'] == 10.0
+
+    def test_timeout(self):
+        """ Test a hung benchmark is killed and the next ones still run. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['db12', 'seqio']
+        sample_config['global']['timeouts'] = {'db12': 1, 'grace': 1}
+        sample_config['seqio'] = {'file_size': '1M', 'block_sizes': ['64k'], 'iterations': 1}
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            suite = IOBenchmarkSuite(sample_config)
+
+            hang = [sys.executable, '-c', 'import time; time.sleep(60)']
+            with patch.object(watchdog, 'RUNNER', hang):
+                start = time.time()
+                suite.run_benchmark('db12')
+                assert time.time() - start < 30
+
+            # The benchmark runs in a process of its own
+            assert suite.run_benchmark('seqio') == 0
+            assert os.path.exists(os.path.join(rundir, 'seqio_result.json'))
+
+            assert suite.timeouts == ['db12']
+            assert suite.failures == ['db12']
+            assert suite._state.state('db12') == checkpoint.TIMEOUT
+            assert suite._state.state('seqio') == checkpoint.DONE
+
+            # Nothing runs once the suite budget is spent
+            suite._deadline = time.time()
+            suite.run_benchmark('seqio')
+            assert suite.timeouts == ['db12', 'seqio']
+
+    def test_timeout_scratch(self):
+        """ Test the data files of a killed benchmark are removed. """
+
+        self.setup()
+        sample_config = self.config_file.copy()
+        sample_config['global']['benchmarks'] = ['ior']
+        sample_config['global']['timeouts'] = {'ior': 1, 'grace': 1}
+
+        with tempfile.TemporaryDirectory() as rundir:
+            sample_config['global']['rundir'] = rundir
+            for name in ('ior.dat', 'ior.dat.00001', 'seqio.dat'):
+                open(os.path.join(rundir, name), 'w').close()
+            suite = IOBenchmarkSuite(sample_config)
+
+            hang = [sys.executable, '-c', 'import time; time.sleep(60)']
+            with patch.object(watchdog, 'RUNNER', hang):
+                suite.run_benchmark('ior')
+
+            assert suite.timeouts == ['ior']
+            assert 'seqio.dat' in os.listdir(rundir)
+            assert not [name for name in os.listdir(rundir) if name.startswith('ior.dat')]
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
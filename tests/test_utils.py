@@ -9,6 +9,7 @@
 
 import contextlib
 import difflib
+import json
 import unittest
 from iobenchmarksuite import utils
 import os
@@ -55,6 +56,7 @@ def test_prepare_metadata():
     # is already covered in another test hw_metadata
     del meta_json["host"]["HW"]
     del meta_json["host"]["SW"]
+    del meta_json["host"]["FS"]
     print(meta_json)
 
     # Define suite metadata schema
@@ -64,7 +66,11 @@ def test_prepare_metadata():
             "suite": {
                 str: str,
                 "benchmark_version": {str: str},
-                "flags": {str: str, "mp_num": int},
+                "flags": {
+                    str: str,
+                    "mp_num": int,
+                    "privileged": bool,
+                },
             },
             "host": {
                 str: str,
@@ -93,6 +99,29 @@ def test_get_tags_env():
     assert utils.get_tags_env() == valid_dict
 
 
+@pytest.mark.parametrize(
+    "size,expected",
+    [
+        (4096, 4096),
+        ("512", 512),
+        ("4k", 4096),
+        ("4KB", 4096),
+        ("1M", 1048576),
+        ("1.5g", 1610612736),
+    ],
+)
+def test_parse_size(size, expected):
+    """Test conversion of human readable sizes."""
+    assert utils.parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "big", "4x", "-1k"])
+def test_parse_size_invalid(size):
+    """Test invalid sizes are rejected."""
+    with pytest.raises(ValueError):
+        utils.parse_size(size)
+
+
 @pytest.mark.parametrize("cmd_str", ["cat /proc/minfo | grep MemTotal", "lxcpu"])
 def test_exec_cmd_fail(cmd_str):
     """Test exec for failures."""
@@ -235,3 +264,18 @@ def test_success_download(url):
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
+
+
+def test_print_randio_empty(capsys):
+    """An empty randio sweep is reported, not dropped with the whole line."""
+    with open("tests/data/result_profile_sample.json", "r") as fin:
+        results = json.load(fin)
+    sweep = {"1": {"iops": 120.0, "latency_ms": {"p50": 8.1}}}
+    results["profiles"] = {"randio": {"randread": {"4k": sweep, "64k": {}}}}
+
+    utils.print_results(results)
+
+    assert capsys.readouterr().out.endswith(
+        "RANDIO Benchmark = randread 4k: 120.0 IOPS @ QD1 (p50 8.1 ms), "
+        "randread 64k: no result\n"
+    )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+###############################################################################
+# Copyright 2019-2021 CERN. See the COPYRIGHT file at the top-level directory
+# of this distribution. For licensing information, see the COPYING file at
+# the top-level directory of this distribution.
+###############################################################################
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from iobenchmarksuite import watchdog
+
+
+def alive(pid):
+    """True unless the process is gone or a zombie waiting for init."""
+    try:
+        with open("/proc/{}/stat".format(pid), "r") as fin:
+            return fin.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def wait_dead(pid, seconds=5):
+    """Wait for a process to die, SIGKILL is delivered asynchronously."""
+    deadline = time.monotonic() + seconds
+    while alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return not alive(pid)
+
+
+def read_pid(path, seconds=5):
+    """Read the pid a child wrote, once it is there."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with open(path, "r") as fin:
+                return int(fin.read())
+        except (OSError, ValueError):
+            time.sleep(0.1)
+    raise AssertionError("no pid in {}".format(path))
+
+
+class TestWatchdog(unittest.TestCase):
+    """Test the per-benchmark watchdog."""
+
+    def test_ok(self):
+        """The exit code of the benchmark process is passed back."""
+        outcome = watchdog.run_in_group([sys.executable, "-c", "exit(3)"], timeout=10)
+        self.assertEqual(outcome, (watchdog.OK, 3))
+
+    def test_session(self):
+        """The benchmark leads its own session and process group."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "ids")
+            code = "import os; print(os.getpid(), os.getpgid(0), os.getsid(0), file=open({!r}, 'w'))"
+            outcome = watchdog.run_in_group(
+                [sys.executable, "-c", code.format(path)], timeout=10
+            )
+            self.assertEqual(outcome, (watchdog.OK, 0))
+            with open(path, "r") as fin:
+                pid, pgid, sid = fin.read().split()
+        self.assertEqual(pid, pgid)
+        self.assertEqual(pid, sid)
+        self.assertNotEqual(int(sid), os.getsid(0))
+
+    def test_timeout(self):
+        """A hung benchmark and its children are killed, SIGKILL if needed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pidfile = os.path.join(tmpdir, "pid")
+            # Ignores SIGTERM, like a process stuck in I/O
+            hang = "trap '' TERM; echo $$ > {}; while :; do sleep 1; done"
+            cleanup = MagicMock()
+
+            start = time.monotonic()
+            outcome, elapsed = watchdog.run_in_group(
+                ["sh", "-c", hang.format(pidfile)], timeout=1, grace=1, cleanup=cleanup
+            )
+            self.assertEqual(outcome, watchdog.TIMEOUT)
+            self.assertGreaterEqual(elapsed, 1)
+            self.assertLess(time.monotonic() - start, 30)
+            cleanup.assert_called_once_with()
+            self.assertTrue(wait_dead(read_pid(pidfile)))
+
+    def test_escaped(self):
+        """Processes that left the session of the benchmark are killed too."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pidfile = os.path.join(tmpdir, "pid")
+            escape = "setsid sh -c 'echo $$ > {}; exec sleep 60' & sleep 60"
+            outcome, _ = watchdog.run_in_group(
+                ["sh", "-c", escape.format(pidfile)], timeout=1, grace=1
+            )
+            self.assertEqual(outcome, watchdog.TIMEOUT)
+            self.assertTrue(wait_dead(read_pid(pidfile)))
+
+    def test_forward_signals(self):
+        """SIGINT reaches the benchmark, then the suite as usual."""
+        outcomes = []
+        thread = threading.Thread(
+            target=lambda: outcomes.append(watchdog.run_in_group(["sleep", "60"]))
+        )
+
+        with watchdog.forward_signals():
+            thread.start()
+            deadline = time.monotonic() + 5
+            while not watchdog._ACTIVE and time.monotonic() < deadline:
+                time.sleep(0.1)
+            with self.assertRaises(KeyboardInterrupt):
+                os.kill(os.getpid(), signal.SIGINT)
+                time.sleep(5)
+            thread.join(10)
+
+        self.assertEqual(outcomes, [(watchdog.OK, -signal.SIGTERM)])
+        self.assertIs(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+
+    def test_terminate(self):
+        """SIGTERM is enough for a group that honours it."""
+        proc = subprocess.Popen(["sleep", "60"], start_new_session=True)
+        sent = watchdog.terminate_group(proc.pid, grace=5, reap=lambda: proc.poll())
+        self.assertEqual(sent, signal.SIGTERM)
+        self.assertFalse(watchdog.group_alive(proc.pid))
+
+
+if __name__ == "__main__":
+    unittest.main()